@@ -0,0 +1,66 @@
+"""
+SMTP throughput benchmark: one connection per message vs the connection pool.
+
+Runs against the local SMTP sink, so no real mail is sent.
+
+Usage (from backend/):
+    python -m benchmarks.bench_smtp --messages 200 --latency 0.005 --connect-latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.smtp_sink import SMTPSink
+from services.mail_service import mail_service
+
+
+def point_mail_service_at(port: int):
+    mail_service.smtp_host = "127.0.0.1"
+    mail_service.smtp_port = port
+    mail_service.smtp_username = "bench"
+    mail_service.smtp_password = "bench"
+    mail_service.from_email = "bench@localhost"
+    mail_service.security = "none"
+
+
+async def run(messages: int, latency: float, connect_latency: float):
+    sink = SMTPSink(command_latency=latency, connect_latency=connect_latency)
+    point_mail_service_at(await sink.start())
+
+    recipients = [
+        {"email": f"lead{i}@example.org", "body": "Benchmark message"}
+        for i in range(messages)
+    ]
+
+    # Before: a fresh connect + AUTH for every message
+    start = time.perf_counter()
+    for recipient in recipients:
+        await mail_service.send_email(recipient["email"], "Benchmark", recipient["body"])
+    unpooled = time.perf_counter() - start
+    unpooled_connections = sink.connections
+
+    # After: pooled, persistent sessions
+    sink.connections = 0
+    start = time.perf_counter()
+    results = await mail_service.send_bulk_emails(recipients, "Benchmark")
+    pooled = time.perf_counter() - start
+
+    await sink.stop()
+
+    print(f"messages:          {messages}")
+    print(f"unpooled:          {messages / unpooled:8.1f} msg/s  ({unpooled_connections} connections)")
+    print(f"pooled bulk send:  {messages / pooled:8.1f} msg/s  ({sink.connections} connections, {results['sent']} sent)")
+    print(f"speedup:           {unpooled / pooled:8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002, help="sink delay per SMTP command (s)")
+    parser.add_argument("--connect-latency", type=float, default=0.03, help="sink delay before greeting (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.latency, args.connect_latency))
+
+
+if __name__ == "__main__":
+    main()
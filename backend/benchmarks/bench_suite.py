@@ -0,0 +1,266 @@
+"""
+Hermetic benchmark suite: stage microbenchmarks and end-to-end runs against
+local fakes of every external dependency (see benchmarks/fakes.py).
+
+Nothing leaves the machine: Serper, Google Places, OpenAI, the business
+websites, Google Sheets and SMTP are all served locally with configurable
+latency and error rates. Results are written as JSON so runs can be compared.
+
+Usage (from backend/):
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --requests 20 --concurrency 4 --latency openai=0.5,site=0.2
+    python -m benchmarks.bench_suite --compare benchmarks/results/<earlier run>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.fakes import FakeUpstreams, build_site, business, parse_mapping
+
+DEFAULT_LATENCY = "serper=0.15,maps=0.02,openai=0.4,site=0.15,sheets=0.1"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def time_calls(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """Time fn() per call; returns microsecond statistics."""
+    fn()  # warm caches and lazy imports
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {
+        "iterations": iterations,
+        "mean_us": round(statistics.mean(samples), 2),
+        "p50_us": round(percentile(samples, 0.5), 2),
+        "p95_us": round(percentile(samples, 0.95), 2),
+    }
+
+
+def run_microbenchmarks(iterations: int, site_kb: int) -> Dict[str, Dict[str, float]]:
+    """CPU cost of the pipeline's local work, without any I/O."""
+    from services import extractor_service, email_generator, scraper_service, lead_scorer
+
+    page = build_site(7, site_kb)
+    info = business(7)
+    lead = {
+        "business_name": info["name"],
+        "owner_name": "",
+        "rating": str(info["rating"]),
+        "website": "http://127.0.0.1/sites/7",
+        "website_exists": True,
+        "phone": info["phone"],
+    }
+    candidates = [
+        {
+            "title": business(i)["name"],
+            "link": f"http://127.0.0.1/sites/{i}" if business(i)["has_website"] else "",
+            "rating": str(business(i)["rating"]),
+            "reviews": business(i)["reviews"],
+            "is_place": True,
+        }
+        for i in range(100)
+    ]
+
+    return {
+        "regex_extraction": time_calls(lambda: extractor_service.extract_emails_regex(page), iterations),
+        "html_parse": time_calls(lambda: scraper_service.parse_html(page), max(iterations // 10, 5)),
+        "extraction_prompt": time_calls(
+            lambda: extractor_service.build_prompt(page, lead["website"], info["name"], extractor_service.max_html_chars),
+            iterations
+        ),
+        "email_prompt": time_calls(lambda: email_generator.build_prompt(lead), iterations),
+        "lead_scoring_100": time_calls(
+            lambda: lead_scorer.rank([dict(c) for c in candidates], 10), max(iterations // 10, 5)
+        ),
+    }
+
+
+async def run_end_to_end(args) -> Dict[str, Any]:
+    """Drive the real app in-process against the fakes."""
+    import httpx
+    import main
+    from services import mail_service, sheets_sink
+    from utils.metrics import STAGE_DURATION
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    await main.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    results: Dict[str, Any] = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            latencies: List[float] = []
+            errors = 0
+            leads = 0
+            queue: asyncio.Queue = asyncio.Queue()
+            for i in range(args.requests):
+                queue.put_nowait(f"{['cafes', 'gyms', 'salons', 'bakeries'][i % 4]} in bench city {i}")
+
+            async def worker():
+                nonlocal errors, leads
+                while not queue.empty():
+                    query = queue.get_nowait()
+                    start = time.perf_counter()
+                    response = await client.post("/generate-leads", json={
+                        "query": query,
+                        "max_results": args.max_results,
+                        "skip_known": False,
+                    })
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code == 200:
+                        leads += response.json()["total_leads"]
+                    else:
+                        errors += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - start
+
+            results["generate_leads"] = {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "errors": errors,
+                "leads": leads,
+                "total_s": round(elapsed, 3),
+                "requests_per_s": round(args.requests / elapsed, 3),
+                "leads_per_s": round(leads / elapsed, 3),
+                "latency_mean_ms": round(statistics.mean(latencies) * 1000, 1),
+                "latency_p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+                "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+                "latency_max_ms": round(max(latencies) * 1000, 1),
+            }
+
+        results["stages"] = {
+            stage: {"calls": count, "mean_ms": round(total / count * 1000, 2) if count else 0.0}
+            for (stage,), (count, total) in sorted(STAGE_DURATION.totals().items())
+        }
+
+        start = time.perf_counter()
+        flushed = await sheets_sink.flush()
+        results["sheets_flush"] = {"ok": flushed, "total_s": round(time.perf_counter() - start, 3)}
+
+        recipients = [
+            {"email": f"lead{i}@bench.example.org", "body": "Benchmark message"}
+            for i in range(args.emails)
+        ]
+        start = time.perf_counter()
+        sent = await mail_service.send_bulk_emails(recipients, "Benchmark")
+        elapsed = time.perf_counter() - start
+        results["send_emails"] = {
+            "messages": args.emails,
+            "sent": sent["sent"],
+            "failed": sent["failed"],
+            "total_s": round(elapsed, 3),
+            "messages_per_s": round(args.emails / elapsed, 1),
+        }
+    finally:
+        await main.shutdown()
+    return results
+
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]):
+    """Print every numeric result next to the same result of an earlier run."""
+    before = flatten({"micro": previous.get("micro", {}), "e2e": previous.get("e2e", {})})
+    after = flatten({"micro": current.get("micro", {}), "e2e": current.get("e2e", {})})
+    print(f"\n{'metric':<48} {'before':>12} {'after':>12} {'change':>9}")
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{name:<48} {old:>12} {new:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=12, help="/generate-leads requests to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--max-results", type=int, default=8, help="max_results per request")
+    parser.add_argument("--emails", type=int, default=200, help="messages for the bulk send run")
+    parser.add_argument("--iterations", type=int, default=500, help="microbenchmark iterations")
+    parser.add_argument("--site-kb", type=int, default=40, help="size of each fake business site")
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help="per-upstream seconds, e.g. openai=0.8,site=0.3")
+    parser.add_argument("--error-rate", default="", help="per-upstream failure fraction, e.g. site=0.05")
+    parser.add_argument("--smtp-latency", type=float, default=0.002, help="SMTP sink delay per command (s)")
+    parser.add_argument("--search", choices=["maps", "serper"], default="maps", help="search provider to exercise")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's INFO logging")
+    args = parser.parse_args()
+
+    fakes = FakeUpstreams(
+        latency=parse_mapping(args.latency),
+        error_rate=parse_mapping(args.error_rate),
+        site_kb=args.site_kb,
+        smtp_latency=args.smtp_latency
+    ).start()
+
+    # Point every service at the fakes before anything reads the settings
+    workdir = tempfile.mkdtemp(prefix="leadgen-bench-")
+    os.environ.update(fakes.environment())
+    os.environ.update({
+        "LEAD_STORE_PATH": os.path.join(workdir, "leads.db"),
+        "OUTBOX_PATH": os.path.join(workdir, "outbox.db"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "WARMUP_ON_STARTUP": "false",
+    })
+    if args.search == "serper":
+        os.environ["GOOGLE_MAPS_API_KEY"] = ""
+
+    results: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "compare", "verbose", "skip_micro", "skip_e2e")
+        },
+    }
+    try:
+        if not args.skip_micro:
+            results["micro"] = run_microbenchmarks(args.iterations, args.site_kb)
+        if not args.skip_e2e:
+            results["e2e"] = asyncio.run(run_end_to_end(args))
+        results["upstreams"] = fakes.stats()
+    finally:
+        fakes.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({key: results[key] for key in ("micro", "e2e") if key in results}, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+"""
+Local stand-ins for every external dependency of the lead pipeline.
+
+One HTTP server (Starlette on uvicorn) serves fake Serper, Google Places,
+OpenAI chat completions, a corpus of business websites and the Google Sheets
+values API; an SMTPSink accepts mail, a UDP DNS stub answers the MX lookups
+of recipient validation and a Redis-protocol stub backs the shared cache.
+Each upstream has its own latency and error rate. Everything runs on a background thread with its own event loop, so
+the fakes never compete with the code under test for its loop (and blocking
+clients such as googlemaps cannot deadlock against them).
+
+Usage (from backend/):
+    python -m benchmarks.fakes --port 8765 --latency openai=0.8,site=0.3
+
+Then point the app at them with the variables printed on startup.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.smtp_sink import SMTPSink
+
+logger = logging.getLogger(__name__)
+
+UPSTREAMS = ("serper", "maps", "openai", "site", "sheets", "dns", "redis")
+
+CITIES = ["Bhopal", "Indore", "Pune", "Jaipur", "Nagpur", "Surat", "Kochi", "Mysuru"]
+KINDS = ["Cafe", "Gym", "Bakery", "Salon", "Dental Clinic", "Bookstore", "Florist", "Yoga Studio"]
+
+SHEET_HEADERS = [
+    "Business Name", "Email", "Phone", "Rating", "Website",
+    "Address", "Website Exists", "Cold Email"
+]
+
+
+class Upstream:
+    """Latency and failure injection for one fake upstream."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+
+    async def hit(self) -> bool:
+        """Wait out the latency; False when this call should fail."""
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # Deterministic spread instead of randomness, so runs are comparable
+        if self.error_rate > 0 and (self.calls * self.error_rate) % 1 < self.error_rate:
+            self.errors += 1
+            return False
+        return True
+
+
+def business(index: int) -> Dict[str, Any]:
+    """Deterministic fake business; every third one has no website."""
+    kind = KINDS[index % len(KINDS)]
+    city = CITIES[(index // len(KINDS)) % len(CITIES)]
+    return {
+        "index": index,
+        "name": f"{city} {kind} No. {index}",
+        "place_id": f"bench-place-{index}",
+        "address": f"{10 + index} Market Road, {city}",
+        "phone": f"+91 98{index:08d}",
+        "rating": round(3.5 + (index % 15) / 10, 1),
+        "reviews": (index * 37) % 900,
+        "has_website": index % 3 != 0,
+        "email": f"hello@bench-{index}.example.org",
+    }
+
+
+def build_site(index: int, size_kb: int = 40) -> str:
+    """HTML page of roughly size_kb for a fake business."""
+    info = business(index)
+    filler = (
+        f"<section class=\"about\"><h2>About {info['name']}</h2><p>"
+        + "We have been serving our neighbourhood with care and quality for years. " * 6
+        + "</p><ul>" + "".join(f"<li>Service {n}</li>" for n in range(8)) + "</ul></section>\n"
+    )
+    head = (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{info['name']}</title>"
+        "<meta name=\"viewport\" content=\"width=device-width\">"
+        "<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}</script>"
+        "<style>body{font-family:sans-serif}.about{margin:2em}</style>"
+        "</head><body>"
+        f"<header><h1>{info['name']}</h1><nav><a href=\"/\">Home</a> <a href=\"#contact\">Contact</a></nav></header>\n"
+    )
+    contact = (
+        f"<footer id=\"contact\"><p>Call us: {info['phone']}</p>"
+        f"<p>Write to <a href=\"mailto:{info['email']}\">{info['email']}</a></p>"
+        f"<p>{info['address']}</p><p>Open 9am - 8pm</p></footer></body></html>"
+    )
+    body = []
+    while sum(len(part) for part in body) < size_kb * 1024:
+        body.append(filler)
+    return head + "".join(body) + contact
+
+
+class DNSStub(asyncio.DatagramProtocol):
+    """
+    Answers every MX query with mx.<domain>; injected failures answer SERVFAIL.
+
+    Names listed in zones get their own records instead: a zone maps a name
+    (lower case, no trailing dot) to {rdtype: [record text]}, or to None for a
+    name that does not exist. Record types a zone lacks get an empty answer.
+    """
+
+    def __init__(self, upstream: Upstream, zones: Optional[Dict[str, Optional[Dict[str, List[str]]]]] = None):
+        self.upstream = upstream
+        self.zones = zones if zones is not None else {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        asyncio.ensure_future(self._answer(data, addr))
+
+    async def _answer(self, data: bytes, addr):
+        import dns.message
+        import dns.rcode
+        import dns.rdatatype
+        import dns.rrset
+
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        response = dns.message.make_response(query)
+        if not await self.upstream.hit():
+            response.set_rcode(dns.rcode.SERVFAIL)
+        else:
+            for question in query.question:
+                name = question.name.to_text()
+                rdtype = dns.rdatatype.to_text(question.rdtype)
+                zone_name = name.rstrip(".").lower()
+                if zone_name in self.zones:
+                    zone = self.zones[zone_name]
+                    if zone is None:
+                        response.set_rcode(dns.rcode.NXDOMAIN)
+                    elif zone.get(rdtype):
+                        response.answer.append(dns.rrset.from_text_list(name, 300, "IN", rdtype, zone[rdtype]))
+                elif question.rdtype == dns.rdatatype.MX:
+                    response.answer.append(dns.rrset.from_text(name, 300, "IN", "MX", f"10 mx.{name}"))
+        self.transport.sendto(response.to_wire(), addr)
+
+
+class RedisStub:
+    """
+    In-memory server for the Redis commands the shared cache uses.
+
+    Speaks RESP2: PING, AUTH, SELECT, GET, SET (EX/PX/NX), DEL and EVAL of
+    the cache's compare-and-delete lock release script.
+    """
+
+    def __init__(self, upstream: Upstream):
+        self.upstream = upstream
+        self.data: Dict[bytes, tuple] = {}  # key -> (value, expires at or None)
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0] if entry else None
+
+    def _command(self, args: List[bytes]) -> Any:
+        name = args[0].upper()
+        if name in (b"PING", b"AUTH", b"SELECT"):
+            return "PONG" if name == b"PING" else "OK"
+        if name == b"GET":
+            return self._get(args[1])
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args[1:])
+        if name == b"SET":
+            key, value, expires, only_new = args[1], args[2], None, False
+            options = [arg.upper() for arg in args[3:]]
+            for index, option in enumerate(options):
+                if option == b"NX":
+                    only_new = True
+                elif option in (b"PX", b"EX"):
+                    amount = float(options[index + 1])
+                    expires = time.monotonic() + (amount / 1000 if option == b"PX" else amount)
+            if only_new and self._get(key) is not None:
+                return None
+            self.data[key] = (value, expires)
+            return "OK"
+        if name == b"EVAL":
+            # Only script sent by the cache: delete KEYS[1] if it holds ARGV[1]
+            key, token = args[3], args[4]
+            if self._get(key) == token:
+                del self.data[key]
+                return 1
+            return 0
+        return RuntimeError(f"unknown command '{name.decode()}'")
+
+    @staticmethod
+    def _encode(reply: Any) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return f"-ERR {reply}\r\n".encode()
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header.startswith(b"*"):
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                if await self.upstream.hit():
+                    reply = self._command(args)
+                else:
+                    reply = RuntimeError("injected failure")
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class FakeUpstreams:
+    """Runs every fake upstream on a background thread."""
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, float]] = None,
+        error_rate: Optional[Dict[str, float]] = None,
+        businesses: int = 400,
+        places_per_query: int = 20,
+        site_kb: int = 40,
+        smtp_latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Args:
+            latency: Seconds per call, keyed by upstream (serper, maps, openai, site, sheets, dns, redis)
+            error_rate: Fraction of calls that fail, keyed by upstream
+            businesses: Size of the fake business directory
+            places_per_query: Results returned per search
+            site_kb: Approximate size of each business website
+            smtp_latency: SMTP sink delay per command
+            host: Interface to bind
+            port: HTTP port (0 = pick a free one)
+        """
+        latency = latency or {}
+        error_rate = error_rate or {}
+        self.upstreams = {
+            name: Upstream(latency.get(name, 0.0), error_rate.get(name, 0.0)) for name in UPSTREAMS
+        }
+        self.businesses = businesses
+        self.places_per_query = places_per_query
+        self.site_kb = site_kb
+        self.host = host
+        self.port = port
+        self.smtp = SMTPSink(host=host, command_latency=smtp_latency)
+        self.sheet_rows: List[List[str]] = []
+        self.base_url = ""
+        self.dns_port = 0
+        # Records of the DNS stub by name (see DNSStub); may be changed while running
+        self.dns_zones: Dict[str, Optional[Dict[str, List[str]]]] = {}
+        self._dns_transport = None
+        self.redis = RedisStub(self.upstreams["redis"])
+        self.redis_port = 0
+        self._redis_server = None
+        self._sites: Dict[int, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    # --- fake data -----------------------------------------------------
+
+    def query_businesses(self, query: str) -> List[Dict[str, Any]]:
+        """Stable, query-dependent slice of the directory."""
+        start = int(hashlib.md5(query.lower().encode()).hexdigest(), 16) % self.businesses
+        return [business((start + n) % self.businesses) for n in range(self.places_per_query)]
+
+    def site_url(self, info: Dict[str, Any]) -> str:
+        return f"{self.base_url}/sites/{info['index']}" if info["has_website"] else ""
+
+    def site(self, index: int) -> str:
+        if index not in self._sites:
+            self._sites[index] = build_site(index, self.site_kb)
+        return self._sites[index]
+
+    # --- HTTP app ------------------------------------------------------
+
+    def _app(self):
+        from starlette.applications import Starlette
+        from starlette.requests import Request
+        from starlette.responses import HTMLResponse, JSONResponse, Response
+        from starlette.routing import Route
+
+        def failure(message: str = "injected failure") -> JSONResponse:
+            return JSONResponse({"error": {"message": message}}, status_code=503)
+
+        async def serper(request: Request):
+            if not await self.upstreams["serper"].hit():
+                return failure()
+            payload = await request.json()
+            places = [
+                {
+                    "title": info["name"],
+                    "address": info["address"],
+                    "rating": info["rating"],
+                    "ratingCount": info["reviews"],
+                    "phoneNumber": info["phone"],
+                    "website": self.site_url(info),
+                    "placeId": info["place_id"],
+                }
+                for info in self.query_businesses(payload.get("q", ""))
+            ]
+            return JSONResponse({"places": places, "organic": []})
+
+        async def textsearch(request: Request):
+            if not await self.upstreams["maps"].hit():
+                return failure()
+            results = [
+                {"place_id": info["place_id"], "name": info["name"], "user_ratings_total": info["reviews"]}
+                for info in self.query_businesses(request.query_params.get("query", ""))
+            ]
+            return JSONResponse({"status": "OK", "results": results})
+
+        async def details(request: Request):
+            if not await self.upstreams["maps"].hit():
+                return failure()
+            place_id = request.query_params.get("placeid", "")
+            index = int(place_id.rsplit("-", 1)[-1]) if place_id.rsplit("-", 1)[-1].isdigit() else 0
+            info = business(index)
+            result = {
+                "name": info["name"],
+                "formatted_address": info["address"],
+                "formatted_phone_number": info["phone"],
+                "rating": info["rating"],
+                "user_ratings_total": info["reviews"],
+                "opening_hours": {"weekday_text": ["Monday: 9:00 AM – 8:00 PM"]},
+                "url": f"https://maps.example.org/?cid={index}",
+            }
+            if info["has_website"]:
+                result["website"] = self.site_url(info)
+            return JSONResponse({"status": "OK", "result": result})
+
+        async def chat_completions(request: Request):
+            if not await self.upstreams["openai"].hit():
+                return failure()
+            payload = await request.json()
+            messages = payload.get("messages", [])
+            system = messages[0]["content"] if messages else ""
+            prompt = messages[-1]["content"] if messages else ""
+
+            if "extraction" in system:
+                title = re.search(r"Search Title: (.*)", prompt)
+                phone = re.search(r"Call us: ([^<]+)", prompt)
+                content = json.dumps({
+                    "business_name": title.group(1).strip() if title else "",
+                    "owner_name": "",
+                    "rating": "",
+                    "opening_hours": "Open 9am - 8pm",
+                    "phone": phone.group(1).strip() if phone else "",
+                    "address": "",
+                })
+            else:
+                name = re.search(r"Business Name: (.*)", prompt)
+                content = (
+                    f"Hi,\n\nI came across {name.group(1).strip() if name else 'your business'} "
+                    "and have a few ideas to bring you more customers online.\n\n"
+                    "Would you be open to a quick call this week?\n\nBest regards,\n[Your Name]"
+                )
+
+            prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+            completion_tokens = len(content) // 4
+            return JSONResponse({
+                "id": f"chatcmpl-bench-{self.upstreams['openai'].calls}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "gpt-4o-mini"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+        async def site(request: Request):
+            if not await self.upstreams["site"].hit():
+                return HTMLResponse("<h1>Service unavailable</h1>", status_code=503)
+            page = self.site(int(request.path_params["index"]) % self.businesses)
+            # Validators let lead refreshes re-check a site with a conditional GET
+            etag = '"' + hashlib.md5(page.encode()).hexdigest() + '"'
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            return HTMLResponse(page, headers={"ETag": etag})
+
+        async def sheets_values(request: Request):
+            if not await self.upstreams["sheets"].hit():
+                return failure()
+            sheet_id = request.path_params["sheet_id"]
+            target = request.path_params["target"]
+            if request.method == "GET":
+                # The header row, or the appended rows when reading past it
+                values = self.sheet_rows if target.startswith("A2") else [SHEET_HEADERS]
+                return JSONResponse({"range": target, "majorDimension": "ROWS", "values": values})
+            body = await request.json()
+            rows = body.get("values", [])
+            if target.endswith(":append"):
+                self.sheet_rows.extend(rows)
+            return JSONResponse({
+                "spreadsheetId": sheet_id,
+                "updates": {"spreadsheetId": sheet_id, "updatedRows": len(rows)},
+            })
+
+        return Starlette(routes=[
+            Route("/serper/search", serper, methods=["POST"]),
+            Route("/maps/api/place/textsearch/json", textsearch),
+            Route("/maps/api/place/details/json", details),
+            Route("/openai/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/sites/{index:int}", site),
+            Route(
+                "/sheets/v4/spreadsheets/{sheet_id}/values/{target:path}",
+                sheets_values,
+                methods=["GET", "PUT", "POST"],
+            ),
+        ])
+
+    # --- lifecycle -----------------------------------------------------
+
+    async def _serve(self, sock: socket.socket):
+        import uvicorn
+
+        config = uvicorn.Config(self._app(), log_level="warning", access_log=False, lifespan="off")
+        self._server = uvicorn.Server(config)
+        # Signals belong to the process under test, not to the fakes
+        self._server.install_signal_handlers = lambda: None
+        await self.smtp.start()
+        self._dns_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: DNSStub(self.upstreams["dns"], self.dns_zones), local_addr=(self.host, 0)
+        )
+        self.dns_port = self._dns_transport.get_extra_info("sockname")[1]
+        self._redis_server = await asyncio.start_server(self.redis.handle, self.host, 0)
+        self.redis_port = self._redis_server.sockets[0].getsockname()[1]
+        serve = asyncio.create_task(self._server.serve(sockets=[sock]))
+        while not self._server.started and not serve.done():
+            await asyncio.sleep(0.01)
+        self._ready.set()
+        await serve
+        self._dns_transport.close()
+        self._redis_server.close()
+        await self.smtp.stop()
+
+    def start(self) -> "FakeUpstreams":
+        """Start the fakes and wait until they accept connections."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+        self.base_url = f"http://{self.host}:{self.port}"
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._serve(sock))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout=10):
+            raise RuntimeError("Fake upstreams did not start")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def environment(self) -> Dict[str, str]:
+        """Settings that point the app at these fakes."""
+        return {
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"{self.base_url}/openai/v1",
+            "SERPER_API_KEY": "bench",
+            "SERPER_API_URL": f"{self.base_url}/serper/search",
+            "GOOGLE_MAPS_API_KEY": "AIzaBench",
+            "GOOGLE_MAPS_BASE_URL": self.base_url,
+            "GOOGLE_SHEET_ID": "bench-sheet",
+            "GOOGLE_SHEETS_API_ENDPOINT": f"{self.base_url}/sheets/",
+            "SMTP_HOST": self.host,
+            "SMTP_PORT": str(self.smtp.port),
+            "SMTP_USERNAME": "bench",
+            "SMTP_PASSWORD": "bench",
+            "SMTP_FROM_EMAIL": "bench@localhost",
+            "SMTP_SECURITY": "none",
+            "EMAIL_DNS_NAMESERVERS": self.host,
+            "EMAIL_DNS_PORT": str(self.dns_port),
+            "CACHE_REDIS_URL": f"redis://{self.host}:{self.redis_port}/0",
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            name: {"calls": upstream.calls, "errors": upstream.errors}
+            for name, upstream in self.upstreams.items()
+        }
+        stats["smtp"] = {"connections": self.smtp.connections, "messages": self.smtp.messages_received}
+        stats["sheets"]["rows"] = len(self.sheet_rows)
+        return stats
+
+
+def parse_mapping(text: str) -> Dict[str, float]:
+    """Parse "openai=0.8,site=0.3" into {"openai": 0.8, "site": 0.3}."""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, value = item.partition("=")
+        if name not in UPSTREAMS:
+            raise ValueError(f"Unknown upstream '{name}' (expected one of {', '.join(UPSTREAMS)})")
+        mapping[name] = float(value)
+    return mapping
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake upstreams")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="", help="per-upstream seconds, e.g. openai=0.8,site=0.3")
+    parser.add_argument("--error-rate", default="", help="per-upstream failure fraction, e.g. site=0.05")
+    args = parser.parse_args()
+
+    fakes = FakeUpstreams(parse_mapping(args.latency), parse_mapping(args.error_rate), port=args.port).start()
+    print(f"Fake upstreams on {fakes.base_url}; SMTP sink on port {fakes.smtp.port}; DNS on UDP port {fakes.dns_port}; "
+          f"Redis on port {fakes.redis_port}\n")
+    for key, value in fakes.environment().items():
+        print(f"{key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Load-testing harness and capacity report.
+
+Starts the fake upstreams (benchmarks/fakes.py), launches the API as a real
+uvicorn server pointed at them and ramps closed-loop clients step by step.
+Each step records latency percentiles, throughput and errors on the client
+side, and event-loop lag and resident memory from the server's /metrics. The
+capacity report marks the step where throughput stops scaling (or the latency
+SLO / error budget breaks) and sizes the uvicorn worker count from it.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --scenario generate-leads --steps 1,2,4,8,16
+    python -m benchmarks.load_test --scenario send-emails --steps 2,8,32 --step-duration 30
+    python -m benchmarks.load_test --scenario mixed --slo-p95-ms 8000 --target-concurrency 40
+
+With --workers > 1 every scrape of /metrics is answered by one worker, so loop
+lag and memory describe a single worker; size from a --workers 1 run.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.bench_suite import DEFAULT_LATENCY, RESULTS_DIR, percentile
+from benchmarks.fakes import KINDS, FakeUpstreams, parse_mapping
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("generate-leads", "send-emails", "mixed")
+
+
+# --- server ------------------------------------------------------------------
+
+def free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, env: Dict[str, str], log_path: str) -> Tuple[subprocess.Popen, str]:
+    """Launch the API under uvicorn and wait until /health answers."""
+    port = free_port(args.host)
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", args.host, "--port", str(port),
+        "--workers", str(args.workers),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    log = open(log_path, "w")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://{args.host}:{port}"
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}; see {log_path}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not become healthy; see {log_path}")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- /metrics ----------------------------------------------------------------
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Prometheus text format to {"name{labels}": value}."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def lag_buckets(samples: Dict[str, float]) -> List[Tuple[float, float]]:
+    """Cumulative (upper bound, count) pairs of the event-loop lag histogram."""
+    prefix = 'leadgen_event_loop_lag_seconds_bucket{le="'
+    buckets = []
+    for name, value in samples.items():
+        if name.startswith(prefix):
+            bound = name[len(prefix):-2]
+            buckets.append((float("inf") if bound == "+Inf" else float(bound), value))
+    return sorted(buckets)
+
+
+def lag_between(before: Dict[str, float], after: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """Mean and p99 loop lag (ms) of the samples taken between two scrapes."""
+    count = after.get("leadgen_event_loop_lag_seconds_count", 0) - before.get("leadgen_event_loop_lag_seconds_count", 0)
+    if count <= 0:
+        return {"samples": 0, "mean_ms": None, "p99_ms": None}
+    total = after.get("leadgen_event_loop_lag_seconds_sum", 0) - before.get("leadgen_event_loop_lag_seconds_sum", 0)
+    previous = dict(lag_buckets(before))
+    p99 = None
+    for bound, cumulative in lag_buckets(after):
+        if cumulative - previous.get(bound, 0) >= 0.99 * count:
+            p99 = bound
+            break
+    return {
+        "samples": int(count),
+        "mean_ms": round(total / count * 1000, 2),
+        # Upper bound of the histogram bucket holding the 99th percentile
+        "p99_ms": None if p99 is None or p99 == float("inf") else round(p99 * 1000, 1),
+    }
+
+
+async def scrape(client: httpx.AsyncClient) -> Dict[str, float]:
+    try:
+        response = await client.get("/metrics")
+        return parse_metrics(response.text)
+    except httpx.HTTPError:
+        return {}
+
+
+# --- load --------------------------------------------------------------------
+
+class Workload:
+    """Builds request payloads; every request is distinct so nothing is coalesced or cached."""
+
+    def __init__(self, scenario: str, max_results: int, emails_per_request: int, send_ratio: float):
+        self.scenario = scenario
+        self.max_results = max_results
+        self.emails_per_request = emails_per_request
+        self.send_ratio = send_ratio
+        self._counter = itertools.count()
+
+    def next(self) -> Tuple[str, str, Dict[str, Any]]:
+        """(kind, path, json body) of the next request."""
+        n = next(self._counter)
+        kind = self.scenario
+        if kind == "mixed":
+            # Deterministic interleaving at the requested ratio
+            kind = "send-emails" if math.floor((n + 1) * self.send_ratio) > math.floor(n * self.send_ratio) else "generate-leads"
+        if kind == "generate-leads":
+            return kind, "/generate-leads", {
+                "query": f"{KINDS[n % len(KINDS)].lower()} in load city {n}",
+                "max_results": self.max_results,
+                "skip_known": False,
+            }
+        return kind, "/send-emails", {
+            "leads": [
+                {"email": f"owner{n}x{i}@load-{(n + i) % 50}.example.org", "cold_email": f"Hello from load test {n}"}
+                for i in range(self.emails_per_request)
+            ],
+            "subject": f"Load test {n}",
+        }
+
+
+async def run_step(base_url: str, workload: Workload, concurrency: int, duration: float, timeout: float) -> Dict[str, Any]:
+    """Closed loop: each client sends its next request as soon as the previous one returns."""
+    limits = httpx.Limits(max_connections=concurrency + 2, max_keepalive_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        results: List[Dict[str, Any]] = []
+        stop_at = time.perf_counter() + duration
+        peak_rss = 0.0
+
+        async def client_loop():
+            while time.perf_counter() < stop_at:
+                kind, path, body = workload.next()
+                start = time.perf_counter()
+                ok, items = False, 0
+                try:
+                    response = await client.post(path, json=body)
+                    ok = response.status_code == 200
+                    if ok:
+                        data = response.json()
+                        items = data.get("total_leads", 0) if kind == "generate-leads" else data.get("sent", 0)
+                except httpx.HTTPError:
+                    pass
+                results.append({"kind": kind, "ok": ok, "items": items, "latency": time.perf_counter() - start})
+
+        async def sample_memory():
+            nonlocal peak_rss
+            while True:
+                peak_rss = max(peak_rss, (await scrape(client)).get("process_resident_memory_bytes", 0))
+                await asyncio.sleep(1)
+
+        before = await scrape(client)
+        sampler = asyncio.create_task(sample_memory())
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+        after = await scrape(client)
+
+    latencies = [r["latency"] for r in results]
+    errors = sum(1 for r in results if not r["ok"])
+    step = {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "throughput_rps": round(len(results) / elapsed, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(max(latencies, default=0) * 1000, 1),
+            "mean": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+        },
+        "loop_lag": lag_between(before, after),
+        "rss_mb": round(max(peak_rss, after.get("process_resident_memory_bytes", 0)) / 2**20, 1),
+    }
+    for kind in ("generate-leads", "send-emails"):
+        of_kind = [r for r in results if r["kind"] == kind]
+        if of_kind:
+            unit = "leads" if kind == "generate-leads" else "messages"
+            step[kind] = {
+                "requests": len(of_kind),
+                "p95_ms": round(percentile([r["latency"] for r in of_kind], 0.95) * 1000, 1),
+                f"{unit}_per_s": round(sum(r["items"] for r in of_kind) / elapsed, 2),
+            }
+    return step
+
+
+# --- report ------------------------------------------------------------------
+
+def analyze(steps: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    """
+    Find the last step that still scaled within the SLO and error budget.
+
+    A step breaks when its error rate exceeds --max-error-rate, its p95
+    exceeds --slo-p95-ms, or it adds less than --min-gain throughput over the
+    best step so far (more clients only queue).
+    """
+    sustainable = None
+    limit = "not reached; add higher steps"
+    for step in steps:
+        if step["error_rate"] > args.max_error_rate:
+            limit = f"error rate {step['error_rate']:.1%} at concurrency {step['concurrency']}"
+            break
+        if args.slo_p95_ms and step["latency_ms"]["p95"] > args.slo_p95_ms:
+            limit = f"p95 {step['latency_ms']['p95']:.0f}ms over the {args.slo_p95_ms:.0f}ms SLO at concurrency {step['concurrency']}"
+            break
+        if sustainable and step["throughput_rps"] < sustainable["throughput_rps"] * (1 + args.min_gain):
+            limit = (
+                f"throughput stopped scaling at concurrency {step['concurrency']} "
+                f"({step['throughput_rps']:.2f} vs {sustainable['throughput_rps']:.2f} req/s)"
+            )
+            break
+        sustainable = step
+
+    report: Dict[str, Any] = {"limit": limit, "sustainable": None, "recommended_workers": None}
+    if sustainable is None:
+        return report
+
+    per_worker_concurrency = sustainable["concurrency"] / args.workers
+    per_worker_rps = sustainable["throughput_rps"] / args.workers
+    report["sustainable"] = {
+        "concurrency": sustainable["concurrency"],
+        "throughput_rps": sustainable["throughput_rps"],
+        "p95_ms": sustainable["latency_ms"]["p95"],
+        "per_worker_concurrency": round(per_worker_concurrency, 2),
+        "per_worker_rps": round(per_worker_rps, 3),
+    }
+    needed = []
+    if args.target_concurrency:
+        needed.append(math.ceil(args.target_concurrency / per_worker_concurrency))
+    if args.target_rps:
+        needed.append(math.ceil(args.target_rps / per_worker_rps))
+    if needed:
+        report["recommended_workers"] = max(needed)
+    return report
+
+
+def render_report(result: Dict[str, Any]) -> str:
+    config = result["config"]
+    lines = [
+        f"# Capacity report: {config['scenario']}",
+        "",
+        f"{result['timestamp']} - {config['workers']} uvicorn worker(s), {config['step_duration']}s per step, "
+        f"upstream latency `{config['latency']}`" + (f", error rate `{config['error_rate']}`" if config["error_rate"] else ""),
+        "",
+        "| clients | requests | err % | req/s | p50 ms | p95 ms | p99 ms | loop lag mean / p99 ms | RSS MB |",
+        "|--:|--:|--:|--:|--:|--:|--:|--:|--:|",
+    ]
+    for step in result["steps"]:
+        lag = step["loop_lag"]
+        lag_text = "n/a" if lag["mean_ms"] is None else f"{lag['mean_ms']} / {lag['p99_ms'] if lag['p99_ms'] is not None else '>5000'}"
+        latency = step["latency_ms"]
+        lines.append(
+            f"| {step['concurrency']} | {step['requests']} | {step['error_rate'] * 100:.1f} | {step['throughput_rps']} "
+            f"| {latency['p50']} | {latency['p95']} | {latency['p99']} | {lag_text} | {step['rss_mb']} |"
+        )
+
+    capacity = result["capacity"]
+    lines += ["", f"**Limit:** {capacity['limit']}"]
+    sustainable = capacity["sustainable"]
+    if sustainable:
+        lines.append(
+            f"**Sustainable per worker:** {sustainable['per_worker_concurrency']} concurrent requests, "
+            f"{sustainable['per_worker_rps']} req/s (p95 {sustainable['p95_ms']}ms)"
+        )
+    else:
+        lines.append("**Sustainable per worker:** none of the steps met the SLO and error budget")
+    if capacity["recommended_workers"]:
+        targets = []
+        if config["target_concurrency"]:
+            targets.append(f"{config['target_concurrency']} concurrent requests")
+        if config["target_rps"]:
+            targets.append(f"{config['target_rps']} req/s")
+        lines.append(f"**Recommended workers** for {' and '.join(targets)}: {capacity['recommended_workers']}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp load against the API with every upstream faked")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="generate-leads")
+    parser.add_argument("--steps", default="1,2,4,8,16", help="comma-separated client counts")
+    parser.add_argument("--step-duration", type=float, default=20, help="seconds of load per step")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers to start")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per request (s)")
+    parser.add_argument("--max-results", type=int, default=5, help="max_results of /generate-leads requests")
+    parser.add_argument("--emails-per-request", type=int, default=5, help="leads per /send-emails request")
+    parser.add_argument("--send-ratio", type=float, default=0.25, help="share of /send-emails requests in mixed")
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help="per-upstream seconds, e.g. openai=0.8,site=0.3")
+    parser.add_argument("--error-rate", default="", help="per-upstream failure fraction, e.g. site=0.05")
+    parser.add_argument("--smtp-latency", type=float, default=0.002, help="SMTP sink delay per command (s)")
+    parser.add_argument("--slo-p95-ms", type=float, default=0, help="p95 latency objective (0 = none)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="error budget per step")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="throughput gain a step must add to count as scaling")
+    parser.add_argument("--target-concurrency", type=int, default=0, help="peak concurrent requests to size for")
+    parser.add_argument("--target-rps", type=float, default=0, help="peak request rate to size for")
+    parser.add_argument("--output", help="report base path (default: benchmarks/results/load-<timestamp>)")
+    args = parser.parse_args()
+
+    steps = [int(step) for step in args.steps.split(",") if step.strip()]
+    fakes = FakeUpstreams(
+        latency=parse_mapping(args.latency),
+        error_rate=parse_mapping(args.error_rate),
+        smtp_latency=args.smtp_latency
+    ).start()
+
+    workdir = tempfile.mkdtemp(prefix="leadgen-load-")
+    env = dict(os.environ)
+    env.update(fakes.environment())
+    env.update({
+        "LEAD_STORE_PATH": os.path.join(workdir, "leads.db"),
+        "OUTBOX_PATH": os.path.join(workdir, "outbox.db"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "WARMUP_ON_STARTUP": "false",
+    })
+    log_path = os.path.join(workdir, "server.log")
+
+    result: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "steps": [],
+    }
+    process, base_url = start_server(args, env, log_path)
+    print(f"Server on {base_url} (log: {log_path}); fakes on {fakes.base_url}")
+    try:
+        workload = Workload(args.scenario, args.max_results, args.emails_per_request, args.send_ratio)
+        # One untimed request so imports and first-use client setup stay out of step 1
+        asyncio.run(run_step(base_url, workload, 1, 0.001, args.timeout))
+        for concurrency in steps:
+            step = asyncio.run(run_step(base_url, workload, concurrency, args.step_duration, args.timeout))
+            result["steps"].append(step)
+            print(
+                f"  {concurrency:>4} clients: {step['throughput_rps']:>8.2f} req/s  "
+                f"p95 {step['latency_ms']['p95']:>9.1f}ms  errors {step['error_rate']:.1%}  "
+                f"loop lag p99 {step['loop_lag']['p99_ms']}ms  RSS {step['rss_mb']}MB"
+            )
+    finally:
+        stop_server(process)
+        result["upstreams"] = fakes.stats()
+        fakes.stop()
+
+    result["capacity"] = analyze(result["steps"], args)
+    report = render_report(result)
+
+    base = args.output or os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    with open(base + ".json", "w") as f:
+        json.dump(result, f, indent=2)
+    with open(base + ".md", "w") as f:
+        f.write(report)
+
+    print("\n" + report)
+    print(f"Written to {base}.json and {base}.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Event-loop lag and throughput of page parsing at different scrape concurrency.
+
+Scans fake business websites with the extractor's page reduction at several
+concurrency levels, once per parse executor (inline on the event loop, thread
+pool, process pool). Every simulated scrape first awaits a short I/O wait, as
+a real fetch would, and a ticker samples how late the loop runs its timers:
+that lag is what parsing adds to every other request on the worker.
+
+Usage (from backend/):
+    python -m benchmarks.parse_bench
+    python -m benchmarks.parse_bench --site-kb 400 --pages 200 --concurrency 1,8,32 --executors inline,process
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_suite import RESULTS_DIR, percentile
+from benchmarks.fakes import build_site
+
+
+async def sample_lag(interval: float, lags: List[float]):
+    """Record how late each timer of the given interval fires, until cancelled."""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def run_level(parser, pages: List[str], concurrency: int, io_wait: float, max_chars: int) -> Dict[str, float]:
+    """Reduce every page with `concurrency` simulated scrapes in flight."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for page in pages:
+        queue.put_nowait(page)
+    emails = 0
+
+    async def scrape():
+        nonlocal emails
+        while not queue.empty():
+            page = queue.get_nowait()
+            await asyncio.sleep(io_wait)
+            emails += len((await parser.reduce(page, max_chars))["emails"])
+
+    lags: List[float] = []
+    sampler = asyncio.create_task(sample_lag(0.005, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(scrape() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    if not emails:
+        raise RuntimeError("Parsing found no e-mail addresses")
+    return {
+        "pages_per_s": round(len(pages) / elapsed, 1),
+        "total_s": round(elapsed, 3),
+        "loop_lag_p50_ms": round(percentile(lags, 0.5) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(lags, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+    }
+
+
+def render_table(results: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    lines = [
+        "| executor | concurrency | pages/s | loop lag p50 ms | p99 ms | max ms |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for executor, levels in results.items():
+        for concurrency, row in levels.items():
+            lines.append(
+                f"| {executor} | {concurrency} | {row['pages_per_s']} | {row['loop_lag_p50_ms']} "
+                f"| {row['loop_lag_p99_ms']} | {row['loop_lag_max_ms']} |"
+            )
+    return "\n".join(lines)
+
+
+async def run(args) -> Dict[str, Any]:
+    from services.parse_pool import PageParser
+
+    pages = [build_site(index, args.site_kb) for index in range(args.pages)]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for executor in args.executors.split(","):
+        parser = PageParser(executor=executor, workers=args.workers)
+        parser.inline_below = 0  # measure the executor itself, whatever the page size
+        await asyncio.to_thread(parser.warm_up)
+        try:
+            results[executor] = {
+                str(level): await run_level(parser, pages, level, args.io_wait, args.max_chars)
+                for level in levels
+            }
+        finally:
+            parser.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=120, help="pages per concurrency level")
+    parser.add_argument("--site-kb", type=int, default=200, help="size of each page")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="scrapes in flight, comma-separated")
+    parser.add_argument("--executors", default="inline,thread,process", help="parse executors to compare")
+    parser.add_argument("--workers", type=int, default=2, help="pool size of the thread and process executors")
+    parser.add_argument("--io-wait", type=float, default=0.02, help="simulated fetch time per page (s)")
+    parser.add_argument("--max-chars", type=int, default=4000, help="prompt slice kept from each page")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/parse-<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "parse": asyncio.run(run(args)),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"parse-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(render_table(results["parse"]))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
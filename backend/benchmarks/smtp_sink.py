@@ -0,0 +1,151 @@
+"""
+Minimal local SMTP sink for benchmarks.
+
+Accepts EHLO/HELO, AUTH (any credentials), MAIL, RCPT, DATA, RSET, NOOP and
+QUIT over plain TCP and discards the messages. Latency per command and a
+per-connection message limit can be configured to mimic a real provider.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPSink:
+    """Asyncio SMTP server that counts and drops every message it receives."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        command_latency: float = 0.0,
+        connect_latency: float = 0.0,
+        max_messages_per_connection: int = 0,
+        reject_rate: float = 0.0
+    ):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 = pick a free one)
+            command_latency: Seconds to wait before answering each command
+            connect_latency: Extra seconds before the greeting (TCP + TLS cost)
+            max_messages_per_connection: Answer 421 and close after this many
+                messages on one connection (0 = unlimited)
+            reject_rate: Fraction of RCPT commands answered with 451 (deferral)
+        """
+        self.host = host
+        self.port = port
+        self.command_latency = command_latency
+        self.connect_latency = connect_latency
+        self.max_messages_per_connection = max_messages_per_connection
+        self.reject_rate = reject_rate
+        self.messages_received = 0
+        self.connections = 0
+        self._rcpt_count = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> int:
+        """Start listening; returns the bound port."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _should_reject(self) -> bool:
+        if self.reject_rate <= 0:
+            return False
+        # Deterministic spread instead of randomness, so runs are comparable
+        self._rcpt_count += 1
+        return (self._rcpt_count * self.reject_rate) % 1 < self.reject_rate
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        sent_here = 0
+
+        async def reply(line: str):
+            if self.command_latency:
+                await asyncio.sleep(self.command_latency)
+            writer.write((line + "\r\n").encode())
+            await writer.drain()
+
+        try:
+            if self.connect_latency:
+                await asyncio.sleep(self.connect_latency)
+            await reply("220 localhost SMTP sink ready")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    writer.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n")
+                    await reply("250 8BITMIME")
+                elif verb == "HELO":
+                    await reply("250 localhost")
+                elif verb == "AUTH":
+                    parts = command.split()
+                    if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                        await reply("334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await reply("334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif len(parts) == 2:
+                        await reply("334 ")
+                        await reader.readline()
+                    await reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    if self.max_messages_per_connection and sent_here >= self.max_messages_per_connection:
+                        await reply("421 Too many messages on this connection")
+                        break
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    if self._should_reject():
+                        await reply("451 Try again later")
+                    else:
+                        await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while True:
+                        data_line = await reader.readline()
+                        if not data_line or data_line in (b".\r\n", b".\n"):
+                            break
+                    sent_here += 1
+                    self.messages_received += 1
+                    await reply("250 OK queued")
+                elif verb in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per command")
+    args = parser.parse_args()
+
+    sink = SMTPSink(port=args.port, command_latency=args.latency)
+    port = await sink.start()
+    print(f"SMTP sink listening on 127.0.0.1:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,20 +3,36 @@ Configuration settings for the application.
 Loads environment variables and provides centralized access to configuration.
 """
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Optional, Dict
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
-    # API Keys
-    openai_api_key: str
-    serper_api_key: str
+    # API Keys (empty = integration not configured; reported by /health)
+    openai_api_key: str = ""
+    serper_api_key: str = ""
     google_maps_api_key: str = ""  
 
+    # API endpoints (overridable to point at local stand-ins, e.g. the benchmark fakes)
+    openai_base_url: str = ""              # empty = OpenAI default
+    serper_api_url: str = "https://google.serper.dev/search"
+    google_maps_base_url: str = "https://maps.googleapis.com"
+    google_sheets_api_endpoint: str = ""   # set = use this endpoint with anonymous credentials
+
     # Google Sheets Configuration
     google_sheets_credentials_file: str = "credentials.json"
-    google_sheet_id: str
+    google_sheet_id: str = ""
+    sheets_flush_batch_size: int = 50      # leads per batched append
+    sheets_flush_interval: float = 5.0     # seconds between time-triggered flushes
+    sheets_flush_max_retries: int = 3
+
+    # Local Lead Store
+    lead_store_path: str = "leads.db"
+    lead_index_use_bloom: bool = False     # Bloom filter front for very large stores
+    lead_index_bloom_capacity: int = 1_000_000
+    lead_index_bloom_error_rate: float = 0.001
+    lead_store_seed_from_sheet: bool = True  # import the sheet's leads once, when the store is first used
 
     # SMTP Configuration
     smtp_host: str = "smtp.gmail.com"
@@ -25,6 +41,131 @@ class Settings(BaseSettings):
     smtp_password: Optional[str] = None
     smtp_from_email: Optional[str] = None
     smtp_from_name: str = "SiteScout AI"
+    smtp_security: str = "auto"            # auto (465 = TLS, else STARTTLS), tls, starttls, none
+    smtp_pool_size: int = 4
+    smtp_max_messages_per_connection: int = 100
+    smtp_idle_timeout: float = 30.0        # seconds before an idle session is reopened
+    smtp_send_concurrency: int = 4         # concurrent bulk send workers
+    smtp_rate_per_minute: Optional[float] = None  # overrides the provider default
+    smtp_daily_cap: Optional[int] = None          # overrides the provider default
+    smtp_max_attempts: int = 3             # tries per recipient on 4xx deferrals
+    smtp_retry_base_delay: float = 5.0     # seconds, doubled per attempt
+
+    # Email Validation
+    email_validation_enabled: bool = True          # validate before sending
+    email_validation_during_extraction: bool = False
+    email_skip_role_accounts: bool = False         # info@, sales@, noreply@ ...
+    email_mx_cache_ttl: float = 3600.0             # seconds to cache a good domain
+    email_mx_negative_ttl: float = 600.0           # seconds to cache a bad domain
+    email_dns_timeout: float = 3.0
+    email_dns_concurrency: int = 20
+    email_dns_nameservers: str = ""                # comma-separated; empty = system resolver
+    email_dns_port: int = 53
+
+    # Email Outbox
+    outbox_path: str = "outbox.db"
+    outbox_batch_size: int = 50            # messages claimed per dispatch round
+    outbox_poll_interval: float = 2.0      # seconds between checks for due messages
+    outbox_wait_timeout: float = 300.0     # how long /send-emails waits for its campaign
+
+    # LLM Token Budgeting
+    request_token_budget: int = 0          # per-request cap, 0 = unlimited
+    token_budget_low_watermark: float = 0.25
+    extraction_max_html_chars: int = 4000
+    extraction_max_tokens: int = 500
+    email_max_tokens: int = 350
+
+    # Lead Scheduling
+    fast_lane_concurrency: int = 10        # leads without a website
+    slow_lane_concurrency: int = 4         # leads that need scraping + extraction
+
+    # Lead Scoring
+    lead_overfetch_factor: int = 2         # candidates fetched per requested lead
+    lead_score_weights: Dict[str, float] = {
+        "rating": 0.30,
+        "reviews": 0.20,
+        "no_website": 0.25,
+        "is_place": 0.15,
+        "domain": 0.10
+    }
+
+    # Multi-query lead campaigns (/generate-leads/campaign)
+    campaign_max_queries: int = 50
+    campaign_search_concurrency: int = 5   # searches run at once
+
+    # Request deadlines (deadline_ms on lead requests)
+    deadline_reserve_ms: int = 300         # kept back for templates, saving and the response
+    deadline_reserve_fraction: float = 0.25  # at most this share of a short deadline is kept back
+    deadline_min_scrape_ms: int = 1000     # skip scraping with less time left
+    deadline_extraction_ms: int = 4000     # expected LLM extraction time; use search data below it
+    deadline_email_ms: int = 3000          # expected LLM email time; use the template below it
+
+    # Multi-tenancy: API keys identify tenants; without tenants the API is open
+    # JSON: {"name": {"api_key": "...", "weight": 1, "requests_per_minute": 0,
+    #                 "daily_leads": 0, "daily_emails": 0}}  (0 = unlimited)
+    tenants: Dict[str, Dict[str, Any]] = {}
+    api_key_header: str = "X-API-Key"
+
+    # Request coalescing
+    coalesce_requests: bool = True         # share identical in-flight searches, scrapes, extractions and runs
+    disconnect_poll_interval: float = 0.5  # seconds between client-disconnect checks
+
+    # Debug tracing and profiling (debug/profile on /generate-leads)
+    debug_requests_enabled: bool = False   # allow per-request timing waterfalls and profiles
+    profile_dir: str = "profiles"          # where request profiles are written
+    profile_max_files: int = 20            # newest profiles kept; older ones are deleted
+    profile_interval_ms: int = 5           # sampling interval of the profiler
+    loop_lag_interval_ms: int = 100        # event-loop lag sampling for /metrics (0 = off)
+
+    # Record/replay of outbound API traffic
+    traffic_mode: str = "off"              # off | record | replay
+    traffic_archive_path: str = "traffic.db"
+    traffic_replay_latency: float = 0.0    # replay recorded latencies times this factor (0 = instant)
+    traffic_replay_miss: str = "error"     # error | live: unrecorded requests fail or go to the real API
+
+    # Shared cache of search results, place details, pages and LLM outputs
+    cache_backend: str = "off"             # off | memory (per worker) | sqlite (workers of a host) | redis
+    cache_path: str = "cache.db"           # sqlite backend
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_redis_pool_size: int = 10
+    cache_timeout: float = 2.0             # seconds per backend operation before running uncached
+    cache_max_entries: int = 10000         # memory backend
+    cache_search_ttl: int = 3600           # seconds per kind of result; 0 disables that kind
+    cache_details_ttl: int = 86400
+    cache_page_ttl: int = 3600
+    cache_extraction_ttl: int = 604800
+    cache_email_ttl: int = 0               # generated emails are meant to vary between runs
+    cache_lock_ttl: float = 30.0           # one worker computes a miss; others wait up to this long
+    cache_lock_poll_ms: int = 50
+
+    # CPU-bound page parsing off the event loop
+    parse_executor: str = "process"        # process | thread (only for GIL-releasing parsers) | inline
+    parse_workers: int = 2                 # pool size (0 = one per CPU)
+    parse_max_queue: int = 64              # pages handed to the pool beyond its workers; more wait on the loop
+    parse_inline_max_kb: int = 16          # smaller pages are cheaper to scan than to ship to a worker
+
+    # Bulk lead export
+    export_batch_size: int = 2000          # leads read and encoded per chunk (one Parquet row group)
+
+    # Incremental lead refresh
+    refresh_concurrency: int = 4           # stored leads re-checked at once
+
+    # Adaptive (AIMD) concurrency of outbound stages
+    adaptive_concurrency: bool = True      # off = no per-stage limits
+    adaptive_concurrency_limits: Dict[str, Dict[str, int]] = {
+        "scrape": {"initial": 8, "min": 2, "max": 64},
+        "extraction": {"initial": 4, "min": 1, "max": 32},
+        "email_generation": {"initial": 4, "min": 1, "max": 32},
+        "place_search": {"initial": 2, "min": 1, "max": 8},
+        "place_details": {"initial": 4, "min": 1, "max": 16},
+        "smtp": {"initial": 4, "min": 1, "max": 4},  # never above smtp_pool_size
+    }
+    adaptive_latency_tolerance: float = 2.0    # back off when a window's median latency exceeds this x usual
+    adaptive_error_threshold: float = 0.1      # back off when more of a window fails with 429 / 5xx / timeouts
+    adaptive_backoff: float = 0.5              # limit multiplier on back-off
+
+    # Startup
+    warmup_on_startup: bool = True         # initialize API clients in the background
 
     # Server Configuration
     host: str = "0.0.0.0"
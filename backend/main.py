@@ -1,11 +1,14 @@
 """
 Main FastAPI application for Lead Generation & Cold Email Automation System.
 """
+import json
 import logging
-from typing import List, Dict, Any
-from fastapi import FastAPI, HTTPException
+import math
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Tuple
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import asyncio
 
@@ -16,8 +19,31 @@ from services import (
     extractor_service,
     email_generator,
     sheets_service,
-    mail_service
+    lead_store,
+    lead_index,
+    sheets_sink,
+    mail_service,
+    email_validation_service,
+    outbox,
+    lead_scheduler,
+    lead_scorer,
+    traffic_archive,
+    tenant_service,
+    campaign_planner,
+    shared_cache,
+    page_parser,
+    lead_refresher,
+    stage_limits
 )
+from services.lead_refresh import STATUSES as REFRESH_STATUSES, snapshot_inputs
+from services.tenants import Tenant, bind_tenant
+from utils import export, metrics, tracing
+from utils.deadline import current_deadline, start_deadline
+from utils.loop_monitor import LoopLagMonitor
+from utils.normalize import has_website, normalize_email
+from utils.profiler import SamplingProfiler, profile_path, prune_profiles
+from utils.singleflight import SingleFlight
+from utils.token_budget import start_token_budget
 
 # Configure logging
 logging.basicConfig(
@@ -43,15 +69,174 @@ app.add_middleware(
 )
 
 
+# Identical /generate-leads requests in flight share one pipeline run
+lead_generation_flight = SingleFlight("generate-leads", enabled=settings.coalesce_requests)
+
+loop_monitor = LoopLagMonitor(settings.loop_lag_interval_ms / 1000)
+
+
+def register_service_metrics():
+    """Export counters the services keep themselves, read when /metrics is scraped."""
+    flights = {
+        "generate-leads": lead_generation_flight,
+        "search": search_service.inflight,
+        "scrape": scraper_service.inflight,
+        "extraction": extractor_service.inflight,
+        "dns_lookup": email_validation_service.inflight,
+    }
+    caches = {
+        "email_mx": lambda: (
+            email_validation_service.cache_hits,
+            email_validation_service.cache_hits + email_validation_service.cache_misses
+        ),
+        "lead_index": lambda: (lead_index.hits, lead_index.checks),
+    }
+    
+    def hit_ratio(hits: int, lookups: int) -> float:
+        return hits / lookups if lookups else 0.0
+    
+    metrics.registry.counter(
+        "leadgen_cache_hits_total", "Cache and index lookups that hit", ["cache"],
+        callback=lambda: {name: read()[0] for name, read in caches.items()}
+    )
+    metrics.registry.counter(
+        "leadgen_cache_lookups_total", "Cache and index lookups", ["cache"],
+        callback=lambda: {name: read()[1] for name, read in caches.items()}
+    )
+    metrics.registry.gauge(
+        "leadgen_cache_hit_ratio", "Share of lookups that hit since startup", ["cache"],
+        callback=lambda: {name: hit_ratio(*read()) for name, read in caches.items()}
+    )
+    metrics.registry.counter(
+        "leadgen_coalesce_executions_total", "Coalesced operations actually executed", ["flight"],
+        callback=lambda: {name: flight.executions for name, flight in flights.items()}
+    )
+    metrics.registry.counter(
+        "leadgen_coalesced_total", "Callers that joined an identical in-flight operation", ["flight"],
+        callback=lambda: {name: flight.coalesced for name, flight in flights.items()}
+    )
+    metrics.registry.gauge(
+        "leadgen_coalesce_in_flight", "Distinct coalesced operations running", ["flight"],
+        callback=lambda: {name: flight.in_flight for name, flight in flights.items()}
+    )
+    metrics.registry.gauge(
+        "leadgen_pool_size", "Configured size of outbound connection pools", ["pool"],
+        callback=lambda: {
+            "smtp": mail_service.pool.size,
+            "dns": email_validation_service.concurrency,
+            "fast_lane": lead_scheduler.fast_lane_concurrency,
+            "slow_lane": lead_scheduler.slow_lane_concurrency,
+        }
+    )
+    metrics.registry.gauge(
+        "leadgen_smtp_pool_idle_connections", "Open SMTP sessions waiting for reuse",
+        callback=lambda: mail_service.pool.idle_connections
+    )
+    metrics.registry.counter(
+        "leadgen_smtp_connections_opened_total", "SMTP sessions opened by the pool",
+        callback=lambda: mail_service.pool.connections_opened
+    )
+    metrics.registry.gauge(
+        "leadgen_sheets_pending_leads", "Stored leads not yet replicated to Google Sheets",
+        callback=lambda: sheets_sink.pending
+    )
+    metrics.registry.counter(
+        "leadgen_tenant_requests_total", "Requests per tenant by admission outcome", ["tenant", "outcome"],
+        callback=lambda: {
+            (name, outcome): tenant.usage[key]
+            for name, tenant in tenant_service.tenants.items()
+            for outcome, key in (("accepted", "requests"), ("rate_limited", "rate_limited"), ("quota_exceeded", "quota_exceeded"))
+        }
+    )
+    metrics.registry.counter(
+        "leadgen_tenant_usage_total", "Leads generated and emails queued per tenant", ["tenant", "kind"],
+        callback=lambda: {
+            (name, kind): tenant.usage[kind]
+            for name, tenant in tenant_service.tenants.items()
+            for kind in ("leads", "emails")
+        }
+    )
+    metrics.registry.counter(
+        "leadgen_tenant_queue_wait_seconds_total", "Time leads waited for a scheduler lane, per tenant", ["tenant", "lane"],
+        callback=lambda: {
+            (name, lane): stats["wait_seconds_total"]
+            for lane, tenants in lead_scheduler.queue_stats().items()
+            for name, stats in tenants.items()
+        }
+    )
+    metrics.registry.gauge(
+        "leadgen_tenant_queued_leads", "Leads waiting for a scheduler lane, per tenant", ["tenant", "lane"],
+        callback=lambda: {
+            (name, lane): stats["waiting"]
+            for lane, tenants in lead_scheduler.queue_stats().items()
+            for name, stats in tenants.items()
+        }
+    )
+    metrics.registry.counter(
+        "leadgen_traffic_archive_calls_total", "Outbound calls recorded to or replayed from the traffic archive", ["outcome"],
+        callback=lambda: {
+            "recorded": traffic_archive.recorded,
+            "replayed": traffic_archive.replayed,
+            "missed": traffic_archive.misses,
+        }
+    )
+    metrics.registry.counter(
+        "leadgen_shared_cache_requests_total", "Shared cache lookups by kind of result and outcome", ["namespace", "outcome"],
+        callback=lambda: {
+            (namespace, outcome): count
+            for namespace, counts in shared_cache.counts.items()
+            for outcome, count in counts.items()
+        }
+    )
+    metrics.registry.counter(
+        "leadgen_parse_pages_total", "Pages scanned on the parse pool or inline on the event loop", ["where"],
+        callback=lambda: {
+            "pool": page_parser.pooled,
+            "inline": page_parser.inline,
+            "pool_failure": page_parser.failures,
+        }
+    )
+    metrics.registry.gauge(
+        "leadgen_parse_waiting_pages", "Pages waiting for room on the parse pool",
+        callback=lambda: page_parser.waiting
+    )
+    metrics.registry.gauge(
+        "leadgen_adaptive_concurrency_limit", "Current adaptive in-flight limit per outbound stage", ["stage"],
+        callback=lambda: {stage: limiter.limit for stage, limiter in stage_limits.limiters.items()}
+    )
+    metrics.registry.gauge(
+        "leadgen_adaptive_concurrency_in_flight", "Outbound calls holding a slot per stage", ["stage"],
+        callback=lambda: {stage: limiter.in_flight for stage, limiter in stage_limits.limiters.items()}
+    )
+    metrics.registry.gauge(
+        "leadgen_adaptive_concurrency_waiting", "Outbound calls waiting for a slot per stage", ["stage"],
+        callback=lambda: {stage: limiter.waiting for stage, limiter in stage_limits.limiters.items()}
+    )
+    metrics.registry.counter(
+        "leadgen_adaptive_concurrency_changes_total", "Adaptive limit raises and back-offs per stage", ["stage", "direction"],
+        callback=lambda: {
+            (stage, direction): count
+            for stage, limiter in stage_limits.limiters.items()
+            for direction, count in (("up", limiter.increases), ("down", limiter.decreases))
+        }
+    )
+
+
 # Pydantic Models
 class LeadGenerationRequest(BaseModel):
     """Request model for lead generation."""
     query: str = Field(..., description="Search query (e.g., 'best cafes in bhopal')")
     max_results: int = Field(default=10, ge=1, le=50, description="Maximum number of results")
+    skip_known: bool = Field(default=True, description="Skip businesses already in the lead store")
+    token_budget: Optional[int] = Field(default=None, ge=0, description="LLM token cap for this request (0 = unlimited)")
+    deadline_ms: Optional[int] = Field(default=None, ge=100, description="Latency budget; the pipeline degrades to answer in time")
+    debug: bool = Field(default=False, description="Return a timing waterfall with a span per stage of every lead")
+    profile: bool = Field(default=False, description="Also capture a sampling profile of the request to a local file")
 
 
 class LeadData(BaseModel):
     """Model for a single lead."""
+    id: Optional[int] = None  # row id in the lead store, once saved
     business_name: str
     email: str
     phone: str
@@ -60,6 +245,11 @@ class LeadData(BaseModel):
     address: str
     website_exists: bool
     cold_email: str
+    score: Optional[float] = None
+    email_status: Optional[str] = None  # set when validated during extraction
+    path: Dict[str, str] = Field(default_factory=dict, description="How each stage produced this lead")
+    degraded: bool = False  # a stage fell back because of the deadline
+    queries: Optional[List[str]] = None  # campaign queries that found this business
 
 
 class LeadGenerationResponse(BaseModel):
@@ -68,13 +258,145 @@ class LeadGenerationResponse(BaseModel):
     message: str
     total_leads: int
     leads: List[LeadData]
+    saved_to_sheets: bool  # stored locally and queued for Sheets replication
+    token_usage: Optional[Dict[str, Any]] = None
+    deadline: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, Any]] = None  # debug waterfall
+    profile_path: Optional[str] = None
+
+
+class LeadCampaignRequest(BaseModel):
+    """Request model for a multi-query lead campaign."""
+    queries: List[str] = Field(..., min_length=1, description="Related search queries, e.g. one per neighbourhood")
+    total_leads: int = Field(default=50, ge=1, le=500, description="Leads to produce across all queries")
+    balance: bool = Field(default=True, description="Spread leads across queries instead of taking the overall best")
+    skip_known: bool = Field(default=True, description="Skip businesses already in the lead store")
+    token_budget: Optional[int] = Field(default=None, ge=0, description="LLM token cap for the campaign (0 = unlimited)")
+    deadline_ms: Optional[int] = Field(default=None, ge=100, description="Latency budget; the pipeline degrades to answer in time")
+
+
+class LeadCampaignResponse(BaseModel):
+    """Response model for a multi-query lead campaign."""
+    success: bool
+    message: str
+    total_leads: int
+    leads: List[LeadData]
+    queries: Dict[str, Dict[str, Any]]  # per query: results, unique, duplicates, leads (and error)
+    duplicates_removed: int
     saved_to_sheets: bool
+    token_usage: Optional[Dict[str, Any]] = None
+    deadline: Optional[Dict[str, Any]] = None
+
+
+class LeadRefreshRequest(BaseModel):
+    """Request model for refreshing stored leads."""
+    query: Optional[str] = Field(default=None, description="Only leads stored for this search query")
+    limit: int = Field(default=100, ge=1, le=10000, description="Stored leads to look at, oldest first")
+    min_age_hours: float = Field(default=24.0, ge=0, description="Skip leads created or refreshed more recently")
+    check_places: bool = Field(default=True, description="Re-fetch Google Maps details of each place")
+    regenerate_emails: bool = Field(default=True, description="Rewrite cold emails whose inputs changed")
+    token_budget: Optional[int] = Field(default=None, ge=0, description="LLM token cap for the refresh (0 = unlimited)")
 
 
 class SendEmailRequest(BaseModel):
     """Request model for sending emails."""
     leads: List[Dict[str, Any]]
     subject: str = "Business Opportunity"
+    campaign_id: Optional[str] = Field(default=None, description="Optional id; resubmitting the same campaign never double-sends")
+
+
+async def warm_up_services():
+    """
+    Initialize API clients in the background so the first request is fast.
+    
+    Each integration is warmed independently; a misconfigured one is logged
+    and left to fail on use instead of taking the API down.
+    """
+    for name, service in (
+        ("Google Sheets", sheets_service),
+        ("Google Maps", search_service),
+        ("OpenAI extraction", extractor_service),
+        ("OpenAI email generation", email_generator),
+        ("HTML parse pool", page_parser),
+    ):
+        try:
+            await asyncio.to_thread(service.warm_up)
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+    logger.info("Service warm-up finished")
+
+
+register_service_metrics()
+
+
+@app.on_event("startup")
+async def startup():
+    """Load the lead index and start background workers."""
+    await asyncio.to_thread(lead_index.load)
+    sheets_sink.start()
+    outbox.start()
+    loop_monitor.start()
+    if settings.warmup_on_startup:
+        app.state.warmup_task = asyncio.create_task(warm_up_services())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Flush pending Sheets writes and let the outbox finish its batch before exiting."""
+    await loop_monitor.stop()
+    await outbox.stop()
+    await sheets_sink.stop()
+    lead_store.close()
+    traffic_archive.close()
+    await shared_cache.close()
+    await mail_service.pool.close()
+    page_parser.shutdown()
+
+
+async def save_leads(leads: List[Dict[str, Any]], query: str) -> bool:
+    """Write leads to the local store and queue them for Sheets replication."""
+    try:
+        ids = await asyncio.to_thread(lead_store.add_leads, leads, query)
+        for lead, lead_id in zip(leads, ids):
+            lead["id"] = lead_id
+        lead_index.add_leads(leads)
+        sheets_sink.notify(len(leads))
+        return True
+    except Exception as e:
+        logger.error(f"Error storing leads: {e}", exc_info=True)
+        return False
+
+
+async def authenticate(http_request: Request) -> Tenant:
+    """
+    Identify the calling tenant by API key and apply its request rate limit.
+    
+    The tenant is bound to the request context, so the lead scheduler queues
+    its work fairly against other tenants.
+    """
+    tenant = tenant_service.authenticate(http_request.headers.get(settings.api_key_header))
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Missing or unknown API key")
+    if not tenant_service.admit(tenant):
+        raise HTTPException(
+            status_code=429,
+            detail=f"Request rate limit exceeded for tenant {tenant.name}",
+            headers={"Retry-After": str(math.ceil(tenant.requests.retry_after()))}
+        )
+    bind_tenant(tenant)
+    return tenant
+
+
+def reserve_quota(tenant: Tenant, kind: str, count: int, partial: bool = False) -> int:
+    """Reserve daily quota ("leads" or "emails"), raising 429 when none is left."""
+    reserved = tenant_service.reserve(tenant, kind, count, partial)
+    if count and not reserved:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Daily {kind} quota exceeded for tenant {tenant.name} "
+                   f"({getattr(tenant, kind).remaining()} left today)"
+        )
+    return reserved
 
 
 # API Endpoints
@@ -88,147 +410,608 @@ async def root():
     }
 
 
+async def process_search_result(search_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn one search result into a lead.
+    
+    Scrapes the website (or skips it if there is none), extracts business
+    data and generates the cold email. Records in "path" how each stage
+    produced its part, and flags the lead as degraded when the request
+    deadline forced a fallback.
+    """
+    url = search_result.get("link", "")
+    search_title = search_result.get("title", "")
+    
+    logger.info(f"Processing result: {search_title}")
+    path = {}
+    scrape_result = None
+    
+    # Check if business has website
+    if not has_website(url):
+        # Business without website
+        logger.info(f"Business without website: {search_title}")
+        path["scrape"] = "no_website"
+        business_data = await extractor_service.extract_business_data(
+            html_content="",
+            url="",
+            search_title=search_title,
+            search_data=search_result
+        )
+    else:
+        # Business with website - try to scrape
+        scrape_result = await scraper_service.scrape_website(url)
+        if scrape_result.get("success"):
+            path["scrape"] = "ok"
+        else:
+            path["scrape"] = "deadline" if scrape_result.get("deadline_skipped") else "failed"
+        
+        if scrape_result.get("success"):
+            business_data = await extractor_service.extract_business_data(
+                html_content=scrape_result["html_content"],
+                url=url,
+                search_title=search_title,
+                search_data=search_result
+            )
+        else:
+            # Failed to scrape - use search data
+            logger.warning(f"Failed to scrape {url}, using search data only")
+            business_data = await extractor_service.extract_business_data(
+                html_content="",
+                url=url,
+                search_title=search_title,
+                search_data=search_result
+            )
+    
+    path["extraction"] = business_data.pop("extraction_source", "llm")
+    
+    # Optionally check the scraped address before anyone mails it
+    if settings.email_validation_during_extraction and business_data.get("email"):
+        validation = await email_validation_service.validate(business_data["email"])
+        business_data["email_status"] = validation["status"]
+        if not email_validation_service.is_sendable(validation):
+            logger.info(f"Email {business_data['email']} is {validation['status']}: {validation['reason']}")
+    
+    # Step 4: Generate cold email
+    logger.info(f"Generating cold email for {business_data['business_name']}")
+    cold_email, path["email"] = await email_generator.compose(business_data)
+    business_data["cold_email"] = cold_email
+    business_data["path"] = path
+    business_data["degraded"] = "deadline" in path.values()
+    business_data["score"] = search_result.get("score")
+    business_data["place_id"] = search_result.get("place_id", "")
+    business_data["search_source"] = search_result.get("source", "")
+    business_data["queries"] = search_result.get("queries")
+    business_data["inputs"] = snapshot_inputs(search_result, scrape_result)
+    
+    return business_data
+
+
+async def search_for_leads(request: LeadGenerationRequest) -> List[Dict[str, Any]]:
+    """
+    Run the search step and keep the best-scoring candidates.
+    
+    Known businesses are skipped during the search itself, so they cost
+    no place-details call, scrape or LLM work. Over-fetches new candidates,
+    scores them all in one pass and returns only the top max_results,
+    raising 404 when nothing is found.
+    """
+    logger.info("Step 1: Searching Google...")
+    deadline = current_deadline()
+    try:
+        search_results = await asyncio.wait_for(
+            search_service.search(
+                query=request.query,
+                max_results=request.max_results * settings.lead_overfetch_factor,
+                exclude=lead_index.find_known if request.skip_known else None
+            ),
+            timeout=deadline.remaining() if deadline else None
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Deadline reached before the search completed"
+        )
+    
+    if not search_results:
+        raise HTTPException(
+            status_code=404,
+            detail="No search results found"
+        )
+    
+    logger.info(f"Found {len(search_results)} search results")
+    with tracing.span("rank"):
+        return lead_scorer.rank(search_results, request.max_results)
+
+
+async def cancel_on_disconnect(http_request: Request, work):
+    """
+    Await work, giving up on it if the client disconnects first.
+    
+    Raises:
+        HTTPException: 499 when the client went away
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected from {http_request.url.path}, cancelling")
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/generate-leads", response_model=LeadGenerationResponse)
-async def generate_leads(request: LeadGenerationRequest):
+async def generate_leads(
+    request: LeadGenerationRequest,
+    http_request: Request,
+    tenant: Tenant = Depends(authenticate)
+):
     """
     Main endpoint to generate leads from a search query.
     
+    Identical requests of the same tenant that arrive while one is running
+    wait for it and get the same response instead of running the pipeline
+    again. A client that
+    disconnects only stops waiting; the run is cancelled once nobody waits.
+    
+    max_results is capped by what is left of the tenant's daily lead quota;
+    only leads actually returned are charged, and a run shared by coalesced
+    requests is charged once.
+    
+    With debug (or profile) the request runs on its own and the response
+    carries its timing waterfall (and the path of the written profile).
+    """
+    if (request.debug or request.profile) and not settings.debug_requests_enabled:
+        raise HTTPException(status_code=403, detail="Debug tracing is disabled")
+    
+    reserved = reserve_quota(tenant, "leads", request.max_results, partial=True)
+    if reserved < request.max_results:
+        request = request.model_copy(update={"max_results": reserved})
+    used = 0
+    try:
+        if request.debug or request.profile:
+            response = await cancel_on_disconnect(http_request, run_traced_lead_generation(request))
+            used = response.total_leads
+            return response
+        
+        async def charged_run() -> Tuple[LeadGenerationResponse, Dict[str, bool]]:
+            # The run's bill travels with its shared result, so requests
+            # coalesced onto one run (all of one tenant) are charged once
+            return await run_lead_generation(request), {"charged": False}
+        
+        # Per tenant: a run is scheduled under its tenant's fair-queue weight
+        key = (
+            tenant.name,
+            " ".join(request.query.lower().split()),
+            request.max_results,
+            request.skip_known,
+            request.token_budget,
+            request.deadline_ms
+        )
+        response, bill = await cancel_on_disconnect(
+            http_request,
+            lead_generation_flight.do(key, charged_run)
+        )
+        if not bill["charged"]:
+            bill["charged"] = True
+            used = response.total_leads
+        return response
+    finally:
+        tenant_service.settle(tenant, "leads", reserved, used)
+
+
+async def run_traced_lead_generation(request: LeadGenerationRequest) -> LeadGenerationResponse:
+    """Run the pipeline under a trace and, if asked, the sampling profiler."""
+    trace = tracing.start_trace()
+    profiler = None
+    written_profile = None
+    if request.profile:
+        profiler = SamplingProfiler(interval=settings.profile_interval_ms / 1000)
+        profiler.start()
+    try:
+        response = await run_lead_generation(request)
+    finally:
+        if profiler:
+            profiler.stop()
+            written_profile = await asyncio.to_thread(
+                profiler.write, profile_path(settings.profile_dir, request.query)
+            )
+            logger.info(f"Wrote profile ({profiler.sample_count} samples) to {written_profile}")
+            await asyncio.to_thread(prune_profiles, settings.profile_dir, settings.profile_max_files)
+    
+    response.timings = trace.waterfall()
+    response.profile_path = written_profile
+    return response
+
+
+async def run_lead_generation(request: LeadGenerationRequest) -> LeadGenerationResponse:
+    """
+    Run the lead generation pipeline for one request.
+    
     Process:
-    1. Search Google using Serper API
+    1. Search Google using Serper API, then score and keep the best candidates
     2. Scrape websites (or skip if no website)
     3. Extract business data using OpenAI
     4. Generate cold emails
-    5. Save to Google Sheets
+    5. Save to the local lead store (replicated to Google Sheets in the background)
+    
+    Steps 2-4 run through the two-lane scheduler, so businesses without a
+    website are not queued behind slow scrapes.
     """
     try:
         logger.info(f"Starting lead generation for query: {request.query}")
+        token_budget = start_token_budget(request.token_budget)
+        deadline = start_deadline(request.deadline_ms)
         
         # Step 1: Search Google
-        logger.info("Step 1: Searching Google...")
-        search_results = await search_service.search(
-            query=request.query,
-            max_results=request.max_results
+        with tracing.span("search"):
+            search_results = await search_for_leads(request)
+        
+        # Step 2 & 3 & 4: Process results through the scheduler
+        indexed_leads = []
+        async for idx, business_data in lead_scheduler.run(
+            search_results, process_search_result, request.max_results
+        ):
+            indexed_leads.append((idx, business_data))
+            logger.info(f"Added lead {len(indexed_leads)}/{request.max_results}: {business_data['business_name']}")
+        
+        # Keep search order in the response
+        leads = [lead for _, lead in sorted(indexed_leads, key=lambda item: item[0])]
+        
+        if not leads:
+            if deadline and deadline.expired:
+                raise HTTPException(
+                    status_code=504,
+                    detail="Deadline reached before any lead was complete"
+                )
+            raise HTTPException(
+                status_code=404,
+                detail="No valid leads could be extracted"
+            )
+        
+        logger.info(
+            f"Successfully processed {len(leads)} leads "
+            f"({token_budget.total_tokens} tokens, ~${token_budget.estimated_cost():.4f})"
+        )
+        
+        # Step 5: Store locally; Google Sheets catches up in the background
+        logger.info("Step 5: Saving leads...")
+        with tracing.span("save"):
+            saved_to_sheets = await save_leads(leads, request.query)
+        
+        return LeadGenerationResponse(
+            success=True,
+            message=f"Successfully generated {len(leads)} leads",
+            total_leads=len(leads),
+            leads=[LeadData(**lead) for lead in leads],
+            saved_to_sheets=saved_to_sheets,
+            token_usage=token_budget.summary(),
+            deadline=deadline.summary() if deadline else None
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating leads: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
         )
+
+
+@app.post("/generate-leads/stream")
+async def generate_leads_stream(request: LeadGenerationRequest, tenant: Tenant = Depends(authenticate)):
+    """
+    Streaming variant of /generate-leads.
+    
+    Returns newline-delimited JSON: one {"type": "lead"} event per lead as soon
+    as it completes, followed by a final {"type": "summary"} event.
+    """
+    logger.info(f"Starting streamed lead generation for query: {request.query}")
+    reserved = reserve_quota(tenant, "leads", request.max_results, partial=True)
+    if reserved < request.max_results:
+        request = request.model_copy(update={"max_results": reserved})
+    token_budget = start_token_budget(request.token_budget)
+    deadline = start_deadline(request.deadline_ms)
+    try:
+        search_results = await search_for_leads(request)
+    except BaseException:
+        tenant_service.settle(tenant, "leads", reserved, 0)
+        raise
+    
+    async def event_stream():
+        leads = []
+        try:
+            async for idx, business_data in lead_scheduler.run(
+                search_results, process_search_result, request.max_results
+            ):
+                leads.append(business_data)
+                lead = LeadData(**business_data).model_dump()
+                yield json.dumps({"type": "lead", "index": idx, "lead": lead}) + "\n"
+            
+            saved_to_sheets = await save_leads(leads, request.query) if leads else False
+            yield json.dumps({
+                "type": "summary",
+                "success": bool(leads),
+                "total_leads": len(leads),
+                "saved_to_sheets": saved_to_sheets,
+                "token_usage": token_budget.summary(),
+                "deadline": deadline.summary() if deadline else None
+            }) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming leads: {e}", exc_info=True)
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        finally:
+            tenant_service.settle(tenant, "leads", reserved, len(leads))
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/generate-leads/campaign", response_model=LeadCampaignResponse)
+async def generate_lead_campaign(
+    request: LeadCampaignRequest,
+    http_request: Request,
+    tenant: Tenant = Depends(authenticate)
+):
+    """
+    Generate leads for many related queries in one run.
+    
+    Runs the searches concurrently, merges businesses found by several
+    queries before anything is scraped, and processes the merged set through
+    the shared scheduler. Each lead lists the queries that found it and the
+    response breaks results down per query.
+    """
+    queries = campaign_planner.normalize_queries(request.queries)
+    if not queries:
+        raise HTTPException(status_code=422, detail="No queries given")
+    if len(queries) > settings.campaign_max_queries:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.campaign_max_queries} queries per campaign"
+        )
+    
+    reserved = reserve_quota(tenant, "leads", request.total_leads, partial=True)
+    request = request.model_copy(update={"queries": queries, "total_leads": reserved})
+    used = 0
+    try:
+        response = await cancel_on_disconnect(http_request, run_lead_campaign(request))
+        used = response.total_leads
+        return response
+    finally:
+        tenant_service.settle(tenant, "leads", reserved, used)
+
+
+async def search_campaign(request: LeadCampaignRequest) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str]]:
+    """
+    Run every campaign search, a few at a time.
+    
+    Returns:
+        (results per query, error per query whose search failed); a failed
+        search leaves its query empty instead of failing the campaign
+    """
+    per_query = math.ceil(request.total_leads / len(request.queries)) * settings.lead_overfetch_factor
+    slots = asyncio.Semaphore(settings.campaign_search_concurrency)
+    deadline = current_deadline()
+    
+    async def search_one(query: str) -> List[Dict[str, Any]]:
+        async with slots:
+            return await asyncio.wait_for(
+                search_service.search(
+                    query=query,
+                    max_results=per_query,
+                    exclude=lead_index.find_known if request.skip_known else None
+                ),
+                timeout=deadline.remaining() if deadline else None
+            )
+    
+    outcomes = await asyncio.gather(*(search_one(query) for query in request.queries), return_exceptions=True)
+    results, errors = {}, {}
+    for query, outcome in zip(request.queries, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[query] = "deadline reached" if isinstance(outcome, asyncio.TimeoutError) else str(outcome)
+            logger.warning(f"Campaign search failed for '{query}': {errors[query]}")
+            outcome = []
+        results[query] = outcome
+    return results, errors
+
+
+async def run_lead_campaign(request: LeadCampaignRequest) -> LeadCampaignResponse:
+    """
+    Run a multi-query campaign: search all, merge, select, process, save.
+    
+    Leads are stored under the first query that found them.
+    """
+    try:
+        logger.info(f"Starting lead campaign: {len(request.queries)} queries, {request.total_leads} leads")
+        token_budget = start_token_budget(request.token_budget)
+        deadline = start_deadline(request.deadline_ms)
+        
+        with tracing.span("search"):
+            results_by_query, errors = await search_campaign(request)
+        merged, per_query = campaign_planner.merge(results_by_query)
+        for query, error in errors.items():
+            per_query[query]["error"] = error
         
-        if not search_results:
+        if not merged:
             raise HTTPException(
                 status_code=404,
                 detail="No search results found"
             )
         
-        logger.info(f"Found {len(search_results)} search results")
+        with tracing.span("rank"):
+            selected = campaign_planner.select(merged, request.total_leads, request.balance)
         
-        # Step 2 & 3: Process each result
-        leads = []
+        indexed_leads = []
+        async for idx, business_data in lead_scheduler.run(
+            selected, process_search_result, request.total_leads
+        ):
+            indexed_leads.append((idx, business_data))
         
-        for idx, search_result in enumerate(search_results):
-            if len(leads) >= request.max_results:
-                break
-            
-            url = search_result.get("link", "")
-            search_title = search_result.get("title", "")
-            
-            logger.info(f"Processing result {idx + 1}: {search_title}")
-            
-            # Check if business has website
-            if not url or url == "":
-                # Business without website
-                logger.info(f"Business without website: {search_title}")
-                business_data = await extractor_service.extract_business_data(
-                    html_content="",
-                    url="",
-                    search_title=search_title,
-                    search_data=search_result
-                )
-            else:
-                # Business with website - try to scrape
-                scrape_result = await scraper_service.scrape_website(url)
-                
-                if scrape_result.get("success"):
-                    business_data = await extractor_service.extract_business_data(
-                        html_content=scrape_result["html_content"],
-                        url=url,
-                        search_title=search_title,
-                        search_data=search_result
-                    )
-                else:
-                    # Failed to scrape - use search data
-                    logger.warning(f"Failed to scrape {url}, using search data only")
-                    business_data = await extractor_service.extract_business_data(
-                        html_content="",
-                        url=url,
-                        search_title=search_title,
-                        search_data=search_result
-                    )
-            
-            # Step 4: Generate cold email
-            logger.info(f"Generating cold email for {business_data['business_name']}")
-            cold_email = await email_generator.generate_cold_email(business_data)
-            business_data["cold_email"] = cold_email
-            
-            leads.append(business_data)
-            logger.info(f"Added lead {len(leads)}/{request.max_results}: {business_data['business_name']}")
+        leads = [lead for _, lead in sorted(indexed_leads, key=lambda item: item[0])]
         
         if not leads:
+            if deadline and deadline.expired:
+                raise HTTPException(
+                    status_code=504,
+                    detail="Deadline reached before any lead was complete"
+                )
             raise HTTPException(
                 status_code=404,
                 detail="No valid leads could be extracted"
             )
         
-        logger.info(f"Successfully processed {len(leads)} leads")
+        by_query: Dict[str, List[Dict[str, Any]]] = {}
+        for counts in per_query.values():
+            counts["leads"] = 0
+        for lead in leads:
+            by_query.setdefault(lead["queries"][0], []).append(lead)
+            for query in lead["queries"]:
+                per_query[query]["leads"] += 1
         
-        # Step 5: Save to Google Sheets
-        logger.info("Step 5: Saving to Google Sheets...")
-        saved_to_sheets = sheets_service.append_leads(leads)
+        with tracing.span("save"):
+            saved = [await save_leads(group, query) for query, group in by_query.items()]
         
-        return LeadGenerationResponse(
+        total_results = sum(counts["results"] for counts in per_query.values())
+        logger.info(
+            f"Campaign produced {len(leads)} leads from {len(merged)} unique of {total_results} results "
+            f"({token_budget.total_tokens} tokens, ~${token_budget.estimated_cost():.4f})"
+        )
+        
+        return LeadCampaignResponse(
             success=True,
-            message=f"Successfully generated {len(leads)} leads",
+            message=f"Successfully generated {len(leads)} leads for {len(request.queries)} queries",
             total_leads=len(leads),
             leads=[LeadData(**lead) for lead in leads],
-            saved_to_sheets=saved_to_sheets
+            queries=per_query,
+            duplicates_removed=total_results - len(merged),
+            saved_to_sheets=all(saved),
+            token_usage=token_budget.summary(),
+            deadline=deadline.summary() if deadline else None
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating leads: {e}", exc_info=True)
+        logger.error(f"Error running lead campaign: {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
 
+async def build_recipients(request: SendEmailRequest) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """
+    Pick leads with an email and a cold email and validate their addresses.
+    
+    Each recipient keeps the id of its stored lead, so the campaign can be
+    exported lead by lead; leads sent without one (e.g. from the stream
+    endpoint) are matched to the latest stored lead with their address.
+    
+    Returns:
+        (recipients to send to, skipped addresses with the reason);
+        raises 400 if no recipient is left
+    """
+    recipients = []
+    for lead in request.leads:
+        if lead.get("email") and lead.get("cold_email"):
+            recipients.append({
+                "email": lead["email"],
+                "body": lead["cold_email"],
+                "lead_id": lead["id"] if isinstance(lead.get("id"), int) else None
+            })
+    
+    unmatched = [r["email"] for r in recipients if r["lead_id"] is None]
+    if unmatched:
+        latest = await asyncio.to_thread(lead_store.latest_ids_by_email, unmatched)
+        for recipient in recipients:
+            if recipient["lead_id"] is None:
+                recipient["lead_id"] = latest.get(normalize_email(recipient["email"]))
+    
+    skipped = []
+    if settings.email_validation_enabled and recipients:
+        validations = await email_validation_service.validate_many([r["email"] for r in recipients])
+        sendable = []
+        for recipient, validation in zip(recipients, validations):
+            if email_validation_service.is_sendable(validation):
+                recipient["email"] = validation["normalized"]
+                sendable.append(recipient)
+            else:
+                skipped.append({
+                    "email": recipient["email"],
+                    "status": validation["status"],
+                    "reason": validation["reason"] or "role account"
+                })
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} undeliverable or invalid addresses")
+        recipients = sendable
+    
+    if not recipients:
+        raise HTTPException(
+            status_code=400,
+            detail="No valid recipients found"
+        )
+    return recipients, skipped
+
+
+async def enqueue_campaign(tenant: Tenant, recipients: List[Dict[str, Any]], request: SendEmailRequest) -> Dict[str, Any]:
+    """Queue a campaign in the outbox; new messages count against the tenant's daily email quota."""
+    reserved = reserve_quota(tenant, "emails", len(recipients))
+    queued = {"queued": 0}
+    try:
+        queued = await asyncio.to_thread(
+            outbox.enqueue, recipients, request.subject, request.campaign_id
+        )
+        return queued
+    finally:
+        # Messages the outbox already knew are not charged twice
+        tenant_service.settle(tenant, "emails", reserved, queued["queued"])
+
+
 @app.post("/send-emails")
-async def send_emails(request: SendEmailRequest):
-    """Send cold emails to leads."""
+async def send_emails(request: SendEmailRequest, tenant: Tenant = Depends(authenticate)):
+    """
+    Send cold emails to leads.
+    
+    Messages go through the durable outbox, so a retried request never sends
+    twice and delivery survives a restart. Waits up to outbox_wait_timeout for
+    the campaign to settle; use /campaigns to enqueue without waiting.
+    """
     try:
         logger.info(f"Sending emails to {len(request.leads)} recipients")
         
-        recipients = []
-        for lead in request.leads:
-            if lead.get("email") and lead.get("cold_email"):
-                recipients.append({
-                    "email": lead["email"],
-                    "body": lead["cold_email"]
-                })
+        recipients, skipped = await build_recipients(request)
         
-        if not recipients:
-            raise HTTPException(
-                status_code=400,
-                detail="No valid recipients found"
-            )
+        if not mail_service.is_configured():
+            logger.warning("SMTP not configured. Skipping email.")
+            return {
+                "success": True,
+                "sent": 0,
+                "failed": len(recipients),
+                "deferred": 0,
+                "errors": [r["email"] for r in recipients],
+                "skipped": skipped
+            }
         
-        results = await mail_service.send_bulk_emails(
-            recipients=recipients,
-            subject_template=request.subject
+        queued = await enqueue_campaign(tenant, recipients, request)
+        stats = await outbox.wait_for_campaign(queued["campaign_id"], timeout=settings.outbox_wait_timeout)
+        failed = await asyncio.to_thread(
+            outbox.list_messages, queued["campaign_id"], "failed", 0, 1000
         )
         
+        counts = stats["counts"]
         return {
             "success": True,
-            "sent": results["sent"],
-            "failed": results["failed"],
-            "errors": results["errors"]
+            "campaign_id": queued["campaign_id"],
+            "sent": counts["sent"],
+            "failed": counts["failed"],
+            "deferred": counts["deferred"],
+            "pending": counts["queued"] + counts["sending"],
+            "errors": [message["email"] for message in failed],
+            "skipped": skipped
         }
         
     except HTTPException:
@@ -241,6 +1024,289 @@ async def send_emails(request: SendEmailRequest):
         )
 
 
+@app.post("/campaigns")
+async def create_campaign(request: SendEmailRequest, tenant: Tenant = Depends(authenticate)):
+    """Enqueue a campaign in the outbox and return immediately."""
+    recipients, skipped = await build_recipients(request)
+    queued = await enqueue_campaign(tenant, recipients, request)
+    queued["skipped"] = skipped
+    return queued
+
+
+@app.get("/campaigns", dependencies=[Depends(authenticate)])
+async def list_campaigns(limit: int = Query(default=50, ge=1, le=500)):
+    """Recent campaigns with message counts per state."""
+    return {"campaigns": await asyncio.to_thread(outbox.list_campaigns, limit)}
+
+
+@app.get("/campaigns/{campaign_id}", dependencies=[Depends(authenticate)])
+async def get_campaign(
+    campaign_id: str,
+    state: Optional[str] = None,
+    cursor: int = Query(default=0, ge=0, description="Last message id of the previous page"),
+    limit: int = Query(default=100, ge=1, le=1000)
+):
+    """Campaign progress plus a page of its messages (optionally filtered by state)."""
+    stats = await asyncio.to_thread(outbox.campaign_stats, campaign_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    messages = await asyncio.to_thread(outbox.list_messages, campaign_id, state, cursor, limit)
+    stats["messages"] = messages
+    stats["next_cursor"] = messages[-1]["id"] if len(messages) == limit else None
+    return stats
+
+
+@app.post("/campaigns/{campaign_id}/resume", dependencies=[Depends(authenticate)])
+async def resume_campaign(campaign_id: str, include_failed: bool = True):
+    """Requeue a campaign's deferred (and by default failed) messages."""
+    if await asyncio.to_thread(outbox.campaign_stats, campaign_id) is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    requeued = await asyncio.to_thread(outbox.resume, campaign_id, include_failed)
+    return {"campaign_id": campaign_id, "requeued": requeued}
+
+
+@app.post("/send-emails/stream")
+async def send_emails_stream(request: SendEmailRequest, tenant: Tenant = Depends(authenticate)):
+    """
+    Streaming variant of /send-emails.
+    
+    Messages go through the durable outbox like /send-emails, so a retried
+    request never sends twice and delivery survives a restart or a dropped
+    stream. Returns newline-delimited JSON: one {"type": "result"} event per
+    message outcome the outbox records, followed by a {"type": "summary"}
+    event once the campaign settles or outbox_wait_timeout passes.
+    """
+    recipients, skipped = await build_recipients(request)
+    
+    if not mail_service.is_configured():
+        logger.warning("SMTP not configured. Skipping email.")
+        queued = None
+    else:
+        queued = await enqueue_campaign(tenant, recipients, request)
+        logger.info(f"Streaming email send to {len(recipients)} recipients (campaign {queued['campaign_id']})")
+    
+    async def event_stream():
+        try:
+            for entry in skipped:
+                yield json.dumps({"type": "skipped", **entry}) + "\n"
+            
+            if queued is None:
+                yield json.dumps({
+                    "type": "summary",
+                    "sent": 0,
+                    "failed": len(recipients),
+                    "deferred": 0,
+                    "pending": 0,
+                    "skipped": len(skipped)
+                }) + "\n"
+                return
+            
+            campaign_id = queued["campaign_id"]
+            async for outcome in outbox.watch_campaign(campaign_id, timeout=settings.outbox_wait_timeout):
+                yield json.dumps({
+                    "type": "result",
+                    "id": outcome["id"],
+                    "email": outcome["email"],
+                    "status": outcome["state"],
+                    "attempts": outcome["attempts"],
+                    "error": outcome["last_error"]
+                }) + "\n"
+            
+            counts = (await asyncio.to_thread(outbox.campaign_stats, campaign_id))["counts"]
+            yield json.dumps({
+                "type": "summary",
+                "campaign_id": campaign_id,
+                "sent": counts["sent"],
+                "failed": counts["failed"],
+                "deferred": counts["deferred"],
+                "pending": counts["queued"] + counts["sending"],
+                "skipped": len(skipped)
+            }) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming email results: {e}", exc_info=True)
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.get("/leads", dependencies=[Depends(authenticate)])
+async def list_leads(
+    query: Optional[str] = None,
+    domain: Optional[str] = None,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    cursor: int = Query(default=0, ge=0, description="Last lead id of the previous page"),
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    """Page through stored leads from the local store (no Sheets API calls)."""
+    leads = await asyncio.to_thread(
+        lead_store.list_leads,
+        query=query,
+        domain=domain,
+        email=email,
+        phone=phone,
+        after_id=cursor,
+        limit=limit
+    )
+    return {
+        "leads": leads,
+        "count": len(leads),
+        "next_cursor": leads[-1]["id"] if len(leads) == limit else None
+    }
+
+
+async def export_batches(
+    query: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    campaign_id: Optional[str]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Stored leads matching an export's filters, one keyset page at a time."""
+    batch_size = settings.export_batch_size
+    
+    async def pages(ids: Optional[List[int]] = None):
+        after_id = 0
+        while True:
+            leads = await asyncio.to_thread(
+                lead_store.list_leads,
+                query=query, since=since, until=until, ids=ids,
+                after_id=after_id, limit=batch_size
+            )
+            if leads:
+                yield leads
+            if len(leads) < batch_size:
+                return
+            after_id = leads[-1]["id"]
+    
+    if not campaign_id:
+        async for leads in pages():
+            yield leads
+        return
+    
+    # Leads e-mailed in the campaign, a page of its recipients at a time; a lead
+    # e-mailed more than once is exported once
+    seen: Set[int] = set()
+    after_message = 0
+    while True:
+        recipients = await asyncio.to_thread(outbox.campaign_recipients, campaign_id, after_message, batch_size)
+        if not recipients:
+            return
+        after_message = recipients[-1][0]
+        ids = {lead_id for _, _, lead_id in recipients if lead_id is not None}
+        # Messages queued before lead ids were recorded: the latest lead with the address
+        legacy = [email for _, email, lead_id in recipients if lead_id is None]
+        if legacy:
+            latest = await asyncio.to_thread(lead_store.latest_ids_by_email, legacy)
+            ids.update(latest.values())
+        ids -= seen
+        seen |= ids
+        if ids:
+            async for leads in pages(sorted(ids)):
+                yield leads
+
+
+def export_timestamp(name: str, text: Optional[str]) -> Optional[str]:
+    """ISO 8601 UTC form of an export bound (a date or datetime; UTC if no offset), as stored in created_at."""
+    if not text:
+        return None
+    try:
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be an ISO 8601 date or datetime")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+@app.get("/leads/export", dependencies=[Depends(authenticate)])
+async def export_leads(
+    format: str = Query(default="csv", pattern="^(csv|ndjson|parquet)$"),
+    query: Optional[str] = None,
+    since: Optional[str] = Query(default=None, description="Leads created at or after this date or datetime (ISO 8601)"),
+    until: Optional[str] = Query(default=None, description="Leads created before this date or datetime (ISO 8601)"),
+    campaign_id: Optional[str] = Query(default=None, description="Leads e-mailed in this campaign")
+):
+    """
+    Stream stored leads as CSV, NDJSON or Parquet.
+    
+    Leads are read and encoded one batch at a time, so memory stays flat
+    however large the export is.
+    """
+    since, until = export_timestamp("since", since), export_timestamp("until", until)
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs the pyarrow package")
+    if campaign_id and await asyncio.to_thread(outbox.campaign_stats, campaign_id) is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    batches = export_batches(query, since, until, campaign_id)
+    chunks = {
+        "csv": export.csv_chunks,
+        "ndjson": export.ndjson_chunks,
+        "parquet": export.parquet_chunks,
+    }[format](batches)
+    media_type, extension = export.FORMATS[format]
+    filename = f"leads-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.post("/leads/refresh", dependencies=[Depends(authenticate)])
+async def refresh_leads(request: LeadRefreshRequest):
+    """
+    Re-check stored leads and re-process only the ones whose inputs changed.
+    
+    Returns newline-delimited JSON: one {"type": "lead"} event per lead with
+    its status (unchanged, updated, reextracted, skipped or failed) and what
+    changed, written back to the lead store as it completes, followed by a
+    {"type": "summary"} event. Refreshed leads are not re-sent to Sheets.
+    """
+    logger.info(f"Starting lead refresh: {request.limit} leads{f' for {request.query}' if request.query else ''}")
+    token_budget = start_token_budget(request.token_budget)
+    
+    async def event_stream():
+        counts = {status: 0 for status in REFRESH_STATUSES}
+        changes: Dict[str, int] = {}
+        try:
+            async for outcome in lead_refresher.refresh(
+                query=request.query,
+                limit=request.limit,
+                min_age_hours=request.min_age_hours,
+                check_places=request.check_places,
+                regenerate_emails=request.regenerate_emails
+            ):
+                counts[outcome["status"]] += 1
+                for change in outcome["changes"]:
+                    changes[change] = changes.get(change, 0) + 1
+                yield json.dumps({"type": "lead", **outcome}) + "\n"
+            
+            logger.info(f"Lead refresh finished: {counts}")
+            yield json.dumps({
+                "type": "summary",
+                "checked": sum(counts.values()) - counts["skipped"],
+                **counts,
+                "changes": changes,
+                "token_usage": token_budget.summary()
+            }) + "\n"
+        except Exception as e:
+            logger.error(f"Error refreshing leads: {e}", exc_info=True)
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.get("/tenants/me")
+async def tenant_usage(tenant: Tenant = Depends(authenticate)):
+    """The calling tenant's limits, usage, remaining daily quota and lane wait times."""
+    summary = tenant.summary()
+    summary["queues"] = lead_scheduler.queue_stats(tenant.name)
+    return summary
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check endpoint."""
@@ -250,12 +1316,36 @@ async def health_check():
             "api": "online",
             "openai": "configured" if settings.openai_api_key else "not configured",
             "serper": "configured" if settings.serper_api_key else "not configured",
-            "google_sheets": "configured" if settings.google_sheet_id else "not configured",
+            "google_sheets": (
+                f"error: {sheets_service.init_error}" if sheets_service.init_error
+                else "configured" if settings.google_sheet_id else "not configured"
+            ),
             "smtp": "configured" if settings.smtp_username else "not configured"
+        },
+        "sheets_pending": sheets_sink.pending,
+        "traffic_mode": traffic_archive.mode,
+        "cache_backend": shared_cache.backend_name,
+        "concurrency_limits": {stage: stats["limit"] for stage, stats in stage_limits.stats().items()},
+        "smtp_daily_cap": {
+            "limit": mail_service.provider_limits()[1] or None,
+            "used": await asyncio.to_thread(outbox.sends_today)
         }
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: per-stage latency histograms, call and error counters
+    and in-flight gauges, plus cache hit ratios, coalescing, pool sizes,
+    event-loop lag and resident memory.
+    """
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # Run the application
 if __name__ == "__main__":
     import uvicorn
@@ -1,16 +1,47 @@
-"""Services package."""
-from .search_service import search_service
-from .scraper_service import scraper_service
-from .extractor_service import extractor_service
-from .email_generator import email_generator
-from .sheets_service import sheets_service
-from .mail_service import mail_service
-
-__all__ = [
-    "search_service",
-    "scraper_service",
-    "extractor_service",
-    "email_generator",
-    "sheets_service",
-    "mail_service"
-]
+"""
+Services package.
+
+Service singletons are imported lazily on first attribute access, so importing
+one service (e.g. in a test or script) does not import every other service and
+its client libraries.
+"""
+import importlib
+
+_SERVICE_MODULES = {
+    "search_service": ".search_service",
+    "scraper_service": ".scraper_service",
+    "extractor_service": ".extractor_service",
+    "email_generator": ".email_generator",
+    "sheets_service": ".sheets_service",
+    "lead_store": ".lead_store",
+    "lead_index": ".lead_index",
+    "sheets_sink": ".sheets_sink",
+    "mail_service": ".mail_service",
+    "email_validation_service": ".email_validation_service",
+    "outbox": ".outbox",
+    "lead_scheduler": ".lead_scheduler",
+    "lead_scorer": ".lead_scorer",
+    "traffic_archive": ".record_replay",
+    "tenant_service": ".tenants",
+    "campaign_planner": ".campaign_planner",
+    "shared_cache": ".cache_backends",
+    "page_parser": ".parse_pool",
+    "lead_refresher": ".lead_refresh",
+    "stage_limits": ".concurrency_control",
+}
+
+__all__ = list(_SERVICE_MODULES)
+
+
+def __getattr__(name):
+    module_name = _SERVICE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    service = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = service
+    return service
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
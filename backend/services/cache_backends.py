@@ -0,0 +1,510 @@
+"""
+Cache of outbound results shared by every worker process.
+
+Each uvicorn worker is its own process, so in-process caches and single-flight
+state are duplicated, and cold, in every worker. Search results, place
+details, scraped pages and LLM outputs are instead cached through a pluggable
+backend: "memory" (this process only), "sqlite" (one WAL database shared by
+every worker on the host) or "redis" (any server speaking the Redis protocol,
+shared across hosts). Backends also provide locks with an expiry, so only one
+worker computes a missing entry while the others wait for its result.
+"""
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("off", "memory", "sqlite", "redis")
+
+_MISS = object()
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class CacheBackend(abc.ABC):
+    """Storage of opaque values with expiry, plus expiring locks."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        """Take a lock unless a live holder has it; returns the token that releases it."""
+
+    @abc.abstractmethod
+    async def release_lock(self, name: str, token: str) -> None:
+        """Release a lock if it is still held with this token."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Bounded LRU dictionary; visible to this process only."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        held = self._locks.get(name)
+        if held and held[1] > time.monotonic():
+            return None
+        token = uuid.uuid4().hex
+        self._locks[name] = (token, time.monotonic() + ttl)
+        return token
+
+    async def release_lock(self, name: str, token: str) -> None:
+        held = self._locks.get(name)
+        if held and held[0] == token:
+            del self._locks[name]
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    SQLite database in WAL mode, shared by every worker on the host.
+
+    Readers never block the writer in WAL mode; writers of different
+    processes wait for each other up to the busy timeout. Expired entries are
+    purged every few hundred writes.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at);
+        CREATE TABLE IF NOT EXISTS locks (
+            name TEXT PRIMARY KEY,
+            token TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    PURGE_EVERY = 500
+
+    def __init__(self, db_path: str, timeout: float = 2.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use (callers hold the lock)."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self.conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def _delete(self, key: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self.conn:
+            # Takes a free lock, or one whose holder let it expire
+            cursor = self.conn.execute(
+                "INSERT INTO locks (name, token, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+                "WHERE locks.expires_at <= ?",
+                (name, token, now + ttl, now)
+            )
+        return token if cursor.rowcount else None
+
+    def _release_lock(self, name: str, token: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM locks WHERE name = ? AND token = ?", (name, token))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        return await asyncio.to_thread(self._acquire_lock, name, ttl)
+
+    async def release_lock(self, name: str, token: str) -> None:
+        await asyncio.to_thread(self._release_lock, name, token)
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class _RedisConnection:
+    """One connection speaking RESP2, the Redis wire protocol."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *args: Any) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.writer.write(b"".join(parts))
+        await self.writer.drain()
+        return await self._read()
+
+    async def _read(self) -> Any:
+        line = await self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(rest.decode("utf-8"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._read() for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line[:40]!r}")
+
+    def close(self):
+        self.writer.close()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis (or any server speaking its protocol), shared across workers and hosts.
+
+    Uses a small pool of plain RESP connections instead of a client library.
+    Locks are SET NX PX keys released with a compare-and-delete script, so a
+    worker never releases a lock that expired and was taken by another.
+    """
+
+    name = "redis"
+
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url: str, pool_size: int = 10, timeout: float = 2.0):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"CACHE_REDIS_URL must be a redis:// URL, got '{url}'")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.strip("/") or 0)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: List[_RedisConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _connect(self) -> _RedisConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        conn = _RedisConnection(reader, writer)
+        try:
+            if self.password:
+                await conn.execute("AUTH", self.password)
+            if self.db:
+                await conn.execute("SELECT", self.db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    async def _execute(self, *args: Any) -> Any:
+        conn = self._idle.pop() if self._idle else await self._connect()
+        try:
+            reply = await conn.execute(*args)
+        except BaseException:
+            # The reply stream may be out of step: never reuse this connection
+            conn.close()
+            raise
+        self._idle.append(conn)
+        return reply
+
+    async def execute(self, *args: Any) -> Any:
+        """Run one command on a pooled connection."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            return await asyncio.wait_for(self._execute(*args), timeout=self.timeout)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute("SET", key, value, "PX", max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str) -> None:
+        await self.execute("DEL", key)
+
+    async def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        reply = await self.execute("SET", f"lock:{name}", token, "NX", "PX", max(int(ttl * 1000), 1))
+        return token if reply == "OK" else None
+
+    async def release_lock(self, name: str, token: str) -> None:
+        await self.execute("EVAL", self.RELEASE_SCRIPT, 1, f"lock:{name}", token)
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+class SharedCache:
+    """
+    Caches outbound results in the configured backend, with cross-worker single flight.
+
+    A miss takes the entry's lock before computing it; workers that find the
+    lock taken poll for the result instead of repeating the work, and compute
+    it themselves only if the holder neither delivers nor releases in time.
+    The cache never fails a call: a backend error is logged, counted and the
+    work runs uncached.
+    """
+
+    def __init__(self, backend: str = None):
+        self.backend_name = (backend or settings.cache_backend).lower()
+        if self.backend_name not in BACKENDS:
+            raise ValueError(f"CACHE_BACKEND must be one of {', '.join(BACKENDS)}, got '{self.backend_name}'")
+        self.backend = self._create_backend(self.backend_name)
+        self.lock_ttl = settings.cache_lock_ttl
+        self.poll_interval = settings.cache_lock_poll_ms / 1000
+        self.counts: Dict[str, Dict[str, int]] = {}
+        if self.backend:
+            logger.info(f"🗄️ Shared cache backend: {self.backend_name}")
+
+    @staticmethod
+    def _create_backend(name: str) -> Optional[CacheBackend]:
+        if name == "memory":
+            return MemoryBackend(settings.cache_max_entries)
+        if name == "sqlite":
+            return SQLiteBackend(settings.cache_path, settings.cache_timeout)
+        if name == "redis":
+            return RedisBackend(settings.cache_redis_url, settings.cache_redis_pool_size, settings.cache_timeout)
+        return None
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def key(namespace: str, request: Dict[str, Any]) -> str:
+        """Cache key of a request: namespace plus a hash of its canonical JSON."""
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return f"leadgen:{namespace}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}"
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        counts = self.counts.get(namespace)
+        if counts is None:
+            counts = self.counts[namespace] = {"hits": 0, "misses": 0, "waits": 0, "stores": 0, "errors": 0}
+        counts[outcome] += 1
+
+    async def _lookup(self, namespace: str, key: str, decode: Optional[Callable[[Any], Any]]) -> Any:
+        try:
+            blob = await self.backend.get(key)
+            if blob is None:
+                return _MISS
+            value = _unpack(blob)
+            return decode(value) if decode else value
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache read failed for {namespace}: {e}")
+            return _MISS
+
+    async def _store(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        try:
+            await self.backend.set(key, _pack(value), ttl)
+            self._count(namespace, "stores")
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache write failed for {namespace}: {e}")
+
+    async def _lock(self, namespace: str, key: str) -> Optional[str]:
+        try:
+            return await self.backend.acquire_lock(key, self.lock_ttl)
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"Cache lock failed for {namespace}: {e}")
+            return ""  # proceed without the lock
+
+    async def _unlock(self, namespace: str, key: str, token: str) -> None:
+        try:
+            await self.backend.release_lock(key, token)
+        except Exception as e:
+            # The lock expires on its own
+            logger.warning(f"Cache unlock failed for {namespace}: {e}")
+
+    async def _wait(self, namespace: str, key: str, decode: Optional[Callable[[Any], Any]]) -> Tuple[Any, Optional[str]]:
+        """Wait for another worker's result; returns (result or _MISS, lock token if we took over)."""
+        self._count(namespace, "waits")
+        give_up = time.monotonic() + self.lock_ttl
+        while time.monotonic() < give_up:
+            await asyncio.sleep(self.poll_interval)
+            value = await self._lookup(namespace, key, decode)
+            if value is not _MISS:
+                return value, None
+            # Free again without a result: the holder failed or chose not to cache
+            token = await self._lock(namespace, key)
+            if token is not None:
+                return _MISS, token
+        return _MISS, None
+
+    async def fetch(
+        self,
+        namespace: str,
+        request: Dict[str, Any],
+        fn: Callable[[], Awaitable[Any]],
+        ttl: float,
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Return a cached result, or compute it once across workers and cache it.
+
+        Args:
+            namespace: Kind of result (e.g. "page", "openai.extraction")
+            request: JSON-serializable fields that determine the result
+            fn: Computes the result on a miss
+            ttl: Seconds to keep the result (0 = no caching)
+            encode: Turns the result into JSON-serializable data
+            decode: Rebuilds the result from cached data
+            cacheable: Predicate for results worth keeping (e.g. successful fetches)
+
+        Returns:
+            The result; a fresh copy on every hit
+        """
+        if not self.enabled or ttl <= 0:
+            return await fn()
+
+        key = self.key(namespace, request)
+        value = await self._lookup(namespace, key, decode)
+        if value is not _MISS:
+            self._count(namespace, "hits")
+            return value
+
+        token = await self._lock(namespace, key)
+        if token is None:
+            value, token = await self._wait(namespace, key, decode)
+            if value is not _MISS:
+                self._count(namespace, "hits")
+                return value
+
+        self._count(namespace, "misses")
+        try:
+            result = await fn()
+            if cacheable is None or cacheable(result):
+                await self._store(namespace, key, encode(result) if encode else result, ttl)
+            return result
+        finally:
+            if token:
+                await self._unlock(namespace, key, token)
+
+    def summary(self) -> Dict[str, Any]:
+        """Backend and per-namespace hit, miss, wait, store and error counts."""
+        return {
+            "backend": self.backend_name,
+            "namespaces": {namespace: dict(counts) for namespace, counts in self.counts.items()}
+        }
+
+    async def close(self) -> None:
+        if self.backend:
+            await self.backend.close()
+
+
+# Singleton instance
+shared_cache = SharedCache()
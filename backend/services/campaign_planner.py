@@ -0,0 +1,113 @@
+"""
+Planning for multi-query lead campaigns: merge, de-duplicate and select.
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+from .lead_index import lead_index
+from .lead_scorer import lead_scorer
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignPlanner:
+    """
+    Turns the searches of a campaign into one de-duplicated work list.
+
+    Related queries ("cafes in X" for many neighbourhoods) return the same
+    businesses over and over. Results are merged on the identities the lead
+    index uses (website domain, phone, place id) before anything is scraped,
+    so each business is processed once; every query that found it is kept
+    for attribution.
+    """
+
+    def normalize_queries(self, queries: List[str]) -> List[str]:
+        """Drop blank and repeated queries (ignoring case and spacing), keeping order."""
+        seen = set()
+        unique = []
+        for query in queries:
+            key = " ".join(query.lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                unique.append(query.strip())
+        return unique
+
+    def _identities(self, result: Dict[str, Any]) -> List[str]:
+        domain, phone, place_id = lead_index.keys_for(result)
+        keys = [f"{prefix}:{value}" for prefix, value in (("d", domain), ("p", phone), ("g", place_id)) if value]
+        if not keys:
+            # Nothing better to go on than the name
+            keys.append("t:" + " ".join(result.get("title", "").lower().split()))
+        return keys
+
+    def merge(
+        self,
+        results_by_query: Dict[str, List[Dict[str, Any]]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, int]]]:
+        """
+        Merge per-query search results into unique businesses.
+
+        Args:
+            results_by_query: Search results of each query, in query order
+
+        Returns:
+            (merged results, each with a "queries" list; per-query counts of
+            results, new unique businesses and duplicates of earlier ones)
+        """
+        merged: List[Dict[str, Any]] = []
+        owner: Dict[str, int] = {}
+        stats: Dict[str, Dict[str, int]] = {}
+
+        for query, results in results_by_query.items():
+            counts = stats[query] = {"results": len(results), "unique": 0, "duplicates": 0}
+            for result in results:
+                keys = self._identities(result)
+                index = next((owner[key] for key in keys if key in owner), None)
+                if index is None:
+                    index = len(merged)
+                    merged.append(dict(result, queries=[query]))
+                    counts["unique"] += 1
+                else:
+                    if query not in merged[index]["queries"]:
+                        merged[index]["queries"].append(query)
+                    counts["duplicates"] += 1
+                for key in keys:
+                    owner.setdefault(key, index)
+
+        total = sum(counts["results"] for counts in stats.values())
+        logger.info(f"Campaign searches: {total} results, {len(merged)} unique businesses")
+        return merged, stats
+
+    def select(self, merged: List[Dict[str, Any]], total: int, balance: bool = True) -> List[Dict[str, Any]]:
+        """
+        Score the merged set and pick the businesses to process.
+
+        With balance, picks round-robin across queries (each taking its best
+        remaining business by score), so every query contributes instead of
+        the strongest area taking the whole target. Without it, takes the
+        overall top scores.
+        """
+        ranked = lead_scorer.rank(merged, len(merged))
+        if not balance:
+            return ranked[:total]
+
+        # Each business is attributed to the first query that found it
+        by_query: Dict[str, List[Dict[str, Any]]] = {}
+        for candidate in ranked:
+            by_query.setdefault(candidate["queries"][0], []).append(candidate)
+
+        selected = []
+        queues = [iter(candidates) for candidates in by_query.values()]
+        while queues and len(selected) < total:
+            for queue in list(queues):
+                candidate = next(queue, None)
+                if candidate is None:
+                    queues.remove(queue)
+                    continue
+                selected.append(candidate)
+                if len(selected) >= total:
+                    break
+        return selected
+
+
+# Singleton instance
+campaign_planner = CampaignPlanner()
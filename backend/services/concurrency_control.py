@@ -0,0 +1,60 @@
+"""
+Adaptive concurrency limits of the outbound stages.
+"""
+from typing import Any, AsyncContextManager, Callable, Dict
+from config.settings import settings
+from utils.adaptive_limit import AdaptiveLimiter, LimitSlot, any_error
+
+STAGES = ("scrape", "extraction", "email_generation", "place_search", "place_details", "smtp")
+
+
+def openai_overloaded(error: BaseException) -> bool:
+    """OpenAI errors that mean back off: rate limits, timeouts, dropped connections and 5xx."""
+    import openai
+
+    return isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
+
+class StageLimits:
+    """
+    One AIMD limiter per outbound stage (see utils.adaptive_limit).
+
+    Limits are held around the outbound call itself, behind the shared cache
+    and request coalescing, so only calls that really reach an upstream count
+    against them and feed their latency and errors back. Each call site tells
+    which of its errors mean overload; a 404 page or a bad model reply does not.
+    """
+
+    def __init__(self):
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+        for stage in STAGES:
+            bounds = settings.adaptive_concurrency_limits.get(stage, {})
+            max_limit = bounds.get("max", 32)
+            if stage == "smtp":
+                # More sends than pooled sessions would only queue for a session
+                max_limit = min(max_limit, settings.smtp_pool_size)
+            self.limiters[stage] = AdaptiveLimiter(
+                stage,
+                initial=bounds.get("initial", 4),
+                min_limit=bounds.get("min", 1),
+                max_limit=max_limit,
+                latency_tolerance=settings.adaptive_latency_tolerance,
+                error_threshold=settings.adaptive_error_threshold,
+                backoff=settings.adaptive_backoff,
+                enabled=settings.adaptive_concurrency
+            )
+
+    def slot(
+        self,
+        stage: str,
+        overload: Callable[[BaseException], bool] = any_error
+    ) -> AsyncContextManager[LimitSlot]:
+        """Hold a slot of a stage for one outbound call (see AdaptiveLimiter.slot)."""
+        return self.limiters[stage].slot(overload)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: limiter.stats() for stage, limiter in self.limiters.items()}
+
+
+# Singleton instance
+stage_limits = StageLimits()
@@ -1,10 +1,17 @@
 """
 Email generation service using OpenAI to create personalized cold emails.
 """
+import asyncio
 import logging
-from typing import Dict, Any
-from openai import AsyncOpenAI
+from typing import Dict, Any, Tuple
 from config.settings import settings
+from utils.deadline import current_deadline
+from utils.metrics import track_stage
+from utils.normalize import has_website
+from utils.token_budget import current_token_budget, estimate_tokens
+from .cache_backends import shared_cache
+from .concurrency_control import openai_overloaded, stage_limits
+from .record_replay import dump_model, load_chat_completion, traffic_archive
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +20,24 @@ class EmailGenerator:
     """Service for generating personalized cold emails."""
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self._client = None
         self.model = "gpt-4o-mini"
+        self.max_tokens = settings.email_max_tokens
+    
+    @property
+    def client(self):
+        """OpenAI client, created on first use."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url or None
+            )
+        return self._client
+    
+    def warm_up(self):
+        """Create the OpenAI client ahead of the first request."""
+        return self.client
     
     async def generate_cold_email(self, business_data: Dict[str, Any]) -> str:
         """
@@ -26,17 +49,22 @@ class EmailGenerator:
         Returns:
             Generated cold email text
         """
+        email, _ = await self.compose(business_data)
+        return email
+    
+    def build_prompt(self, business_data: Dict[str, Any]) -> str:
+        """Build the cold email prompt for a business."""
         business_name = business_data.get("business_name", "your business")
         rating = business_data.get("rating", "")
         owner_name = business_data.get("owner_name", "")
         website = business_data.get("website", "")
-        has_website = business_data.get("website_exists", True)
+        website_exists = business_data.get("website_exists", True)
         phone = business_data.get("phone", "")
         
         # Different approach for businesses with vs without websites
-        if not has_website or website == "N/A":
+        if not website_exists or not has_website(website):
             # Business WITHOUT website - more urgent pitch
-            prompt = f"""
+            return f"""
 Write a short, compelling cold email to a business that DOES NOT have a website yet.
 
 Business Details:
@@ -63,7 +91,7 @@ Return ONLY the email body, no subject line.
 """
         else:
             # Business WITH website - improvement pitch
-            prompt = f"""
+            return f"""
 Write a short, professional cold email offering website improvement services.
 
 Business Details:
@@ -86,11 +114,39 @@ Make it helpful, not pushy.
 
 Return ONLY the email body, no subject line.
 """
+    
+    async def compose(self, business_data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Generate a cold email and report how it was produced.
+        
+        Returns:
+            (email text, source) where source is "llm", "template", or
+            "deadline" when the request deadline forced the template
+        """
+        business_name = business_data.get("business_name", "your business")
+        rating = business_data.get("rating", "")
+        has_website = business_data.get("website_exists", True)
+        prompt = self.build_prompt(business_data)
+        
+        # Shrink or skip the completion when the request budget runs low
+        budget = current_token_budget()
+        max_tokens = self.max_tokens
+        if budget:
+            max_tokens = budget.scale_max_tokens(self.max_tokens, 180)
+            if not budget.can_afford(estimate_tokens(prompt) + max_tokens):
+                logger.info(f"Token budget exhausted, using template email for {business_name}")
+                budget.record_skip("email_generation")
+                return self._get_default_email(business_name, rating, has_website), "template"
+        
+        deadline = current_deadline()
+        if deadline and not deadline.allows(settings.deadline_email_ms):
+            logger.info(f"Deadline close, using template email for {business_name}")
+            return self._get_default_email(business_name, rating, has_website), "deadline"
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            params = {
+                "model": self.model,
+                "messages": [
                     {
                         "role": "system",
                         "content": "You are a professional business development expert who writes personalized, value-driven cold emails that focus on the client's needs and lost opportunities."
@@ -100,18 +156,36 @@ Return ONLY the email body, no subject line.
                         "content": prompt
                     }
                 ],
-                temperature=0.7,
-                max_tokens=350
-            )
+                "temperature": 0.7,
+                "max_tokens": max_tokens
+            }
             
-            email_content = response.choices[0].message.content.strip()
+            async def complete() -> str:
+                with track_stage("email_generation"):
+                    async with stage_limits.slot("email_generation", overload=openai_overloaded):
+                        response = await traffic_archive.call(
+                            "openai.email", params,
+                            lambda: self.client.chat.completions.create(**params),
+                            encode=dump_model, decode=load_chat_completion
+                        )
+                if budget:
+                    budget.record("email_generation", self.model, response.usage)
+                return response.choices[0].message.content.strip()
+            
+            email_content = await asyncio.wait_for(
+                shared_cache.fetch("openai.email", params, complete, ttl=settings.cache_email_ttl),
+                timeout=deadline.remaining() if deadline else None
+            )
             
             logger.info(f"Generated cold email for {business_name} ({'no website' if not has_website else 'has website'})")
-            return email_content
+            return email_content, "llm"
             
+        except asyncio.TimeoutError:
+            logger.warning(f"Deadline reached while generating email for {business_name}, using template")
+            return self._get_default_email(business_name, rating, has_website), "deadline"
         except Exception as e:
             logger.error(f"Error generating email for {business_name}: {e}")
-            return self._get_default_email(business_name, rating, has_website)
+            return self._get_default_email(business_name, rating, has_website), "template"
     
     def _get_default_email(self, business_name: str, rating: str = "", has_website: bool = True) -> str:
         """
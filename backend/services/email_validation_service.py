@@ -0,0 +1,184 @@
+"""
+Email address validation with cached, concurrent MX lookups.
+"""
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from config.settings import settings
+from utils.metrics import track_stage
+from utils.singleflight import SingleFlight
+from .record_replay import traffic_archive
+
+logger = logging.getLogger(__name__)
+
+VALID = "valid"
+INVALID = "invalid"              # bad syntax or a scraping false positive
+UNDELIVERABLE = "undeliverable"  # domain does not exist or refuses mail
+UNKNOWN = "unknown"              # DNS lookup failed; not a reason to skip
+
+
+class EmailValidationService:
+    """
+    Checks scraped addresses before we spend an SMTP attempt on them.
+
+    Syntax is checked with email-validator. Deliverability is checked with DNS MX
+    lookups (falling back to A/AAAA as RFC 5321 allows), run concurrently and
+    cached per domain with separate TTLs for good and bad answers. Concurrent
+    lookups of the same domain share one query.
+    """
+
+    ROLE_ACCOUNTS = {
+        "info", "admin", "contact", "support", "sales", "office", "hello", "help",
+        "noreply", "no-reply", "donotreply", "webmaster", "postmaster", "abuse", "billing"
+    }
+    # "logo@2x.png" and friends: regex hits on asset file names
+    FILE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "svg", "webp", "css", "js", "ico", "pdf"}
+
+    def __init__(self, resolver=None):
+        """
+        Args:
+            resolver: Optional object with an async ``resolve(name, rdtype)``
+                (dns.asyncresolver.Resolver API); built from settings when omitted
+        """
+        self._resolver = resolver
+        self.positive_ttl = settings.email_mx_cache_ttl
+        self.negative_ttl = settings.email_mx_negative_ttl
+        self.timeout = settings.email_dns_timeout
+        self.concurrency = settings.email_dns_concurrency
+        self._cache: Dict[str, Tuple[str, str, float]] = {}
+        # Concurrent lookups of a domain share one query, run in a task of its
+        # own so a cancelled caller does not cancel it for the others
+        self.inflight = SingleFlight("dns_lookup")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def resolver(self):
+        """DNS resolver, created on first use."""
+        if self._resolver is None:
+            import dns.asyncresolver
+
+            resolver = dns.asyncresolver.Resolver()
+            if settings.email_dns_nameservers:
+                resolver.nameservers = [ns.strip() for ns in settings.email_dns_nameservers.split(",") if ns.strip()]
+                resolver.port = settings.email_dns_port
+            resolver.lifetime = self.timeout
+            self._resolver = resolver
+        return self._resolver
+
+    def check_syntax(self, email: str) -> Tuple[str, str, str]:
+        """
+        Returns:
+            (status, normalized address, reason)
+        """
+        from email_validator import validate_email, EmailNotValidError
+
+        try:
+            validated = validate_email(email, check_deliverability=False)
+        except EmailNotValidError as e:
+            return INVALID, email, str(e)
+
+        domain = validated.domain.lower()
+        if domain.rsplit(".", 1)[-1] in self.FILE_EXTENSIONS:
+            return INVALID, validated.normalized, "looks like a file name, not an address"
+        return VALID, validated.normalized, ""
+
+    def is_role_account(self, email: str) -> bool:
+        return email.split("@", 1)[0].lower() in self.ROLE_ACCOUNTS
+
+    async def _lookup(self, domain: str) -> Tuple[str, str]:
+        import dns.exception
+        import dns.resolver
+
+        try:
+            answer = await self.resolver.resolve(domain, "MX")
+            hosts = [str(record.exchange).rstrip(".") for record in answer]
+            # RFC 7505 null MX: the domain explicitly accepts no mail
+            if not any(hosts):
+                return UNDELIVERABLE, "domain does not accept email (null MX)"
+            return VALID, ""
+        except dns.resolver.NXDOMAIN:
+            return UNDELIVERABLE, "domain does not exist"
+        except dns.resolver.NoAnswer:
+            pass
+        except (dns.exception.Timeout, dns.resolver.NoNameservers) as e:
+            return UNKNOWN, f"DNS lookup failed: {e}"
+
+        # No MX record: mail goes to the domain's address record, if any
+        for rdtype in ("A", "AAAA"):
+            try:
+                await self.resolver.resolve(domain, rdtype)
+                return VALID, ""
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                continue
+            except (dns.exception.Timeout, dns.resolver.NoNameservers) as e:
+                return UNKNOWN, f"DNS lookup failed: {e}"
+        return UNDELIVERABLE, "domain has no mail server"
+
+    async def check_domain(self, domain: str) -> Tuple[str, str]:
+        """Deliverability of a domain, from cache when fresh."""
+        domain = domain.lower()
+        cached = self._cache.get(domain)
+        if cached and cached[2] > time.monotonic():
+            self.cache_hits += 1
+            return cached[0], cached[1]
+        self.cache_misses += 1
+        return await self.inflight.do(domain, lambda: self._check_uncached(domain))
+
+    async def _check_uncached(self, domain: str) -> Tuple[str, str]:
+        """Look a domain up in DNS and cache the answer unless the lookup failed."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        async with self._slots:
+            with track_stage("dns_lookup") as call:
+                try:
+                    status, reason = await traffic_archive.call(
+                        "dns.mx", {"domain": domain}, lambda: self._lookup(domain), encode=list, decode=tuple
+                    )
+                except Exception as e:
+                    status, reason = UNKNOWN, f"DNS lookup failed: {e}"
+                if status == UNKNOWN:
+                    call.fail()
+
+        if status != UNKNOWN:
+            ttl = self.positive_ttl if status == VALID else self.negative_ttl
+            self._cache[domain] = (status, reason, time.monotonic() + ttl)
+        return status, reason
+
+    async def validate(self, email: str, check_mx: bool = True) -> Dict[str, Any]:
+        """
+        Validate one address.
+
+        Returns:
+            Dict with email, normalized, status (valid/invalid/undeliverable/unknown),
+            reason and role_account
+        """
+        status, normalized, reason = self.check_syntax(email or "")
+        result = {
+            "email": email,
+            "normalized": normalized,
+            "status": status,
+            "reason": reason,
+            "role_account": status == VALID and self.is_role_account(normalized)
+        }
+        if status == VALID and check_mx:
+            result["status"], result["reason"] = await self.check_domain(normalized.rsplit("@", 1)[1])
+        return result
+
+    async def validate_many(self, emails: List[str], check_mx: bool = True) -> List[Dict[str, Any]]:
+        """Validate many addresses concurrently (one DNS lookup per distinct domain)."""
+        return await asyncio.gather(*(self.validate(email, check_mx) for email in emails))
+
+    def is_sendable(self, result: Dict[str, Any]) -> bool:
+        """Whether a validation result is worth an SMTP attempt."""
+        if result["status"] in (INVALID, UNDELIVERABLE):
+            return False
+        if result["role_account"] and settings.email_skip_role_accounts:
+            return False
+        return True
+
+
+# Singleton instance
+email_validation_service = EmailValidationService()
@@ -1,12 +1,21 @@
 """
 Data extraction service using OpenAI to structure scraped data.
 """
-import re
 import json
+import asyncio
+import hashlib
 import logging
 from typing import Optional, Dict, Any
-from openai import AsyncOpenAI
 from config.settings import settings
+from utils.deadline import current_deadline
+from utils.metrics import track_stage
+from utils.normalize import has_website
+from utils.singleflight import SingleFlight
+from utils.token_budget import TokenBudget, current_token_budget, estimate_tokens
+from .cache_backends import shared_cache
+from .concurrency_control import openai_overloaded, stage_limits
+from .parse_pool import find_emails, page_parser
+from .record_replay import dump_model, load_chat_completion, traffic_archive
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +24,27 @@ class ExtractorService:
     """Service for extracting structured data from HTML using OpenAI."""
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self._client = None
         self.model = "gpt-4o-mini"
+        self.max_html_chars = settings.extraction_max_html_chars
+        self.max_tokens = settings.extraction_max_tokens
+        # Identical prompts (same page, same sizing) in flight share one completion
+        self.inflight = SingleFlight("extraction", enabled=settings.coalesce_requests)
+    
+    @property
+    def client(self):
+        """OpenAI client, created on first use."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url or None
+            )
+        return self._client
+    
+    def warm_up(self):
+        """Create the OpenAI client ahead of the first request."""
+        return self.client
     
     def extract_emails_regex(self, text: str) -> list:
         """
@@ -28,16 +56,34 @@ class ExtractorService:
         Returns:
             List of found email addresses
         """
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        
-        # Filter out common false positives
-        filtered_emails = [
-            email for email in emails 
-            if not any(x in email.lower() for x in ['example.com', 'test.com', 'placeholder'])
-        ]
+        return find_emails(text)
+    
+    def build_prompt(self, html_content: str, url: str, search_title: str, html_limit: int) -> str:
+        """Build the extraction prompt from at most html_limit characters of HTML."""
+        # Truncate HTML to avoid token limits
+        truncated_html = html_content[:html_limit]
         
-        return list(set(filtered_emails))  # Remove duplicates
+        return f"""
+Extract business information from the following HTML content.
+
+Website URL: {url}
+Search Title: {search_title}
+
+Return ONLY a valid JSON object with these exact fields:
+{{
+    "business_name": "extracted business name or from title",
+    "owner_name": "owner/founder name if found, otherwise empty string",
+    "rating": "rating if found (e.g., 4.5), otherwise empty string",
+    "opening_hours": "opening hours if found, otherwise empty string",
+    "phone": "phone number if found, otherwise empty string",
+    "address": "address if found, otherwise empty string"
+}}
+
+HTML Content:
+{truncated_html}
+
+Return ONLY the JSON object, no other text.
+"""
     
     async def extract_business_data(
         self, 
@@ -56,14 +102,16 @@ class ExtractorService:
             search_data: Additional data from search (rating, phone, address, etc.)
             
         Returns:
-            Dictionary with extracted business information
+            Dictionary with extracted business information; extraction_source
+            says how it was produced ("llm", "search_data", or "deadline" when
+            the request deadline forced the search-data fallback)
         """
         # Initialize with search data if available
         if search_data is None:
             search_data = {}
         
         # If no website, use only search data
-        if not url or url == "" or not html_content:
+        if not has_website(url) or not html_content:
             emails = []
             data = {
                 "business_name": search_data.get("title", search_title),
@@ -74,72 +122,48 @@ class ExtractorService:
                 "address": search_data.get("address", search_data.get("snippet", "")),
                 "email": "",
                 "website": "N/A",
-                "website_exists": False
+                "website_exists": False,
+                "extraction_source": "search_data"
             }
             logger.info(f"Business without website: {data['business_name']}")
             return data
         
-        # Extract emails using regex
-        emails = self.extract_emails_regex(html_content)
+        # Scan the page off the event loop; only the emails and the prompt's slice come back
+        page = await page_parser.reduce(html_content, self.max_html_chars)
+        emails = page["emails"]
         
-        # Truncate HTML to avoid token limits
-        truncated_html = html_content[:8000]
+        # Size the prompt to the remaining token budget
+        budget = current_token_budget()
+        html_limit = self.max_html_chars
+        max_tokens = self.max_tokens
+        if budget:
+            html_limit = budget.scale_chars(self.max_html_chars, 1000)
+            max_tokens = budget.scale_max_tokens(self.max_tokens, 200)
         
-        prompt = f"""
-Extract business information from the following HTML content.
-
-Website URL: {url}
-Search Title: {search_title}
-
-Return ONLY a valid JSON object with these exact fields:
-{{
-    "business_name": "extracted business name or from title",
-    "owner_name": "owner/founder name if found, otherwise empty string",
-    "rating": "rating if found (e.g., 4.5), otherwise empty string",
-    "opening_hours": "opening hours if found, otherwise empty string",
-    "phone": "phone number if found, otherwise empty string",
-    "address": "address if found, otherwise empty string"
-}}
-
-HTML Content:
-{truncated_html[:4000]}
-
-Return ONLY the JSON object, no other text.
-"""
+        prompt = self.build_prompt(page["head"], url, search_title, html_limit)
+        
+        if budget and not budget.can_afford(estimate_tokens(prompt) + max_tokens):
+            logger.info(f"Token budget exhausted, using search data for {url}")
+            budget.record_skip("extraction")
+            return self._get_default_data(url, emails, search_title, search_data)
+        
+        deadline = current_deadline()
+        if deadline and not deadline.allows(settings.deadline_extraction_ms):
+            logger.info(f"Deadline close, using search data for {url}")
+            return self._get_default_data(url, emails, search_title, search_data, source="deadline")
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a data extraction expert. Extract business information and return ONLY valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Remove markdown code blocks if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-                content = content.strip()
-            
-            # Parse JSON
-            data = json.loads(content)
+            key = hashlib.sha256(f"{max_tokens}\n{prompt}".encode("utf-8")).hexdigest()
+            data = dict(await asyncio.wait_for(
+                self.inflight.do(key, lambda: self._complete(prompt, max_tokens, budget)),
+                timeout=deadline.remaining() if deadline else None
+            ))
             
             # Merge with search data (prefer extracted data)
             data["email"] = emails[0] if emails else ""
             data["website"] = url
             data["website_exists"] = True
+            data["extraction_source"] = "llm"
             
             # Fill missing fields from search data
             if not data.get("rating") and search_data.get("rating"):
@@ -154,6 +178,9 @@ Return ONLY the JSON object, no other text.
             logger.info(f"Successfully extracted data from {url}")
             return data
             
+        except asyncio.TimeoutError:
+            logger.warning(f"Deadline reached while extracting {url}, using search data")
+            return self._get_default_data(url, emails, search_title, search_data, source="deadline")
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error for {url}: {e}")
             return self._get_default_data(url, emails, search_title, search_data)
@@ -161,7 +188,65 @@ Return ONLY the JSON object, no other text.
             logger.error(f"Error extracting data from {url}: {e}")
             return self._get_default_data(url, emails, search_title, search_data)
     
-    def _get_default_data(self, url: str, emails: list, title: str = "", search_data: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def _complete(self, prompt: str, max_tokens: int, budget: Optional[TokenBudget]) -> Dict[str, Any]:
+        """
+        Run the extraction prompt and parse the JSON reply.
+        
+        Raises:
+            json.JSONDecodeError: If the model did not return valid JSON
+        """
+        params = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a data extraction expert. Extract business information and return ONLY valid JSON."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,
+            "max_tokens": max_tokens
+        }
+        
+        async def complete() -> Dict[str, Any]:
+            with track_stage("extraction"):
+                async with stage_limits.slot("extraction", overload=openai_overloaded):
+                    response = await traffic_archive.call(
+                        "openai.extraction", params,
+                        lambda: self.client.chat.completions.create(**params),
+                        encode=dump_model, decode=load_chat_completion
+                    )
+                
+                if budget:
+                    budget.record("extraction", self.model, response.usage)
+                
+                content = response.choices[0].message.content.strip()
+                
+                # Remove markdown code blocks if present
+                if content.startswith("```"):
+                    content = content.split("```")[1]
+                    if content.startswith("json"):
+                        content = content[4:]
+                    content = content.strip()
+                
+                return json.loads(content)
+        
+        # Cache hits cost no tokens; replies that are not valid JSON are never cached
+        return await shared_cache.fetch(
+            "openai.extraction", params, complete, ttl=settings.cache_extraction_ttl
+        )
+    
+    def _get_default_data(
+        self,
+        url: str,
+        emails: list,
+        title: str = "",
+        search_data: Dict[str, Any] = None,
+        source: str = "search_data"
+    ) -> Dict[str, Any]:
         """
         Return default data structure when extraction fails.
         
@@ -170,6 +255,7 @@ Return ONLY the JSON object, no other text.
             emails: List of found emails
             title: Search result title
             search_data: Additional search metadata
+            source: Recorded as extraction_source
             
         Returns:
             Default data dictionary
@@ -186,7 +272,8 @@ Return ONLY the JSON object, no other text.
             "address": search_data.get("address", search_data.get("snippet", "")),
             "email": emails[0] if emails else "",
             "website": url if url else "N/A",
-            "website_exists": bool(url and url != "N/A")
+            "website_exists": has_website(url),
+            "extraction_source": source
         }
 
 
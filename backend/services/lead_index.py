@@ -0,0 +1,186 @@
+"""
+Membership index of already-known leads, checked right after search.
+"""
+import asyncio
+import logging
+from typing import List, Dict, Any, Set, Tuple
+from config.settings import settings
+from utils.bloom import BloomFilter
+from utils.normalize import normalize_domain, normalize_phone
+from .lead_store import lead_store
+
+logger = logging.getLogger(__name__)
+
+
+class LeadIndex:
+    """
+    Fast "have we seen this business?" lookups keyed on domain, phone and place id.
+
+    Loaded once from the lead store and updated incrementally as leads are saved.
+    By default the keys live in in-memory sets. For very large stores the index
+    can instead keep only a Bloom filter in memory and confirm its (rare)
+    positives against the lead store's indexed columns, in one query per
+    batch of candidates on a worker thread.
+    """
+
+    def __init__(self):
+        self.use_bloom = settings.lead_index_use_bloom
+        self.bloom_capacity = settings.lead_index_bloom_capacity
+        self.bloom_error_rate = settings.lead_index_bloom_error_rate
+
+        # Hosts shared by many unrelated businesses are not an identity
+        self.shared_hosts = [
+            "facebook.com", "instagram.com", "linktr.ee", "wa.me", "google.com",
+            "sites.google.com", "twitter.com", "x.com", "linkedin.com", "youtube.com"
+        ]
+
+        self._domains = set()
+        self._phones = set()
+        self._place_ids = set()
+        self._bloom = None
+        self.loaded = False
+        self.checks = 0
+        self.hits = 0
+
+    def keys_for(self, item: Dict[str, Any]) -> Tuple[str, str, str]:
+        """
+        Normalized (domain, phone, place_id) for a search result or a lead.
+
+        Search results carry the website in "link", leads in "website".
+        """
+        domain = normalize_domain(item.get("link") or item.get("website", ""))
+        if domain in self.shared_hosts:
+            domain = ""
+        return domain, normalize_phone(item.get("phone", "")), item.get("place_id", "") or ""
+
+    def seed_from_sheet(self) -> int:
+        """
+        Import the leads already in Google Sheets into the lead store, once.
+
+        Deployments that predate the lead store have their history only in
+        the sheet. Its rows are stored as already replicated, skipping those
+        the store already has and repeats of a business within the sheet; a
+        failed read is retried on the next start.
+
+        Returns:
+            Number of leads imported
+        """
+        from .sheets_service import sheets_service
+
+        if lead_store.get_meta("sheet_seeded") or not sheets_service.is_configured():
+            return 0
+        try:
+            rows = sheets_service.read_leads()
+        except Exception as e:
+            logger.warning(f"Could not read past leads from Google Sheets, will retry on next start: {e}")
+            return 0
+
+        keys = [self.keys_for(lead) for lead in rows]
+        known = self._stored_keys(keys)
+        new = []
+        for lead, lead_keys in zip(rows, keys):
+            if self._matches(lead_keys, known):
+                continue
+            new.append(lead)
+            # Later rows of the same business count as known
+            for seen, value in zip(known, lead_keys):
+                if value:
+                    seen.add(value)
+        if new:
+            lead_store.add_leads(new, query="google sheet import", replicated=True)
+        lead_store.set_meta("sheet_seeded", str(len(new)))
+        logger.info(f"📥 Imported {len(new)} of {len(rows)} Google Sheet leads into the lead store")
+        return len(new)
+
+    def load(self) -> None:
+        """Build the index from every lead in the lead store (seeded from the sheet first)."""
+        if settings.lead_store_seed_from_sheet:
+            self.seed_from_sheet()
+        if self.use_bloom:
+            self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+
+        count = 0
+        for domain, phone, place_id in lead_store.iter_keys():
+            self._add_keys(domain if domain not in self.shared_hosts else "", phone, place_id)
+            count += 1
+
+        self.loaded = True
+        logger.info(f"Lead index loaded with {count} known leads ({'bloom' if self.use_bloom else 'exact'} mode)")
+
+    def _add_keys(self, domain: str, phone: str, place_id: str) -> None:
+        if self.use_bloom:
+            for prefix, value in (("d:", domain), ("p:", phone), ("g:", place_id)):
+                if value:
+                    self._bloom.add(prefix + value)
+            return
+
+        if domain:
+            self._domains.add(domain)
+        if phone:
+            self._phones.add(phone)
+        if place_id:
+            self._place_ids.add(place_id)
+
+    def add_leads(self, leads: List[Dict[str, Any]]) -> None:
+        """Record newly stored leads."""
+        if not self.loaded:
+            return
+        for lead in leads:
+            self._add_keys(*self.keys_for(lead))
+
+    def _stored_keys(self, keys: List[Tuple[str, str, str]]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """Known (domains, phones, place_ids) among the given keys, in one lead store query."""
+        return lead_store.known_keys(
+            [domain for domain, _, _ in keys],
+            [phone for _, phone, _ in keys],
+            [place_id for _, _, place_id in keys]
+        )
+
+    def _matches(self, keys: Tuple[str, str, str], known: Tuple[Set[str], Set[str], Set[str]]) -> bool:
+        """Whether any non-empty key is among the known (domains, phones, place_ids)."""
+        return any(value and value in values for value, values in zip(keys, known))
+
+    def _maybe_known(self, keys: Tuple[str, str, str]) -> bool:
+        return any(
+            prefix + value in self._bloom
+            for prefix, value in zip(("d:", "p:", "g:"), keys)
+            if value
+        )
+
+    async def find_known(self, items: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Check which search results or leads match a known business.
+
+        In bloom mode the filter's positives of the whole batch are confirmed
+        with one lead store query, run on a worker thread so the search loop
+        is not blocked on SQLite.
+
+        Returns:
+            One flag per item, in order
+        """
+        if not self.loaded or not items:
+            return [False] * len(items)
+
+        self.checks += len(items)
+        keys = [self.keys_for(item) for item in items]
+
+        if self.use_bloom:
+            candidates = [item_keys for item_keys in keys if self._maybe_known(item_keys)]
+            known = (set(), set(), set())
+            if candidates:
+                known = await asyncio.to_thread(self._stored_keys, candidates)
+        else:
+            known = (self._domains, self._phones, self._place_ids)
+
+        found = [self._matches(item_keys, known) for item_keys in keys]
+        self.hits += sum(found)
+        return found
+
+    async def filter_new(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop candidates that match a known business."""
+        known = await self.find_known(candidates)
+        return [candidate for candidate, is_known in zip(candidates, known) if not is_known]
+
+
+# Singleton instance
+lead_index = LeadIndex()
@@ -0,0 +1,243 @@
+"""
+Incremental refresh of stored leads.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from config.settings import settings
+from utils.normalize import has_website, normalize_domain, normalize_phone
+from .email_generator import email_generator
+from .extractor_service import extractor_service
+from .lead_index import lead_index
+from .lead_store import lead_store
+from .scraper_service import content_hash, scraper_service
+from .search_service import GOOGLE_MAPS, search_service
+
+logger = logging.getLogger(__name__)
+
+# Search result fields a lead is built from
+SEARCH_INPUTS = ("title", "link", "phone", "address", "rating", "hours")
+
+# Lead field filled from each search input when extraction does not run
+LEAD_FIELDS = {
+    "title": "business_name",
+    "phone": "phone",
+    "address": "address",
+    "rating": "rating",
+    "hours": "opening_hours",
+}
+
+STATUSES = ("unchanged", "updated", "reextracted", "skipped", "failed")
+
+
+def snapshot_inputs(search_result: Dict[str, Any], page: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    What a lead was built from: its search fields and page fingerprint.
+
+    Stored with the lead so a refresh can tell which inputs changed since.
+    """
+    inputs = {field: str(search_result.get(field) or "") for field in SEARCH_INPUTS}
+    if page and page.get("success") and not page.get("not_modified"):
+        inputs["content_hash"] = content_hash(page["html_content"])
+        inputs["etag"] = page.get("etag", "")
+        inputs["last_modified"] = page.get("last_modified", "")
+    return inputs
+
+
+def _normalized(field: str, value: str) -> str:
+    if field == "link":
+        return normalize_domain(value)
+    if field == "phone":
+        return normalize_phone(value)
+    return " ".join(value.lower().split())
+
+
+class LeadRefresher:
+    """
+    Re-checks stored leads cheaply and re-processes only what changed.
+
+    Each lead gets fresh place details (when it came from Google Maps) and a
+    conditional GET of its website using the stored ETag / Last-Modified,
+    falling back to comparing content hashes. Extraction runs again only when
+    the website appeared, moved, disappeared or its content changed; the cold
+    email is regenerated only when its prompt would differ. Leads stored
+    before input snapshots existed get one as a baseline on their first
+    refresh. Every lead is written back as soon as it is done.
+    """
+
+    def __init__(self):
+        self.concurrency = settings.refresh_concurrency
+
+    def _stored_inputs(self, lead: Dict[str, Any]) -> Dict[str, str]:
+        """Inputs of a lead that has no snapshot, reconstructed from its fields."""
+        website = lead.get("website", "")
+        return {
+            "title": lead.get("business_name", ""),
+            "link": website if has_website(website) else "",
+            "phone": lead.get("phone", ""),
+            "address": lead.get("address", ""),
+            "rating": str(lead.get("rating") or ""),
+            "hours": lead.get("opening_hours", ""),
+        }
+
+    def _maps_place_id(self, lead: Dict[str, Any]) -> str:
+        """
+        Google Maps place id of a lead, or "" when it came from another search source.
+
+        Serper results carry Serper's placeId / cid, which Google Maps place
+        details does not know. Leads stored before the source was recorded
+        are told apart by the id itself: a Serper cid is all digits.
+        """
+        place_id = lead.get("place_id") or ""
+        source = lead.get("search_source")
+        if source:
+            return place_id if source == GOOGLE_MAPS else ""
+        return "" if place_id.isdigit() else place_id
+
+    async def _check(
+        self,
+        lead: Dict[str, Any],
+        check_places: bool,
+        regenerate_emails: bool
+    ) -> Tuple[str, Dict[str, Any], List[str]]:
+        """Re-check one lead; returns (status, updated lead, changed inputs and outputs)."""
+        stored = lead.get("inputs") or {}
+        baseline = not stored
+        current = dict(stored or self._stored_inputs(lead))
+
+        place_id = self._maps_place_id(lead) if check_places else ""
+        if place_id:
+            place = await search_service.lookup_place(place_id)
+            if place:
+                current.update({field: str(place.get(field) or "") for field in SEARCH_INPUTS})
+
+        changes = [] if baseline else [
+            field for field in SEARCH_INPUTS
+            if _normalized(field, current[field]) != _normalized(field, stored.get(field, ""))
+        ]
+
+        page = None
+        page_changed = False
+        if current["link"]:
+            same_site = current["link"] == stored.get("link")
+            page = await scraper_service.revalidate(
+                current["link"],
+                etag=stored.get("etag", "") if same_site else "",
+                last_modified=stored.get("last_modified", "") if same_site else ""
+            )
+            if page.get("success") and not page.get("not_modified"):
+                fingerprint = snapshot_inputs({}, page)
+                page_changed = not baseline and fingerprint["content_hash"] != stored.get("content_hash")
+                current.update(fingerprint)
+            elif not page.get("success"):
+                logger.info(f"Website of lead {lead['id']} unreachable, keeping its stored data")
+        if page_changed:
+            changes.append("content")
+
+        updated = dict(lead)
+        reextract = page_changed or "link" in changes
+        if reextract:
+            html = page["html_content"] if page and page.get("success") and not page.get("not_modified") else ""
+            data = await extractor_service.extract_business_data(
+                html_content=html,
+                url=current["link"],
+                search_title=current["title"],
+                search_data={**current, "snippet": current["address"]}
+            )
+            updated.setdefault("path", {})["extraction"] = data.pop("extraction_source", "llm")
+            if data.get("email") != lead.get("email"):
+                updated.pop("email_status", None)  # validated a different address
+            updated.update(data)
+        else:
+            for field in changes:
+                if field in LEAD_FIELDS:
+                    updated[LEAD_FIELDS[field]] = current[field]
+
+        if regenerate_emails and email_generator.build_prompt(updated) != email_generator.build_prompt(lead):
+            updated["cold_email"], updated.setdefault("path", {})["email"] = await email_generator.compose(updated)
+            changes.append("cold_email")
+
+        updated["inputs"] = current
+        updated["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+        status = "reextracted" if reextract else "updated" if changes else "unchanged"
+        return status, updated, changes
+
+    async def refresh_lead(
+        self,
+        lead: Dict[str, Any],
+        cutoff: str,
+        check_places: bool = True,
+        regenerate_emails: bool = True
+    ) -> Dict[str, Any]:
+        """Refresh one stored lead unless it was checked after cutoff; returns its outcome."""
+        outcome = {
+            "id": lead["id"],
+            "business_name": lead.get("business_name", ""),
+            "status": "skipped",
+            "changes": []
+        }
+        if (lead.get("refreshed_at") or lead.get("created_at", "")) > cutoff:
+            return outcome
+
+        try:
+            status, updated, changes = await self._check(lead, check_places, regenerate_emails)
+            # Written back even when unchanged, to record the check time
+            await asyncio.to_thread(lead_store.update_lead, lead["id"], updated)
+            if status != "unchanged":
+                lead_index.add_leads([updated])
+            outcome.update(status=status, changes=changes)
+        except Exception as e:
+            logger.error(f"Error refreshing lead {lead['id']}: {e}", exc_info=True)
+            outcome.update(status="failed", error=str(e))
+        return outcome
+
+    async def refresh(
+        self,
+        query: Optional[str] = None,
+        limit: int = 100,
+        min_age_hours: float = 24.0,
+        check_places: bool = True,
+        regenerate_emails: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Refresh up to limit stored leads, oldest first.
+
+        Args:
+            query: Only leads stored for this search query
+            limit: Leads to look at (skipped ones included)
+            min_age_hours: Skip leads created or refreshed more recently
+            check_places: Re-fetch Google Maps place details
+            regenerate_emails: Rewrite cold emails whose inputs changed
+
+        Yields:
+            One outcome per lead as it completes
+        """
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=min_age_hours)).isoformat()
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def refresh_one(lead: Dict[str, Any]) -> Dict[str, Any]:
+            async with slots:
+                return await self.refresh_lead(lead, cutoff, check_places, regenerate_emails)
+
+        after_id, seen = 0, 0
+        while seen < limit:
+            leads = await asyncio.to_thread(
+                lead_store.list_leads, query=query, after_id=after_id, limit=min(limit - seen, 200)
+            )
+            if not leads:
+                return
+            after_id = leads[-1]["id"]
+            seen += len(leads)
+
+            tasks = [asyncio.create_task(refresh_one(lead)) for lead in leads]
+            try:
+                for done in asyncio.as_completed(tasks):
+                    yield await done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+
+# Singleton instance
+lead_refresher = LeadRefresher()
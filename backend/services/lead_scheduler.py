@@ -0,0 +1,141 @@
+"""
+Two-lane scheduler for processing search results into leads.
+"""
+import asyncio
+import logging
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Tuple
+from config.settings import settings
+from utils import tracing
+from utils.deadline import current_deadline
+from utils.fair_queue import FairSemaphore
+from utils.normalize import has_website
+from .tenants import DEFAULT_TENANT, current_tenant
+
+logger = logging.getLogger(__name__)
+
+LeadProcessor = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class LeadScheduler:
+    """
+    Runs cheap and expensive leads in separate lanes.
+
+    Businesses without a website need no scrape and no extraction call, so they
+    go to the fast lane and finish immediately. Businesses with a website go to
+    the slow lane, whose concurrency is capped so it cannot starve the fast one.
+
+    Both lanes are shared by every request and hand out slots in weighted fair
+    order across tenants, so one team's 50-lead request cannot hold the scrape
+    and LLM capacity while another team's small request waits behind it.
+    """
+
+    def __init__(self):
+        self.fast_lane_concurrency = settings.fast_lane_concurrency
+        self.slow_lane_concurrency = settings.slow_lane_concurrency
+        self._fast_lane = None
+        self._slow_lane = None
+
+    def _lanes(self) -> Tuple[FairSemaphore, FairSemaphore]:
+        # Created lazily so waiters bind to the running event loop
+        if self._fast_lane is None:
+            self._fast_lane = FairSemaphore(self.fast_lane_concurrency)
+            self._slow_lane = FairSemaphore(self.slow_lane_concurrency)
+        return self._fast_lane, self._slow_lane
+
+    def queue_stats(self, tenant: str = None) -> Dict[str, Any]:
+        """Lane queue statistics of one tenant, or of every tenant by name."""
+        fast_lane, slow_lane = self._lanes()
+        return {"fast_lane": fast_lane.stats(tenant), "slow_lane": slow_lane.stats(tenant)}
+
+    def is_fast_path(self, search_result: Dict[str, Any]) -> bool:
+        """Check if a search result can skip scraping and extraction."""
+        return not has_website(search_result.get("link", ""))
+
+    async def _run_in_lane(
+        self,
+        lane: FairSemaphore,
+        index: int,
+        search_result: Dict[str, Any],
+        process: LeadProcessor
+    ) -> Tuple[int, Dict[str, Any]]:
+        # Each lead runs in its own task, so the label stays with its spans
+        tracing.set_lead(f"#{index} {search_result.get('title', '')}".strip())
+        lane_name = "queue.fast_lane" if lane is self._fast_lane else "queue.slow_lane"
+        tenant = current_tenant()
+        with tracing.span(lane_name):
+            await lane.acquire(
+                tenant.name if tenant else DEFAULT_TENANT,
+                tenant.weight if tenant else 1.0
+            )
+        try:
+            with tracing.span("lead"):
+                return index, await process(search_result)
+        finally:
+            lane.release()
+
+    async def run(
+        self,
+        search_results: List[Dict[str, Any]],
+        process: LeadProcessor,
+        max_results: int
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Process search results, yielding leads as soon as each one completes.
+
+        Args:
+            search_results: Results from the search service, in search order
+            process: Coroutine turning one search result into a lead
+            max_results: Stop once this many leads have been produced
+
+        Yields:
+            (search index, lead) tuples in completion order; when the request
+            deadline passes, unfinished leads are dropped
+        """
+        fast_lane, slow_lane = self._lanes()
+
+        # Fast-lane tasks are created first so they get the loop right away
+        ordered = sorted(
+            enumerate(search_results),
+            key=lambda item: not self.is_fast_path(item[1])
+        )
+        tasks = [
+            asyncio.create_task(self._run_in_lane(
+                fast_lane if self.is_fast_path(result) else slow_lane,
+                idx,
+                result,
+                process
+            ))
+            for idx, result in ordered
+        ]
+
+        # Stages give up at the deadline minus its reserve and finish on their
+        # fallbacks; half the reserve is left for those before cutting off
+        deadline = current_deadline()
+        timeout = deadline.remaining() + deadline.reserve / 2 if deadline else None
+        produced = 0
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=timeout):
+                try:
+                    index, lead = await next_done
+                except asyncio.TimeoutError:
+                    logger.warning(f"Deadline reached, returning {produced} completed leads")
+                    break
+                except Exception as e:
+                    logger.error(f"Error processing lead: {e}", exc_info=True)
+                    continue
+
+                if not lead:
+                    continue
+
+                yield index, lead
+                produced += 1
+                if produced >= max_results:
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# Singleton instance
+lead_scheduler = LeadScheduler()
@@ -0,0 +1,126 @@
+"""
+Lead scoring service to rank search candidates before the expensive stages.
+"""
+import logging
+from typing import List, Dict, Any
+from urllib.parse import urlparse
+from config.settings import settings
+from utils.normalize import has_website
+
+logger = logging.getLogger(__name__)
+
+
+class LeadScorer:
+    """
+    Scores the whole candidate set in one NumPy pass.
+
+    Each candidate becomes a row of normalized features in [0, 1]; the score
+    is the weighted average of that row, so only the top N candidates get a
+    scrape and LLM calls.
+    """
+
+    FEATURES = ("rating", "reviews", "no_website", "is_place", "domain")
+
+    def __init__(self):
+        self.weights = settings.lead_score_weights
+        self.review_saturation = 500  # review count that maps to a full signal
+
+        # Aggregators and directories are not the business itself
+        self.low_reputation_domains = [
+            "justdial.com", "zomato.com", "swiggy.com", "tripadvisor.", "yelp.com",
+            "sulekha.com", "indiamart.com", "magicpin.in", "yellowpages.", "wikipedia.org",
+            "instagram.com", "facebook.com", "linkedin.com"
+        ]
+        # Free builders and listing pages: a real business, but an easy pitch
+        self.builder_domains = [
+            "business.site", "wixsite.com", "blogspot.com", "wordpress.com",
+            "weebly.com", "godaddysites.com", "sites.google.com"
+        ]
+
+    def _to_float(self, value: Any) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def domain_reputation(self, url: str) -> float:
+        """Score a candidate's domain between 0 (directory) and 1 (own domain)."""
+        if not has_website(url):
+            return 0.5
+
+        host = urlparse(url if "://" in url else f"http://{url}").netloc.lower()
+        if any(domain in host for domain in self.low_reputation_domains):
+            return 0.0
+        if any(domain in host for domain in self.builder_domains):
+            return 0.6
+        return 1.0
+
+    def _feature_matrix(self, candidates: List[Dict[str, Any]]):
+        """Build the (n_candidates x n_features) matrix of normalized signals."""
+        import numpy as np
+
+        ratings = np.array([self._to_float(c.get("rating")) for c in candidates])
+        reviews = np.array([self._to_float(c.get("reviews")) for c in candidates])
+        with_website = np.array([has_website(c.get("link", "")) for c in candidates], dtype=float)
+        is_place = np.array([bool(c.get("is_place")) for c in candidates], dtype=float)
+        domain = np.array([self.domain_reputation(c.get("link", "")) for c in candidates])
+
+        return np.column_stack([
+            np.clip(ratings / 5.0, 0.0, 1.0),
+            np.clip(np.log1p(reviews) / np.log1p(self.review_saturation), 0.0, 1.0),
+            1.0 - with_website,
+            is_place,
+            domain,
+        ])
+
+    def score(self, candidates: List[Dict[str, Any]]):
+        """
+        Score every candidate.
+
+        Args:
+            candidates: Search results from the search service
+
+        Returns:
+            NumPy array of scores in [0, 1], aligned with candidates
+        """
+        import numpy as np
+
+        if not candidates:
+            return np.zeros(0)
+
+        weights = np.array([float(self.weights.get(f, 0.0)) for f in self.FEATURES])
+        total = weights.sum()
+        if total <= 0:
+            return np.zeros(len(candidates))
+
+        return self._feature_matrix(candidates) @ (weights / total)
+
+    def rank(self, candidates: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+        """
+        Rank candidates by score and keep the best ones.
+
+        Args:
+            candidates: Search results from the search service
+            top_n: Number of candidates to keep
+
+        Returns:
+            The top_n candidates, best first, each with a "score" field
+        """
+        import numpy as np
+
+        scores = self.score(candidates)
+        # Stable sort keeps search order between equal scores
+        order = np.argsort(-scores, kind="stable")[:top_n]
+
+        ranked = []
+        for idx in order:
+            candidate = dict(candidates[idx])
+            candidate["score"] = round(float(scores[idx]), 4)
+            ranked.append(candidate)
+
+        logger.info(f"Scored {len(candidates)} candidates, keeping top {len(ranked)}")
+        return ranked
+
+
+# Singleton instance
+lead_scorer = LeadScorer()
@@ -0,0 +1,348 @@
+"""
+Local SQLite lead store, the primary record of every generated lead.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set, Tuple
+from config.settings import settings
+from utils.normalize import normalize_domain, normalize_phone, normalize_email
+
+logger = logging.getLogger(__name__)
+
+
+class LeadStore:
+    """
+    Embedded lead database indexed by website domain, email, phone, place id and query.
+
+    Leads are written here first; rows with ``replicated = 0`` are picked up
+    by the Sheets sink and copied to Google Sheets in batches.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS leads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            query TEXT NOT NULL DEFAULT '',
+            business_name TEXT NOT NULL DEFAULT '',
+            domain TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            phone TEXT NOT NULL DEFAULT '',
+            place_id TEXT NOT NULL DEFAULT '',
+            replicated INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads(domain);
+        CREATE INDEX IF NOT EXISTS idx_leads_email ON leads(email);
+        CREATE INDEX IF NOT EXISTS idx_leads_phone ON leads(phone);
+        CREATE INDEX IF NOT EXISTS idx_leads_query ON leads(query);
+        CREATE INDEX IF NOT EXISTS idx_leads_place_id ON leads(place_id);
+        CREATE INDEX IF NOT EXISTS idx_leads_created_at ON leads(created_at);
+        CREATE INDEX IF NOT EXISTS idx_leads_unreplicated ON leads(id) WHERE replicated = 0;
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.lead_store_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use (callers hold the lock)."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate()
+            self._conn.executescript(self.SCHEMA)
+            logger.info(f"Lead store ready at {self.db_path}")
+        return self._conn
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(leads)")}
+        if columns and "place_id" not in columns:
+            self._conn.execute("ALTER TABLE leads ADD COLUMN place_id TEXT NOT NULL DEFAULT ''")
+            self._conn.commit()
+
+    def add_leads(self, leads: List[Dict[str, Any]], query: str = "", replicated: bool = False) -> List[int]:
+        """
+        Insert leads and queue them for replication to Sheets.
+
+        Args:
+            leads: Lead dictionaries as produced by the pipeline
+            query: Search query that produced the leads
+            replicated: The leads are already in the sheet (imported from it)
+
+        Returns:
+            Row ids of the inserted leads
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        ids = []
+        with self._lock, self.conn:
+            for lead in leads:
+                cursor = self.conn.execute(
+                    "INSERT INTO leads (created_at, query, business_name, domain, email, phone, place_id, replicated, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        now,
+                        query,
+                        lead.get("business_name", ""),
+                        normalize_domain(lead.get("website", "")),
+                        normalize_email(lead.get("email", "")),
+                        normalize_phone(lead.get("phone", "")),
+                        lead.get("place_id", "") or "",
+                        int(replicated),
+                        json.dumps(lead),
+                    )
+                )
+                ids.append(cursor.lastrowid)
+
+        logger.info(f"Stored {len(ids)} leads locally")
+        return ids
+
+    def update_lead(self, lead_id: int, lead: Dict[str, Any]) -> None:
+        """Rewrite a stored lead in place; its id, query and created_at are kept."""
+        data = {key: value for key, value in lead.items() if key not in ("id", "query", "created_at")}
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE leads SET business_name = ?, domain = ?, email = ?, phone = ?, place_id = ?, data = ? "
+                "WHERE id = ?",
+                (
+                    data.get("business_name", ""),
+                    normalize_domain(data.get("website", "")),
+                    normalize_email(data.get("email", "")),
+                    normalize_phone(data.get("phone", "")),
+                    data.get("place_id", "") or "",
+                    json.dumps(data),
+                    lead_id,
+                )
+            )
+
+    def fetch_unreplicated(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Oldest leads not yet copied to Google Sheets."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, data FROM leads WHERE replicated = 0 ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [(row["id"], json.loads(row["data"])) for row in rows]
+
+    def mark_replicated(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE leads SET replicated = 1 WHERE id = ?",
+                [(lead_id,) for lead_id in ids]
+            )
+
+    def count_unreplicated(self) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM leads WHERE replicated = 0"
+            ).fetchone()[0]
+
+    def _filters(
+        self,
+        query: Optional[str],
+        domain: Optional[str],
+        email: Optional[str],
+        phone: Optional[str],
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        emails: Optional[List[str]] = None,
+        ids: Optional[List[int]] = None
+    ) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        if query:
+            clauses.append("query = ?")
+            params.append(query)
+        if domain:
+            clauses.append("domain = ?")
+            params.append(normalize_domain(domain))
+        if email:
+            clauses.append("email = ?")
+            params.append(normalize_email(email))
+        if phone:
+            clauses.append("phone = ?")
+            params.append(normalize_phone(phone))
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if emails is not None:
+            clauses.append(f"email IN ({', '.join('?' * len(emails)) or 'NULL'})")
+            params.extend(normalize_email(address) for address in emails)
+        if ids is not None:
+            clauses.append(f"id IN ({', '.join('?' * len(ids)) or 'NULL'})")
+            params.extend(ids)
+        return clauses, params
+
+    def list_leads(
+        self,
+        query: Optional[str] = None,
+        domain: Optional[str] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        after_id: int = 0,
+        limit: int = 50,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        emails: Optional[List[str]] = None,
+        ids: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Page through stored leads in insertion order.
+
+        Uses keyset pagination: pass the last id of the previous page as after_id.
+        since/until bound created_at (ISO 8601 UTC, until exclusive); emails
+        keeps leads whose address is one of the given ones, ids the leads
+        with one of the given ids.
+
+        Returns:
+            Lead dictionaries with their id, query and created_at
+        """
+        clauses, params = self._filters(query, domain, email, phone, since, until, emails, ids)
+        clauses.append("id > ?")
+        params.append(after_id)
+
+        sql = (
+            "SELECT id, created_at, query, data FROM leads WHERE "
+            + " AND ".join(clauses)
+            + " ORDER BY id LIMIT ?"
+        )
+        with self._lock:
+            rows = self.conn.execute(sql, (*params, limit)).fetchall()
+
+        leads = []
+        for row in rows:
+            lead = json.loads(row["data"])
+            lead["id"] = row["id"]
+            lead["query"] = row["query"]
+            lead["created_at"] = row["created_at"]
+            leads.append(lead)
+        return leads
+
+    def count_leads(
+        self,
+        query: Optional[str] = None,
+        domain: Optional[str] = None,
+        email: Optional[str] = None,
+        phone: Optional[str] = None
+    ) -> int:
+        clauses, params = self._filters(query, domain, email, phone)
+        sql = "SELECT COUNT(*) FROM leads"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()[0]
+
+    def iter_keys(self, batch_size: int = 10000):
+        """
+        Yield (domain, phone, place_id) for every stored lead.
+
+        Used to build the membership index without loading full rows.
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT id, domain, phone, place_id FROM leads WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["domain"], row["phone"], row["place_id"]
+            last_id = rows[-1]["id"]
+
+    def exists(self, domain: str = "", phone: str = "", place_id: str = "") -> bool:
+        """Check whether any stored lead matches one of the given normalized keys."""
+        clauses, params = [], []
+        for column, value in (("domain", domain), ("phone", phone), ("place_id", place_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if not clauses:
+            return False
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM leads WHERE " + " OR ".join(clauses) + " LIMIT 1",
+                params
+            ).fetchone()
+        return row is not None
+
+    def known_keys(self, domains: List[str], phones: List[str], place_ids: List[str]) -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        Check many normalized keys at once.
+
+        Returns:
+            (domains, phones, place_ids) of the given keys that a stored lead has
+        """
+        found = []
+        with self._lock:
+            for column, values in (("domain", domains), ("phone", phones), ("place_id", place_ids)):
+                values = sorted({value for value in values if value})
+                matches = set()
+                # Stay well below SQLite's limit on bound parameters
+                for start in range(0, len(values), 500):
+                    chunk = values[start:start + 500]
+                    rows = self.conn.execute(
+                        f"SELECT DISTINCT {column} FROM leads WHERE {column} IN ({', '.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    matches.update(row[0] for row in rows)
+                found.append(matches)
+        return found[0], found[1], found[2]
+
+    def latest_ids_by_email(self, emails: List[str]) -> Dict[str, int]:
+        """
+        Id of the most recently stored lead for each address.
+
+        Returns:
+            Normalized address -> lead id, for the addresses a stored lead has
+        """
+        addresses = sorted({normalize_email(address) for address in emails if address})
+        found = {}
+        with self._lock:
+            for start in range(0, len(addresses), 500):
+                chunk = addresses[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT email, MAX(id) FROM leads WHERE email IN ({', '.join('?' * len(chunk))}) GROUP BY email",
+                    chunk
+                ).fetchall()
+                found.update((row[0], row[1]) for row in rows)
+        return found
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Singleton instance
+lead_store = LeadStore()
@@ -2,15 +2,34 @@
 Email sending service using SMTP (Gmail compatible).
 """
 
+import asyncio
 import logging
 import ssl
-import aiosmtplib
 from email.message import EmailMessage
-from typing import List, Dict
+from typing import List, Dict, Any, Callable, Optional, Tuple
 from config.settings import settings
+from utils.metrics import track_stage
+from utils.rate_limiter import RateLimiter, DailyCap
+from .smtp_pool import SMTPConnectionPool, is_transient_error, smtp_request
+from .record_replay import traffic_archive
 
 logger = logging.getLogger(__name__)
 
+# Error of a message deferred because today's sending cap is used up
+CAP_REACHED = "daily sending cap reached"
+
+# Default sending limits per provider: (messages per minute, messages per day)
+PROVIDER_LIMITS = {
+    "gmail": (20, 500),
+    "googlemail": (20, 500),
+    "office365": (30, 10000),
+    "outlook": (30, 300),
+    "zoho": (30, 500),
+    "sendgrid": (600, 0),
+    "amazonaws": (840, 0),   # SES default: 14/s
+    "mailgun": (600, 0),
+}
+
 
 class MailService:
     """Service for sending emails via SMTP."""
@@ -22,6 +41,75 @@ class MailService:
         self.smtp_password = settings.smtp_password
         self.from_email = settings.smtp_from_email
         self.from_name = settings.smtp_from_name
+        self.security = settings.smtp_security
+        self._tls_context = None
+        self.pool = SMTPConnectionPool(self._connect_kwargs)
+        self.send_concurrency = settings.smtp_send_concurrency
+        self.max_attempts = settings.smtp_max_attempts
+        self._throttles: Dict[str, Tuple[RateLimiter, DailyCap]] = {}
+
+    @property
+    def tls_context(self) -> ssl.SSLContext:
+        """Default TLS context, built once instead of per message."""
+        if self._tls_context is None:
+            self._tls_context = ssl.create_default_context()
+        return self._tls_context
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        """Connection arguments shared by one-off sends and pooled connections."""
+        security = self.security
+        if security == "auto":
+            security = "tls" if self.smtp_port == 465 else "starttls"
+
+        kwargs = {
+            "hostname": self.smtp_host,
+            "port": self.smtp_port,
+            "username": self.smtp_username,
+            "password": self.smtp_password,
+            "use_tls": security == "tls",
+            "start_tls": security == "starttls",
+        }
+        if security in ("tls", "starttls"):
+            kwargs["tls_context"] = self.tls_context
+        return kwargs
+
+    def _build_message(self, to_email: str, subject: str, body: str, is_html: bool = False) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = f"{self.from_name} <{self.from_email}>"
+        message["To"] = to_email
+        message["Subject"] = subject
+
+        if is_html:
+            message.add_alternative(body, subtype="html")
+        else:
+            message.set_content(body)
+        return message
+
+    def provider_limits(self) -> Tuple[float, int]:
+        """(messages per minute, daily cap) for the configured SMTP host; 0 = unlimited."""
+        per_minute, per_day = 0, 0
+        host = (self.smtp_host or "").lower()
+        for provider, limits in PROVIDER_LIMITS.items():
+            if provider in host:
+                per_minute, per_day = limits
+                break
+
+        if settings.smtp_rate_per_minute is not None:
+            per_minute = settings.smtp_rate_per_minute
+        if settings.smtp_daily_cap is not None:
+            per_day = settings.smtp_daily_cap
+        return per_minute, per_day
+
+    def _throttle(self) -> Tuple[RateLimiter, DailyCap]:
+        """Rate limiter and daily cap shared by every campaign to this host."""
+        host = self.smtp_host or ""
+        if host not in self._throttles:
+            per_minute, per_day = self.provider_limits()
+            self._throttles[host] = (
+                RateLimiter(per_minute / 60, burst=self.send_concurrency),
+                DailyCap(per_day)
+            )
+        return self._throttles[host]
 
     def is_configured(self) -> bool:
         """Check if SMTP is properly configured."""
@@ -38,48 +126,35 @@ class MailService:
         to_email: str,
         subject: str,
         body: str,
-        is_html: bool = False
+        is_html: bool = False,
+        pooled: bool = False
     ) -> bool:
-        """Send a single email."""
+        """
+        Send a single email.
+
+        With pooled=True the message goes over a persistent connection from
+        the SMTP pool instead of a fresh connect + TLS + AUTH.
+        """
 
         if not self.is_configured():
             logger.warning("SMTP not configured. Skipping email.")
             return False
 
         try:
-            message = EmailMessage()
-            message["From"] = f"{self.from_name} <{self.from_email}>"
-            message["To"] = to_email
-            message["Subject"] = subject
+            message = self._build_message(to_email, subject, body, is_html)
 
-            if is_html:
-                message.add_alternative(body, subtype="html")
+            if pooled:
+                # Reuse an authenticated session from the pool
+                await self.pool.send_message(message)
             else:
-                message.set_content(body)
-
-            context = ssl.create_default_context()
-
-            # Port handling
-            if self.smtp_port == 465:
-                await aiosmtplib.send(
-                    message,
-                    hostname=self.smtp_host,
-                    port=self.smtp_port,
-                    username=self.smtp_username,
-                    password=self.smtp_password,
-                    use_tls=True,
-                    tls_context=context,
-                )
-            else:
-                await aiosmtplib.send(
-                    message,
-                    hostname=self.smtp_host,
-                    port=self.smtp_port,
-                    username=self.smtp_username,
-                    password=self.smtp_password,
-                    start_tls=True,
-                    tls_context=context,
-                )
+                import aiosmtplib
+
+                with track_stage("smtp_send"):
+                    await traffic_archive.call(
+                        "smtp", smtp_request(message),
+                        lambda: aiosmtplib.send(message, **self._connect_kwargs()),
+                        encode=lambda _: None
+                    )
 
             logger.info(f"✅ Email sent successfully to {to_email}")
             return True
@@ -88,42 +163,139 @@ class MailService:
             logger.error(f"❌ Failed to send email to {to_email}: {str(e)}")
             return False
 
+    def _classify_error(self, error: Exception) -> str:
+        """Map an SMTP error to "deferred" (4xx, retry later) or "failed"."""
+        return "deferred" if is_transient_error(error) else "failed"
+
+    async def _send_one(self, recipient: Dict, subject: str, attempt: int) -> Dict[str, Any]:
+        """Send one bulk message and report its outcome."""
+        email = recipient.get("email")
+        result = {"email": email, "status": "failed", "attempts": attempt, "error": ""}
+        if "id" in recipient:
+            result["id"] = recipient["id"]
+
+        if not email:
+            result["error"] = "missing email"
+            return result
+
+        limiter, daily_cap = self._throttle()
+        if not daily_cap.try_take():
+            result["status"] = "deferred"
+            result["error"] = CAP_REACHED
+            return result
+
+        await limiter.acquire()
+        try:
+            message = self._build_message(email, subject, recipient.get("body", ""))
+            await self.pool.send_message(message)
+            limiter.recover()
+            result["status"] = "sent"
+            logger.info(f"✅ Email sent successfully to {email}")
+        except Exception as e:
+            daily_cap.give_back()
+            result["status"] = self._classify_error(e)
+            result["error"] = str(e)
+            if result["status"] == "deferred":
+                # The provider is pushing back: slow everyone down
+                limiter.slow_down()
+                logger.warning(f"⏳ Deferred {email} (attempt {attempt}): {e}")
+            else:
+                logger.error(f"❌ Failed to send email to {email}: {e}")
+        return result
+
     async def send_bulk_emails(
         self,
         recipients: List[Dict],
         subject_template: str = "Business Opportunity",
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        max_attempts: Optional[int] = None
     ) -> Dict:
-        """Send multiple emails."""
+        """
+        Send multiple emails concurrently within the provider's rate limits.
+
+        Up to send_concurrency workers share the pooled SMTP connections and a
+        per-provider rate limiter and daily cap. Deferrals (421/451 and other
+        4xx) slow the limiter down and are retried with backoff up to
+        max_attempts times.
+
+        Args:
+            recipients: Dicts with "email" and "body"
+            subject_template: Subject line for every message
+            on_result: Optional callback (sync or async) invoked with each
+                recipient's final result as soon as it is known
+            max_attempts: Overrides the in-memory retry limit (1 = no retries,
+                e.g. when the caller schedules retries itself)
+
+        Returns:
+            Counts of sent/failed/deferred, failed addresses and per-recipient results
+        """
+        if not self.is_configured():
+            logger.warning("SMTP not configured. Skipping email.")
+            return {
+                "sent": 0,
+                "failed": len(recipients),
+                "deferred": 0,
+                "errors": [r.get("email") for r in recipients if r.get("email")],
+                "results": []
+            }
 
         results = {
             "sent": 0,
             "failed": 0,
-            "errors": []
+            "deferred": 0,
+            "errors": [],
+            "results": []
         }
 
+        max_attempts = max_attempts or self.max_attempts
+        queue: asyncio.Queue = asyncio.Queue()
         for recipient in recipients:
-            email = recipient.get("email")
-            body = recipient.get("body", "")
-
-            if not email:
-                results["failed"] += 1
-                continue
-
-            success = await self.send_email(
-                to_email=email,
-                subject=subject_template,
-                body=body,
-                is_html=False
-            )
+            queue.put_nowait((recipient, 1))
 
-            if success:
-                results["sent"] += 1
-            else:
-                results["failed"] += 1
-                results["errors"].append(email)
+        async def report(result: Dict[str, Any]):
+            results[result["status"]] += 1
+            results["results"].append(result)
+            if result["status"] == "failed" and result["email"]:
+                results["errors"].append(result["email"])
+            if on_result is not None:
+                outcome = on_result(result)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+
+        async def retry_later(recipient: Dict, attempt: int, delay: float):
+            await asyncio.sleep(delay)
+            queue.put_nowait((recipient, attempt))
+            queue.task_done()  # for the attempt that was deferred
+
+        retries = []
+
+        async def worker():
+            while True:
+                recipient, attempt = await queue.get()
+                try:
+                    result = await self._send_one(recipient, subject_template, attempt)
+
+                    retryable = result["error"] != CAP_REACHED
+                    if result["status"] == "deferred" and retryable and attempt < max_attempts:
+                        delay = settings.smtp_retry_base_delay * (2 ** (attempt - 1))
+                        retries.append(asyncio.create_task(retry_later(recipient, attempt + 1, delay)))
+                        continue
+
+                    await report(result)
+                except Exception as e:
+                    logger.error(f"Error in bulk send worker: {e}", exc_info=True)
+                queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(self.send_concurrency, 1))]
+        try:
+            await queue.join()
+        finally:
+            for task in workers + retries:
+                task.cancel()
 
         logger.info(
-            f"Bulk email completed: {results['sent']} sent, {results['failed']} failed"
+            f"Bulk email completed: {results['sent']} sent, {results['failed']} failed, "
+            f"{results['deferred']} deferred ({self.pool.connections_opened} SMTP connections opened so far)"
         )
 
         return results
@@ -0,0 +1,535 @@
+"""
+Durable email outbox with idempotent, resumable delivery.
+"""
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
+from config.settings import settings
+from utils.rate_limiter import next_utc_day
+from .mail_service import CAP_REACHED, mail_service
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+DEFERRED = "deferred"
+STATES = (QUEUED, SENDING, SENT, FAILED, DEFERRED)
+
+
+class Outbox:
+    """
+    Persistent queue of outgoing emails, drained by a background dispatcher.
+
+    Every message is recorded in a local SQLite file with an idempotency key
+    (hash of recipient, subject and body), so enqueueing the same campaign twice
+    never sends twice. Messages move through queued -> sending -> sent/failed,
+    with 4xx deferrals rescheduled with backoff until max_attempts; messages
+    over the daily sending cap wait for the next UTC day instead. The cap is
+    counted in the same database per UTC day and SMTP host, so it holds across
+    restarts and across workers sharing the file. Delivery survives restarts:
+    queued and deferred messages are picked up again, and messages caught
+    mid-send are marked failed ("delivery unknown") rather than resent
+    automatically; they can be resumed explicitly.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id TEXT PRIMARY KEY,
+            subject TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL,
+            lead_id INTEGER,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT NOT NULL DEFAULT '',
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            sent_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_due ON messages(state, next_attempt_at);
+        CREATE INDEX IF NOT EXISTS idx_messages_campaign ON messages(campaign_id, state);
+        CREATE TABLE IF NOT EXISTS daily_sends (
+            day TEXT NOT NULL,
+            host TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, host)
+        );
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.outbox_path
+        self.batch_size = settings.outbox_batch_size
+        self.poll_interval = settings.outbox_poll_interval
+        self.max_attempts = settings.smtp_max_attempts
+        self.retry_base_delay = settings.smtp_retry_base_delay
+        self._lock = threading.Lock()
+        self._conn = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Queues of the watchers of each campaign (see watch_campaign)
+        self._watchers: Dict[str, List[asyncio.Queue]] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use (callers hold the lock)."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._migrate()
+            self._conn.executescript(self.SCHEMA)
+            logger.info(f"Outbox ready at {self.db_path}")
+        return self._conn
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if columns and "lead_id" not in columns:
+            self._conn.execute("ALTER TABLE messages ADD COLUMN lead_id INTEGER")
+            self._conn.commit()
+
+    def _notify(self) -> None:
+        """Wake the dispatcher; safe to call from worker threads."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def _today(self) -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def idempotency_key(email: str, subject: str, body: str) -> str:
+        payload = f"{email.strip().lower()}\n{subject}\n{body}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ----- Enqueue / inspect (blocking; call via asyncio.to_thread) -----
+
+    def enqueue(
+        self,
+        recipients: List[Dict[str, str]],
+        subject: str,
+        campaign_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Record a campaign's messages.
+
+        Args:
+            recipients: Dicts with "email" and "body", and the stored
+                lead's "lead_id" when known
+            subject: Subject line for every message
+            campaign_id: Optional id; derived from the messages when omitted,
+                so resubmitting the same campaign maps onto the same id
+
+        Returns:
+            The campaign id and how many messages were queued vs already known
+        """
+        keys = [self.idempotency_key(r["email"], subject, r.get("body", "")) for r in recipients]
+        if not campaign_id:
+            campaign_id = hashlib.sha256("".join(sorted(keys)).encode()).hexdigest()[:16]
+
+        now = self._now()
+        queued = 0
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO campaigns (id, subject, created_at) VALUES (?, ?, ?)",
+                (campaign_id, subject, now)
+            )
+            for recipient, key in zip(recipients, keys):
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO messages "
+                    "(campaign_id, idempotency_key, email, lead_id, subject, body, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (campaign_id, key, recipient["email"], recipient.get("lead_id"), subject, recipient.get("body", ""), now)
+                )
+                queued += cursor.rowcount
+
+        self._notify()
+
+        logger.info(f"Outbox: campaign {campaign_id} queued {queued}, {len(recipients) - queued} already known")
+        return {"campaign_id": campaign_id, "queued": queued, "duplicates": len(recipients) - queued}
+
+    def campaign_stats(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Message counts per state for one campaign, or None if unknown."""
+        with self._lock:
+            campaign = self.conn.execute(
+                "SELECT id, subject, created_at FROM campaigns WHERE id = ?", (campaign_id,)
+            ).fetchone()
+            if campaign is None:
+                return None
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) AS n FROM messages WHERE campaign_id = ? GROUP BY state",
+                (campaign_id,)
+            ).fetchall()
+
+        counts = {state: 0 for state in STATES}
+        counts.update({row["state"]: row["n"] for row in rows})
+        return {
+            "campaign_id": campaign["id"],
+            "subject": campaign["subject"],
+            "created_at": campaign["created_at"],
+            "total": sum(counts.values()),
+            "counts": counts,
+            "done": counts[QUEUED] + counts[SENDING] + counts[DEFERRED] == 0
+        }
+
+    def campaign_recipients(
+        self,
+        campaign_id: str,
+        after_id: int = 0,
+        limit: int = 500
+    ) -> List[Tuple[int, str, Optional[int]]]:
+        """
+        Page through (message id, email, lead id) of a campaign's messages; pass the last id as after_id.
+
+        The lead id is None for messages queued without one.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, email, lead_id FROM messages WHERE campaign_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (campaign_id, after_id, limit)
+            ).fetchall()
+        return [(row["id"], row["email"], row["lead_id"]) for row in rows]
+
+    def list_campaigns(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [row["id"] for row in self.conn.execute(
+                "SELECT id FROM campaigns ORDER BY created_at DESC LIMIT ?", (limit,)
+            )]
+        return [self.campaign_stats(campaign_id) for campaign_id in ids]
+
+    def list_messages(
+        self,
+        campaign_id: str,
+        state: Optional[str] = None,
+        after_id: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        sql = (
+            "SELECT id, email, state, attempts, last_error, updated_at, sent_at "
+            "FROM messages WHERE campaign_id = ? AND id > ?"
+        )
+        params: List[Any] = [campaign_id, after_id]
+        if state:
+            sql += " AND state = ?"
+            params.append(state)
+        sql += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def campaign_outcomes(self, campaign_id: str) -> List[Dict[str, Any]]:
+        """Messages of a campaign that have an outcome (sent, failed or deferred)."""
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(
+                "SELECT id, email, state, attempts, last_error FROM messages "
+                "WHERE campaign_id = ? AND state IN (?, ?, ?) ORDER BY id",
+                (campaign_id, SENT, FAILED, DEFERRED)
+            )]
+
+    def sends_today(self) -> int:
+        """Messages counted against today's sending cap of the SMTP host (counted only when there is a cap)."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT count FROM daily_sends WHERE day = ? AND host = ?",
+                (self._today(), mail_service.smtp_host or "")
+            ).fetchone()
+        return row["count"] if row else 0
+
+    def resume(self, campaign_id: str, include_failed: bool = True) -> int:
+        """
+        Requeue a campaign's deferred (and optionally failed) messages now.
+
+        Returns:
+            Number of messages requeued
+        """
+        states = (DEFERRED, FAILED) if include_failed else (DEFERRED,)
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                f"UPDATE messages SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? "
+                f"WHERE campaign_id = ? AND state IN ({','.join('?' * len(states))})",
+                (QUEUED, self._now(), campaign_id, *states)
+            )
+            count = cursor.rowcount
+
+        if count:
+            self._notify()
+        return count
+
+    def recover_interrupted(self) -> int:
+        """Mark messages left in "sending" by a crashed worker as failed (delivery unknown)."""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE messages SET state = ?, last_error = ?, updated_at = ? WHERE state = ?",
+                (FAILED, "interrupted while sending (delivery unknown)", self._now(), SENDING)
+            )
+        if cursor.rowcount:
+            logger.warning(f"Outbox: {cursor.rowcount} messages were interrupted mid-send, marked failed")
+        return cursor.rowcount
+
+    def _claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Mark due messages as sending and count them against today's cap.
+
+        Runs as one IMMEDIATE transaction, so workers sharing the database
+        neither claim the same message nor overrun the cap together. When the
+        cap is used up, the due messages are deferred to the next UTC day.
+        """
+        _, per_day = mail_service.provider_limits()
+        host = mail_service.smtp_host or ""
+        day = self._today()
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if per_day:
+                row = self.conn.execute(
+                    "SELECT count FROM daily_sends WHERE day = ? AND host = ?", (day, host)
+                ).fetchone()
+                limit = min(limit, max(per_day - (row["count"] if row else 0), 0))
+                if limit == 0:
+                    cursor = self.conn.execute(
+                        "UPDATE messages SET state = ?, last_error = ?, next_attempt_at = ?, updated_at = ? "
+                        "WHERE state IN (?, ?) AND next_attempt_at <= ?",
+                        (DEFERRED, CAP_REACHED, next_utc_day(), self._now(), QUEUED, DEFERRED, now)
+                    )
+                    if cursor.rowcount:
+                        logger.warning(f"Outbox: daily cap of {per_day} reached, {cursor.rowcount} messages wait for tomorrow")
+                    return []
+
+            rows = self.conn.execute(
+                "SELECT id, campaign_id, email, subject, body, attempts FROM messages "
+                "WHERE state IN (?, ?) AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (QUEUED, DEFERRED, now, limit)
+            ).fetchall()
+            if rows:
+                self.conn.executemany(
+                    "UPDATE messages SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(SENDING, self._now(), row["id"]) for row in rows]
+                )
+                if per_day:
+                    self._count_sends(day, host, len(rows))
+        # Messages that end up not sent are given back to the day they were counted on
+        return [dict(row, cap_day=day if per_day else None) for row in rows]
+
+    def _count_sends(self, day: str, host: str, count: int) -> None:
+        """Add to a day's send count (negative: give back); callers hold the lock."""
+        self.conn.execute(
+            "INSERT INTO daily_sends (day, host, count) VALUES (?, ?, MAX(?, 0)) "
+            "ON CONFLICT(day, host) DO UPDATE SET count = MAX(daily_sends.count + ?, 0)",
+            (day, host, count, count)
+        )
+
+    def _record_result(
+        self,
+        message_id: int,
+        attempts: int,
+        status: str,
+        error: str,
+        cap_day: Optional[str] = None
+    ) -> Tuple[str, int, str]:
+        """
+        Store the outcome of one send attempt.
+
+        Returns:
+            The stored (state, attempts, error): a deferral past max_attempts
+            is stored as failed
+        """
+        now = self._now()
+        next_attempt_at = 0.0
+        if status == DEFERRED and error == CAP_REACHED:
+            # Not a delivery attempt: wait for the cap to reset, attempts untouched
+            attempts -= 1
+            next_attempt_at = next_utc_day()
+        elif status == DEFERRED and attempts >= self.max_attempts:
+            status = FAILED
+            error = f"gave up after {attempts} attempts: {error}"
+        elif status == DEFERRED:
+            next_attempt_at = time.time() + self.retry_base_delay * (2 ** (attempts - 1))
+
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE messages SET state = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ?, "
+                "sent_at = CASE WHEN ? = 'sent' THEN ? ELSE sent_at END WHERE id = ?",
+                (status, attempts, error, next_attempt_at, now, status, now, message_id)
+            )
+            if cap_day and status != SENT:
+                # Only delivered messages count against the cap
+                self._count_sends(cap_day, mail_service.smtp_host or "", -1)
+        return status, attempts, error
+
+    def _fail_unfinished(self, ids: List[int], error: str) -> None:
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE messages SET state = ?, last_error = ?, updated_at = ? WHERE id = ? AND state = ?",
+                [(FAILED, error, self._now(), message_id, SENDING) for message_id in ids]
+            )
+
+    # ----- Dispatcher -----
+
+    def start(self):
+        """Start the background dispatcher."""
+        if self._worker and not self._worker.done():
+            return
+        self.recover_interrupted()
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Outbox dispatcher started")
+
+    async def stop(self, timeout: float = 30.0):
+        """Let the current batch finish (up to timeout) and stop."""
+        self._stopping = True
+        if self._worker:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._worker, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Outbox dispatcher did not finish in time, in-flight messages will be recovered")
+            self._worker = None
+        # Nothing is left to wake; enqueueing after a stop must not touch a closed loop
+        self._loop = None
+        self._wakeup = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def wait_for_campaign(self, campaign_id: str, timeout: float, poll: float = 0.5) -> Dict[str, Any]:
+        """Wait until no message of the campaign is queued or sending, or the timeout passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            stats = await asyncio.to_thread(self.campaign_stats, campaign_id)
+            counts = stats["counts"]
+            if counts[QUEUED] + counts[SENDING] == 0 or time.monotonic() >= deadline:
+                return stats
+            await asyncio.sleep(poll)
+
+    def _publish(self, campaign_id: str, outcome: Dict[str, Any]) -> None:
+        for events in self._watchers.get(campaign_id, []):
+            events.put_nowait(outcome)
+
+    async def watch_campaign(self, campaign_id: str, timeout: float, poll: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the outcome of each message of a campaign as it is recorded.
+
+        Outcomes recorded before watching started come first, so a resubmitted
+        campaign reports its earlier results too. Stops once no message is
+        queued or sending, or when the timeout passes; delivery goes on
+        regardless. Outcomes have the fields of list_messages (id, email,
+        state, attempts, last_error); a deferred message that is retried later
+        is reported again.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(campaign_id, []).append(events)
+        deadline = time.monotonic() + timeout
+        reported: Dict[int, Tuple[str, int]] = {}
+
+        def new(outcome: Dict[str, Any]) -> bool:
+            key = (outcome["state"], outcome["attempts"])
+            if reported.get(outcome["id"]) == key:
+                return False
+            reported[outcome["id"]] = key
+            return True
+
+        try:
+            for outcome in await asyncio.to_thread(self.campaign_outcomes, campaign_id):
+                if new(outcome):
+                    yield outcome
+            while True:
+                while not events.empty():
+                    outcome = events.get_nowait()
+                    if new(outcome):
+                        yield outcome
+                stats = await asyncio.to_thread(self.campaign_stats, campaign_id)
+                counts = stats["counts"]
+                if counts[QUEUED] + counts[SENDING] == 0 or time.monotonic() >= deadline:
+                    # Catch outcomes not published yet, and messages the
+                    # daily cap deferred without a send attempt
+                    for outcome in await asyncio.to_thread(self.campaign_outcomes, campaign_id):
+                        if new(outcome):
+                            yield outcome
+                    return
+                try:
+                    outcome = await asyncio.wait_for(events.get(), timeout=min(poll, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    continue
+                if new(outcome):
+                    yield outcome
+        finally:
+            watchers = self._watchers.get(campaign_id, [])
+            if events in watchers:
+                watchers.remove(events)
+            if not watchers:
+                self._watchers.pop(campaign_id, None)
+
+    async def _dispatch(self, batch: List[Dict[str, Any]]):
+        by_subject: Dict[str, List[Dict[str, Any]]] = {}
+        for message in batch:
+            by_subject.setdefault(message["subject"], []).append(message)
+        messages_by_id = {message["id"]: message for message in batch}
+
+        async def record(result: Dict[str, Any]):
+            message = messages_by_id[result["id"]]
+            state, attempts, error = await asyncio.to_thread(
+                self._record_result, message["id"], message["attempts"] + 1,
+                result["status"], result["error"], message["cap_day"]
+            )
+            self._publish(message["campaign_id"], {
+                "id": message["id"], "email": message["email"],
+                "state": state, "attempts": attempts, "last_error": error
+            })
+
+        for subject, messages in by_subject.items():
+            recipients = [{"id": m["id"], "email": m["email"], "body": m["body"]} for m in messages]
+            # Retries are scheduled here, durably, rather than in memory
+            await mail_service.send_bulk_emails(recipients, subject, on_result=record, max_attempts=1)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                if not mail_service.is_configured():
+                    batch = []
+                else:
+                    batch = await asyncio.to_thread(self._claim_due, self.batch_size)
+                if batch:
+                    try:
+                        await self._dispatch(batch)
+                    except Exception as e:
+                        await asyncio.to_thread(
+                            self._fail_unfinished,
+                            [message["id"] for message in batch],
+                            f"dispatch error (delivery unknown): {e}"
+                        )
+                        raise
+                    continue
+            except Exception as e:
+                logger.error(f"Error in outbox dispatcher: {e}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+# Singleton instance
+outbox = Outbox()
@@ -0,0 +1,151 @@
+"""
+CPU-bound page parsing off the event loop.
+
+Scanning a large page for e-mail addresses, like any HTML parsing, is pure CPU
+work; on the event loop it stalls every other request of the worker for its
+duration. The PageParser runs it on a process pool (or a thread pool, which
+only helps parsers such as lxml that release the GIL) and sends a compact
+reduction of the page back to the loop instead of a parse tree.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from config.settings import settings
+from utils.metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EXECUTORS = ("process", "thread", "inline")
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+
+def find_emails(text: str) -> List[str]:
+    """E-mail addresses in text, without duplicates and common placeholders."""
+    emails = EMAIL_PATTERN.findall(text)
+
+    # Filter out common false positives
+    filtered_emails = [
+        email for email in emails
+        if not any(x in email.lower() for x in ['example.com', 'test.com', 'placeholder'])
+    ]
+
+    return list(set(filtered_emails))  # Remove duplicates
+
+
+def reduce_page(html: str, max_chars: int) -> Dict[str, Any]:
+    """
+    Compact view of a page for extraction; runs in a pool worker.
+
+    Returns:
+        The addresses found anywhere in the page, its first max_chars
+        characters (all the extraction prompt uses) and its full size
+    """
+    return {"emails": find_emails(html), "head": html[:max_chars], "size": len(html)}
+
+
+class PageParser:
+    """
+    Runs page parsing on a bounded worker pool.
+
+    At most workers + max_queue pages are handed to the pool at once; further
+    callers wait on the loop without blocking it. Pages below the inline
+    threshold are cheaper to scan than to ship to a worker and stay on the
+    loop. If the pool breaks (a worker died), the page is parsed inline and
+    the pool is recreated on next use.
+    """
+
+    def __init__(self, executor: str = None, workers: int = None):
+        self.mode = (executor or settings.parse_executor).lower()
+        if self.mode not in EXECUTORS:
+            raise ValueError(f"PARSE_EXECUTOR must be one of {', '.join(EXECUTORS)}, got '{self.mode}'")
+        workers = settings.parse_workers if workers is None else workers
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = settings.parse_max_queue
+        self.inline_below = settings.parse_inline_max_kb * 1024
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pooled = 0
+        self.inline = 0
+        self.failures = 0
+        self.waiting = 0
+
+    def _executor(self) -> Executor:
+        """Worker pool, created on first use."""
+        if self._pool is None:
+            if self.mode == "process":
+                # Spawned, not forked: forking a process that runs an event loop
+                # and threads can copy held locks into the child
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+            logger.info(f"HTML parsing on a {self.mode} pool of {self.workers} workers")
+        return self._pool
+
+    def warm_up(self):
+        """Start the pool's workers ahead of the first page."""
+        if self.mode != "inline":
+            list(self._executor().map(find_emails, [""] * self.workers))
+
+    async def run(self, fn: Callable[..., T], *args: Any, size: int = 0) -> T:
+        """
+        Run fn(*args) on the pool; fn and its arguments must be picklable.
+
+        Args:
+            size: Input size in bytes; small inputs run inline
+        """
+        if self.mode == "inline" or size < self.inline_below:
+            self.inline += 1
+            return fn(*args)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.max_queue)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+            self.pooled += 1
+            return result
+        except BrokenExecutor as e:
+            self.failures += 1
+            logger.error(f"Parse pool broke ({e}), parsing inline and restarting the pool")
+            self.shutdown()
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    async def reduce(self, html: str, max_chars: int) -> Dict[str, Any]:
+        """Reduce a page for extraction (see reduce_page) off the event loop."""
+        with track_stage("parse"):
+            return await self.run(reduce_page, html, max_chars, size=len(html))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pooled": self.pooled,
+            "inline": self.inline,
+            "failures": self.failures,
+            "waiting": self.waiting
+        }
+
+    def shutdown(self):
+        """Stop the workers; pages in progress are abandoned."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+page_parser = PageParser()
@@ -0,0 +1,325 @@
+"""
+Record and replay of outbound API traffic.
+
+In record mode every call to an external dependency (search, place details,
+website fetches, OpenAI completions, MX lookups, SMTP sends, Sheets calls) is
+stored in a compact SQLite archive together with its response and latency. In
+replay mode the same calls are answered from the archive without touching the
+network, so a production run can be reproduced and profiled offline,
+deterministically.
+"""
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+
+
+class ReplayMissError(LookupError):
+    """A request was made in replay mode that the archive has no answer for."""
+
+
+class RecordedError(Exception):
+    """Replayed failure whose original exception type could not be rebuilt."""
+
+    def __init__(self, type_name: str, message: str):
+        super().__init__(message)
+        self.type_name = type_name
+
+
+def _jsonable(value: Any) -> bool:
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _encode_error(error: Exception) -> Dict[str, Any]:
+    attrs = vars(error)
+    kept = {name: value for name, value in attrs.items() if _jsonable(value)}
+    return {
+        "module": type(error).__module__,
+        "type": type(error).__qualname__,
+        "message": str(error),
+        "args": [arg if _jsonable(arg) else str(arg) for arg in error.args],
+        "attrs": kept,
+        # Rebuilt as the original type only if nothing was lost
+        "complete": len(kept) == len(attrs) and all(_jsonable(arg) for arg in error.args),
+    }
+
+
+def _decode_error(data: Dict[str, Any]) -> Exception:
+    if data.get("complete"):
+        try:
+            cls = importlib.import_module(data["module"])
+            for part in data["type"].split("."):
+                cls = getattr(cls, part)
+            if isinstance(cls, type) and issubclass(cls, Exception):
+                # Skip __init__: signatures differ, the recorded state is restored directly
+                error = cls.__new__(cls)
+                error.args = tuple(data["args"])
+                error.__dict__.update(data["attrs"])
+                return error
+        except Exception:
+            pass
+    return RecordedError(f"{data['module']}.{data['type']}", data["message"])
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def dump_model(model: Any) -> Any:
+    """Archive encoder for pydantic responses (OpenAI SDK objects)."""
+    return model.model_dump(mode="json")
+
+
+def load_chat_completion(data: Any) -> Any:
+    """Archive decoder for OpenAI chat completions."""
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+
+class TrafficArchive:
+    """
+    Records outbound calls to, or replays them from, a SQLite archive.
+
+    Calls are keyed by service name plus the canonical JSON of the request
+    fields that determine the answer (never credentials or timeouts). Repeated
+    identical requests are numbered, so a replay serves the Nth recording to
+    the Nth caller; callers beyond the recorded count get the last one. A
+    replayed run must use the same configuration as the recorded one (keys may
+    be dummies) so it takes the same code paths, and the same lead store state
+    if it relied on skip_known.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS exchanges (
+            key TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            service TEXT NOT NULL,
+            request BLOB NOT NULL,
+            response BLOB,
+            error BLOB,
+            latency_ms REAL NOT NULL,
+            recorded_at REAL NOT NULL,
+            PRIMARY KEY (key, seq)
+        );
+        CREATE INDEX IF NOT EXISTS idx_exchanges_service ON exchanges(service);
+    """
+
+    def __init__(self, db_path: str = None, mode: str = None):
+        self.db_path = db_path or settings.traffic_archive_path
+        self.mode = (mode or settings.traffic_mode).lower()
+        if self.mode not in MODES:
+            raise ValueError(f"TRAFFIC_MODE must be one of {', '.join(MODES)}, got '{self.mode}'")
+        self.latency_scale = settings.traffic_replay_latency
+        self.live_on_miss = settings.traffic_replay_miss == "live"
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._next_seq: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.mode != "off":
+            logger.info(f"📼 Outbound traffic {self.mode} mode, archive {self.db_path}")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection, opened on first use (callers hold the lock)."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def key(service: str, request: Dict[str, Any]) -> str:
+        """Archive key of a request: service plus a hash of its canonical JSON."""
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{service}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}"
+
+    def _claim_seq(self, key: str) -> int:
+        """Number of this call among identical requests."""
+        with self._lock:
+            seq = self._next_seq.get(key)
+            if seq is None:
+                seq = 0
+                if self.mode == "record":
+                    # Append to what earlier recording sessions stored
+                    row = self.conn.execute("SELECT MAX(seq) FROM exchanges WHERE key = ?", (key,)).fetchone()
+                    seq = 0 if row[0] is None else row[0] + 1
+            self._next_seq[key] = seq + 1
+            return seq
+
+    def _lookup(self, key: str, seq: int) -> Optional[Tuple[Optional[bytes], Optional[bytes], float]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, error, latency_ms FROM exchanges WHERE key = ? AND seq <= ? "
+                "ORDER BY seq DESC LIMIT 1",
+                (key, seq)
+            ).fetchone()
+        return row
+
+    def _store(self, key: str, seq: int, service: str, request: Dict[str, Any],
+               response: Any, error: Optional[Dict[str, Any]], latency: float) -> None:
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO exchanges "
+                    "(key, seq, service, request, response, error, latency_ms, recorded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key, seq, service,
+                        _pack(request),
+                        None if error else _pack(response),
+                        _pack(error) if error else None,
+                        latency * 1000,
+                        time.time()
+                    )
+                )
+            self.recorded += 1
+        except Exception as e:
+            # Recording must never break the call it observes
+            logger.error(f"Could not record {service} call: {e}")
+
+    def _replayed(self, row, decode: Optional[Callable[[Any], Any]]) -> Any:
+        response, error, _ = row
+        self.replayed += 1
+        if error is not None:
+            raise _decode_error(_unpack(error))
+        value = _unpack(response)
+        return decode(value) if decode else value
+
+    def _missed(self, service: str, request: Dict[str, Any]) -> None:
+        self.misses += 1
+        logger.warning(f"📼 No recording for {service} request {json.dumps(request, default=str)[:200]}")
+        if not self.live_on_miss:
+            raise ReplayMissError(f"No recorded {service} response for this request")
+
+    async def call(
+        self,
+        service: str,
+        request: Dict[str, Any],
+        fn: Callable[[], Awaitable[Any]],
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """
+        Run an outbound call through the archive.
+
+        Args:
+            service: Name of the dependency (e.g. "scrape", "openai.extraction")
+            request: JSON-serializable fields that determine the answer
+            fn: Performs the real call
+            encode: Turns the result into JSON-serializable data for the archive
+            decode: Rebuilds the result from archived data on replay
+        """
+        if self.mode == "off":
+            return await fn()
+
+        key = self.key(service, request)
+        seq = self._claim_seq(key)
+        if self.mode == "replay":
+            row = await asyncio.to_thread(self._lookup, key, seq)
+            if row is not None:
+                if self.latency_scale > 0:
+                    await asyncio.sleep(row[2] / 1000 * self.latency_scale)
+                return self._replayed(row, decode)
+            self._missed(service, request)
+            return await fn()
+
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except Exception as e:
+            await asyncio.to_thread(
+                self._store, key, seq, service, request, None, _encode_error(e), time.perf_counter() - start
+            )
+            raise
+        await asyncio.to_thread(
+            self._store, key, seq, service, request, encode(result) if encode else result, None,
+            time.perf_counter() - start
+        )
+        return result
+
+    def call_sync(
+        self,
+        service: str,
+        request: Dict[str, Any],
+        fn: Callable[[], Any],
+        encode: Optional[Callable[[Any], Any]] = None,
+        decode: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """Blocking counterpart of ``call`` for synchronous clients (googlemaps, Sheets)."""
+        if self.mode == "off":
+            return fn()
+
+        key = self.key(service, request)
+        seq = self._claim_seq(key)
+        if self.mode == "replay":
+            row = self._lookup(key, seq)
+            if row is not None:
+                if self.latency_scale > 0:
+                    time.sleep(row[2] / 1000 * self.latency_scale)
+                return self._replayed(row, decode)
+            self._missed(service, request)
+            return fn()
+
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self._store(key, seq, service, request, None, _encode_error(e), time.perf_counter() - start)
+            raise
+        self._store(key, seq, service, request, encode(result) if encode else result, None, time.perf_counter() - start)
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        """Archived calls per service plus this process's record/replay counters."""
+        services = {}
+        if self.enabled:
+            with self._lock:
+                for service, count, size in self.conn.execute(
+                    "SELECT service, COUNT(*), SUM(LENGTH(request) + COALESCE(LENGTH(response), 0) + COALESCE(LENGTH(error), 0)) "
+                    "FROM exchanges GROUP BY service ORDER BY service"
+                ):
+                    services[service] = {"calls": count, "bytes": size}
+        return {
+            "mode": self.mode,
+            "path": self.db_path if self.enabled else None,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "services": services
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Singleton instance
+traffic_archive = TrafficArchive()
@@ -1,14 +1,33 @@
 """
 Web scraper service to extract content from websites.
 """
+import hashlib
 import httpx
 import logging
-from bs4 import BeautifulSoup
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, TYPE_CHECKING
 import asyncio
+from config.settings import settings
+from utils.deadline import current_deadline
+from utils.metrics import track_stage
+from utils.normalize import has_website
+from utils.singleflight import SingleFlight
+from .cache_backends import shared_cache
+from .concurrency_control import stage_limits
+from .record_replay import traffic_archive
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 logger = logging.getLogger(__name__)
 
+# Answers that mean a site is pushing back rather than missing
+OVERLOAD_STATUSES = (429, 503)
+
+
+def content_hash(html_content: str) -> str:
+    """Fingerprint of a page's content, to tell whether it changed."""
+    return hashlib.sha256(html_content.encode("utf-8", "replace")).hexdigest()[:32]
+
 
 class ScraperService:
     """Service for scraping website content."""
@@ -17,6 +36,9 @@ class ScraperService:
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.timeout = 15.0
+        # Concurrent scrapes of the same URL share one fetch
+        self.inflight = SingleFlight("scrape", enabled=settings.coalesce_requests)
     
     async def scrape_website(self, url: str) -> Optional[Dict[str, Any]]:
         """
@@ -29,7 +51,7 @@ class ScraperService:
             Dictionary with url, html_content, and success status
         """
         # Handle empty or invalid URLs
-        if not url or url == "" or url == "N/A":
+        if not has_website(url):
             return {
                 "url": "",
                 "html_content": "",
@@ -37,13 +59,104 @@ class ScraperService:
                 "error": "No website available"
             }
         
+        # Shorten the timeout as the request deadline approaches
+        timeout = self.timeout
+        deadline = current_deadline()
+        if deadline:
+            if not deadline.allows(settings.deadline_min_scrape_ms):
+                logger.info(f"Deadline close, skipping scrape of {url}")
+                return {
+                    "url": url,
+                    "html_content": "",
+                    "success": False,
+                    "error": "Deadline reached",
+                    "deadline_skipped": True
+                }
+            timeout = deadline.timeout(self.timeout)
+        
+        try:
+            result = await asyncio.wait_for(
+                self.inflight.do(url, lambda: self._cached_fetch(url, timeout)),
+                # A coalesced fetch may belong to a request with more time left
+                timeout=deadline.remaining() if deadline else None
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Deadline reached while scraping {url}")
+            return {
+                "url": url,
+                "html_content": "",
+                "success": False,
+                "error": "Deadline reached",
+                "deadline_skipped": True
+            }
+        return dict(result)
+    
+    async def _cached_fetch(self, url: str, timeout: float) -> Dict[str, Any]:
+        """Fetch one URL through the shared cache; only successful fetches are kept."""
+        return await shared_cache.fetch(
+            "page", {"url": url}, lambda: self._fetch(url, timeout),
+            ttl=settings.cache_page_ttl, cacheable=lambda result: result["success"]
+        )
+    
+    async def _fetch(self, url: str, timeout: float) -> Dict[str, Any]:
+        """Fetch one URL; errors are returned as an unsuccessful result."""
+        with track_stage("scrape") as call:
+            async with stage_limits.slot("scrape") as slot:
+                result = await traffic_archive.call("scrape", {"url": url}, lambda: self._download(url, timeout))
+                if self._overloaded(result):
+                    slot.overloaded()
+            if not result["success"]:
+                call.fail()
+            return result
+    
+    def _overloaded(self, result: Dict[str, Any]) -> bool:
+        """Whether a failed fetch is a sign of overload (timeout, 429, 503)."""
+        return not result["success"] and (
+            result.get("timed_out", False) or result.get("status_code") in OVERLOAD_STATUSES
+        )
+    
+    async def revalidate(self, url: str, etag: str = "", last_modified: str = "") -> Dict[str, Any]:
+        """
+        Fetch a page again unless it is unchanged since it was last seen.
+        
+        Sends the stored validators as a conditional GET, bypassing the shared
+        cache. A 304 answer comes back as a successful result with
+        ``not_modified`` set and no content.
+        """
+        conditions = {}
+        if etag:
+            conditions["If-None-Match"] = etag
+        if last_modified:
+            conditions["If-Modified-Since"] = last_modified
+        with track_stage("scrape") as call:
+            async with stage_limits.slot("scrape") as slot:
+                result = await traffic_archive.call(
+                    "scrape.revalidate", {"url": url, **conditions},
+                    lambda: self._download(url, self.timeout, conditions)
+                )
+                if self._overloaded(result):
+                    slot.overloaded()
+            if not result["success"]:
+                call.fail()
+            return result
+    
+    async def _download(self, url: str, timeout: float, conditions: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         try:
             async with httpx.AsyncClient(
-                timeout=15.0,
+                timeout=timeout,
                 follow_redirects=True,
                 headers=self.headers
             ) as client:
-                response = await client.get(url)
+                response = await client.get(url, headers=conditions)
+                if response.status_code == 304:
+                    logger.info(f"Not modified: {url}")
+                    return {
+                        "url": url,
+                        "html_content": "",
+                        "success": True,
+                        "not_modified": True,
+                        "status_code": 304
+                    }
                 response.raise_for_status()
                 
                 html_content = response.text
@@ -53,17 +166,25 @@ class ScraperService:
                     "url": url,
                     "html_content": html_content,
                     "success": True,
-                    "status_code": response.status_code
+                    "status_code": response.status_code,
+                    # Validators for conditional re-fetches when the lead is refreshed
+                    "etag": response.headers.get("etag", ""),
+                    "last_modified": response.headers.get("last-modified", "")
                 }
                 
         except httpx.HTTPError as e:
             logger.warning(f"HTTP error scraping {url}: {e}")
-            return {
+            result = {
                 "url": url,
                 "html_content": "",
                 "success": False,
                 "error": str(e)
             }
+            if isinstance(e, httpx.HTTPStatusError):
+                result["status_code"] = e.response.status_code
+            elif isinstance(e, httpx.TimeoutException):
+                result["timed_out"] = True
+            return result
         except Exception as e:
             logger.warning(f"Error scraping {url}: {e}")
             return {
@@ -102,7 +223,7 @@ class ScraperService:
         
         return processed_results
     
-    def parse_html(self, html_content: str) -> BeautifulSoup:
+    def parse_html(self, html_content: str) -> "BeautifulSoup":
         """
         Parse HTML content using BeautifulSoup.
         
@@ -112,6 +233,8 @@ class ScraperService:
         Returns:
             BeautifulSoup object
         """
+        from bs4 import BeautifulSoup
+        
         return BeautifulSoup(html_content, 'lxml')
 
 
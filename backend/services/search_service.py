@@ -1,50 +1,114 @@
 """
 Search service using Google Maps Places API for REAL local businesses.
 """
+import asyncio
 import httpx
 import logging
-from typing import List, Dict, Any
-import googlemaps
+from typing import List, Dict, Any, Awaitable, Callable, Optional
 from config.settings import settings
+from utils.metrics import track_stage
+from utils.normalize import has_website
+from utils.singleflight import SingleFlight
+from .cache_backends import shared_cache
+from .concurrency_control import stage_limits
+from .record_replay import traffic_archive
 
 logger = logging.getLogger(__name__)
 
+# Search sources; only Google Maps results carry Google Maps place ids
+GOOGLE_MAPS = "google_maps"
+SERPER = "serper"
+
+# Batch predicate: for a list of results, which ones to skip (e.g. LeadIndex.find_known)
+ExcludeFilter = Callable[[List[Dict[str, Any]]], Awaitable[List[bool]]]
+
+
+def maps_overloaded(error: BaseException) -> bool:
+    """Google Maps errors that mean back off: query limits, timeouts and transport failures."""
+    import googlemaps.exceptions
+
+    if isinstance(error, (googlemaps.exceptions.Timeout, googlemaps.exceptions.TransportError)):
+        return True
+    return isinstance(error, googlemaps.exceptions.ApiError) and error.status == "OVER_QUERY_LIMIT"
+
 
 class SearchService:
     """Service for searching ACTUAL local businesses using Google Maps."""
     
+    # Place details fields (REMOVED 'types')
+    DETAIL_FIELDS = ['name', 'formatted_address', 'formatted_phone_number',
+                     'website', 'rating', 'user_ratings_total',
+                     'opening_hours', 'url']  # ← FIXED: removed 'types'
+    
     def __init__(self):
         self.serper_key = settings.serper_api_key
-        self.serper_url = "https://google.serper.dev/search"
+        self.serper_url = settings.serper_api_url
         
-        # Try to initialize Google Maps
-        self.gmaps = None
-        self.use_maps = False
+        # Google Maps client is created on first use
+        self._gmaps = None
+        self._maps_init_done = False
+        self.use_maps = bool(settings.google_maps_api_key)
         
-        if settings.google_maps_api_key:
-            try:
-                self.gmaps = googlemaps.Client(key=settings.google_maps_api_key)
-                self.use_maps = True
-                logger.info("✅ Google Maps API initialized - will get REAL business names!")
-            except Exception as e:
-                logger.warning(f"Google Maps init failed: {e}")
+        # Identical searches in flight share one set of API calls
+        self.inflight = SingleFlight("search", enabled=settings.coalesce_requests)
+    
+    @property
+    def gmaps(self):
+        """Google Maps client, initialized on first use."""
+        if not self._maps_init_done:
+            self._maps_init_done = True
+            if self.use_maps:
+                try:
+                    import googlemaps
+                    self._gmaps = googlemaps.Client(
+                        key=settings.google_maps_api_key,
+                        base_url=settings.google_maps_base_url
+                    )
+                    logger.info("✅ Google Maps API initialized - will get REAL business names!")
+                except Exception as e:
+                    self.use_maps = False
+                    logger.warning(f"Google Maps init failed: {e}")
+        return self._gmaps
     
-    async def search(self, query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+    def warm_up(self):
+        """Initialize the Google Maps client ahead of the first request."""
+        return self.gmaps
+    
+    async def search(
+        self,
+        query: str,
+        max_results: int = 10,
+        exclude: Optional[ExcludeFilter] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search for ACTUAL local businesses (not listing pages).
         
         Args:
             query: Search query (e.g., "gyms in bageshwar")
             max_results: Number of REAL businesses to return
+            exclude: Optional batch predicate for results to skip (e.g. already-known
+                leads); skipped results do not count towards max_results
             
         Returns:
             List of ACTUAL business results with real names
         """
+        key = (" ".join(query.lower().split()), max_results, exclude)
+        results = await self.inflight.do(key, lambda: self._search(query, max_results, exclude))
+        # Callers annotate results (e.g. scores), so each gets its own copies
+        return [dict(result) for result in results]
+    
+    async def _search(
+        self,
+        query: str,
+        max_results: int,
+        exclude: Optional[ExcludeFilter]
+    ) -> List[Dict[str, Any]]:
+        """Run the search against Google Maps, falling back to Serper."""
         # Use Google Maps if available
         if self.use_maps and self.gmaps:
             try:
                 logger.info(f"Using Google Maps to find REAL businesses for: {query}")
-                results = await self._search_google_maps(query, max_results)
+                results = await self._search_google_maps(query, max_results, exclude)
                 if results and len(results) > 0:
                     logger.info(f"✅ Found {len(results)} REAL businesses from Google Maps")
                     return results
@@ -55,16 +119,35 @@ class SearchService:
         
         # Fallback to Serper
         logger.warning("⚠️ Using Serper fallback - results may include listing pages")
-        return await self._search_serper(query, max_results)
+        return await self._search_serper(query, max_results, exclude)
     
-    async def _search_google_maps(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    async def _search_google_maps(
+        self,
+        query: str,
+        max_results: int,
+        exclude: Optional[ExcludeFilter] = None
+    ) -> List[Dict[str, Any]]:
         """Search Google Maps Places API for REAL businesses."""
         results = []
         
         try:
             # Text Search
             logger.info(f"Searching Google Maps for: {query}")
-            places_result = self.gmaps.places(query=query)
+            
+            async def places() -> Dict[str, Any]:
+                # On a worker thread, like place details: the client blocks
+                with track_stage("search.google_maps"):
+                    async with stage_limits.slot("place_search", overload=maps_overloaded):
+                        return await asyncio.to_thread(
+                            traffic_archive.call_sync,
+                            "maps.places",
+                            {"query": query},
+                            lambda: self.gmaps.places(query=query)
+                        )
+            
+            places_result = await shared_cache.fetch(
+                "maps.places", {"query": query}, places, ttl=settings.cache_search_ttl
+            )
             
             if not places_result.get('results'):
                 logger.warning(f"No places found for: {query}")
@@ -72,8 +155,14 @@ class SearchService:
             
             logger.info(f"Google Maps returned {len(places_result['results'])} places")
             
+            # Find known businesses before paying for their details calls
+            places = places_result['results']
+            known = [False] * len(places)
+            if exclude:
+                known = await exclude([{"place_id": place.get('place_id')} for place in places])
+            
             # Get details for each place
-            for idx, place in enumerate(places_result['results'][:max_results * 2]):
+            for place, is_known in zip(places, known):
                 try:
                     place_id = place.get('place_id')
                     name = place.get('name', '')
@@ -83,33 +172,30 @@ class SearchService:
                         logger.info(f"Skipping listing page: {name}")
                         continue
                     
-                    # Get detailed information (REMOVED 'types' from fields)
-                    details_result = self.gmaps.place(
-                        place_id=place_id,
-                        fields=['name', 'formatted_address', 'formatted_phone_number',
-                               'website', 'rating', 'opening_hours', 'url']  # ← FIXED: removed 'types'
+                    if is_known:
+                        logger.info(f"Skipping known business: {name}")
+                        continue
+                    
+                    # Get detailed information
+                    fields = self.DETAIL_FIELDS
+                    details_result = await shared_cache.fetch(
+                        "maps.place_details", {"place_id": place_id, "fields": fields},
+                        lambda: self._place_details(place_id, fields),
+                        ttl=settings.cache_details_ttl
                     )
                     
                     details = details_result.get('result', {})
                     
                     # Build result
-                    website = details.get('website', '')
-                    has_website = bool(website and website.strip())
+                    result = self._place_result(details, place)
                     
-                    result = {
-                        "title": details.get('name', name),
-                        "link": website if has_website else "",
-                        "snippet": details.get('formatted_address', ''),
-                        "rating": str(details.get('rating', '')) if details.get('rating') else '',
-                        "phone": details.get('formatted_phone_number', ''),
-                        "address": details.get('formatted_address', ''),
-                        "hours": self._format_hours(details.get('opening_hours')),
-                        "is_place": True,
-                        "google_maps_url": details.get('url', '')
-                    }
+                    # Known by its website or phone, which only the details have
+                    if exclude and (await exclude([result]))[0]:
+                        logger.info(f"Skipping known business: {result['title']}")
+                        continue
                     
                     results.append(result)
-                    logger.info(f"✅ Added: {result['title']} (Website: {'Yes' if has_website else 'NO - PRIORITY'})")
+                    logger.info(f"✅ Added: {result['title']} (Website: {'Yes' if result['link'] else 'NO - PRIORITY'})")
                     
                     if len(results) >= max_results:
                         break
@@ -124,6 +210,55 @@ class SearchService:
             logger.error(f"Google Maps search failed: {e}")
             return []
     
+    async def _place_details(self, place_id: str, fields: List[str]) -> Dict[str, Any]:
+        """Fetch the details of one place on a worker thread (the client blocks)."""
+        with track_stage("place_details"):
+            async with stage_limits.slot("place_details", overload=maps_overloaded):
+                return await asyncio.to_thread(
+                    traffic_archive.call_sync,
+                    "maps.place_details",
+                    {"place_id": place_id, "fields": fields},
+                    lambda: self.gmaps.place(place_id=place_id, fields=fields)
+                )
+    
+    def _place_result(self, details: Dict[str, Any], place: Dict[str, Any]) -> Dict[str, Any]:
+        """Search result of a place from its details (and its text-search entry)."""
+        website = details.get('website', '')
+        
+        return {
+            "title": details.get('name', place.get('name', '')),
+            "link": website if has_website(website) else "",
+            "snippet": details.get('formatted_address', ''),
+            "rating": str(details.get('rating', '')) if details.get('rating') else '',
+            "reviews": details.get('user_ratings_total', place.get('user_ratings_total', 0)) or 0,
+            "phone": details.get('formatted_phone_number', ''),
+            "address": details.get('formatted_address', ''),
+            "hours": self._format_hours(details.get('opening_hours')),
+            "is_place": True,
+            "place_id": place.get('place_id'),
+            "google_maps_url": details.get('url', ''),
+            "source": GOOGLE_MAPS
+        }
+    
+    async def lookup_place(self, place_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Current search result of a known place, bypassing the shared cache.
+        
+        Returns:
+            The result, or None when Google Maps is unavailable or does not
+            know the place
+        """
+        if not (place_id and self.use_maps and self.gmaps):
+            return None
+        try:
+            details = (await self._place_details(place_id, self.DETAIL_FIELDS)).get('result', {})
+        except Exception as e:
+            logger.warning(f"Place details lookup failed for {place_id}: {e}")
+            return None
+        if not details:
+            return None
+        return self._place_result(details, {"place_id": place_id})
+    
     def _is_listing_page(self, name: str) -> bool:
         """Check if name looks like a listing page."""
         name_lower = name.lower()
@@ -148,7 +283,23 @@ class SearchService:
         
         return ""
     
-    async def _search_serper(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+    async def _drop_known(
+        self,
+        candidates: List[Dict[str, Any]],
+        exclude: Optional[ExcludeFilter]
+    ) -> List[Dict[str, Any]]:
+        """Candidates the exclude predicate keeps, checked in one batch."""
+        if not exclude or not candidates:
+            return candidates
+        known = await exclude(candidates)
+        return [candidate for candidate, is_known in zip(candidates, known) if not is_known]
+    
+    async def _search_serper(
+        self,
+        query: str,
+        max_results: int,
+        exclude: Optional[ExcludeFilter] = None
+    ) -> List[Dict[str, Any]]:
         """Fallback: Serper search."""
         headers = {
             "X-API-KEY": self.serper_key,
@@ -162,36 +313,45 @@ class SearchService:
         
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.serper_url,
-                    json=payload,
-                    headers=headers
-                )
-                response.raise_for_status()
-                data = response.json()
+                async def post() -> Dict[str, Any]:
+                    response = await client.post(
+                        self.serper_url,
+                        json=payload,
+                        headers=headers
+                    )
+                    response.raise_for_status()
+                    return response.json()
+                
+                async def search() -> Dict[str, Any]:
+                    with track_stage("search.serper"):
+                        return await traffic_archive.call("serper", payload, post)
                 
-                results = []
+                data = await shared_cache.fetch("serper", payload, search, ttl=settings.cache_search_ttl)
                 
                 # Get local places
-                places = data.get("places", [])
-                for place in places:
-                    if len(results) >= max_results:
-                        break
-                    
+                places = []
+                for place in data.get("places", []):
                     name = place.get("title", "")
                     if self._is_listing_page(name):
                         continue
                     
-                    results.append({
+                    result = {
                         "title": name,
                         "link": place.get("website", ""),
                         "snippet": place.get("address", ""),
                         "rating": str(place.get("rating", "")) if place.get("rating") else "",
+                        "reviews": place.get("ratingCount", 0) or 0,
                         "phone": place.get("phoneNumber", ""),
                         "address": place.get("address", ""),
                         "hours": place.get("hours", ""),
-                        "is_place": True
-                    })
+                        "is_place": True,
+                        # Serper's own ids, not usable with Google Maps place details
+                        "place_id": place.get("placeId") or place.get("cid", ""),
+                        "source": SERPER
+                    }
+                    places.append(result)
+                
+                results = (await self._drop_known(places, exclude))[:max_results]
                 
                 # Add organic results
                 if len(results) < max_results:
@@ -202,10 +362,8 @@ class SearchService:
                         "youtube.com", "reddit.com", "quora.com"
                     ]
                     
+                    candidates = []
                     for result in organic:
-                        if len(results) >= max_results:
-                            break
-                        
                         title = result.get("title", "")
                         link = result.get("link", "").lower()
                         
@@ -215,16 +373,21 @@ class SearchService:
                         if any(d in link for d in exclude_domains):
                             continue
                         
-                        results.append({
+                        candidate = {
                             "title": title,
                             "link": result.get("link", ""),
                             "snippet": result.get("snippet", ""),
                             "rating": "",
+                            "reviews": 0,
                             "phone": "",
                             "address": "",
                             "hours": "",
-                            "is_place": False
-                        })
+                            "is_place": False,
+                            "source": SERPER
+                        }
+                        candidates.append(candidate)
+                    
+                    results.extend(await self._drop_known(candidates, exclude))
                 
                 return results[:max_results]
                 
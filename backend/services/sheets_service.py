@@ -3,10 +3,9 @@ Google Sheets service for saving lead data.
 """
 import logging
 from typing import List, Dict, Any
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from config.settings import settings
+from utils.metrics import track_stage
+from .record_replay import traffic_archive
 
 logger = logging.getLogger(__name__)
 
@@ -18,24 +17,58 @@ class SheetsService:
         self.credentials_file = settings.google_sheets_credentials_file
         self.sheet_id = settings.google_sheet_id
         self.scopes = ['https://www.googleapis.com/auth/spreadsheets']
-        self.service = None
-        self._initialize_service()
+        self._service = None
+        self.init_error = None
+        self._headers_ready = False  # cached so appends skip the header round-trip
+    
+    @property
+    def service(self):
+        """Google Sheets API client, initialized on first use."""
+        if self._service is None:
+            self._initialize_service()
+        return self._service
+    
+    def is_configured(self) -> bool:
+        """Check if a target sheet is configured."""
+        return bool(self.sheet_id and self.credentials_file)
+    
+    def warm_up(self):
+        """Initialize the Sheets client ahead of the first write."""
+        return self.service
     
     def _initialize_service(self):
         """Initialize Google Sheets API service."""
+        # Deferred: the Google client libraries are slow to import
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+        
         try:
-            credentials = service_account.Credentials.from_service_account_file(
-                self.credentials_file,
-                scopes=self.scopes
-            )
-            self.service = build('sheets', 'v4', credentials=credentials)
+            if settings.google_sheets_api_endpoint:
+                # A local stand-in (e.g. the benchmark fake) needs no real account
+                from google.auth.credentials import AnonymousCredentials
+                credentials = AnonymousCredentials()
+                client_options = {"api_endpoint": settings.google_sheets_api_endpoint}
+            else:
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.credentials_file,
+                    scopes=self.scopes
+                )
+                client_options = None
+            self._service = build('sheets', 'v4', credentials=credentials, client_options=client_options)
+            self.init_error = None
             logger.info("Google Sheets service initialized successfully")
         except Exception as e:
+            self.init_error = str(e)
             logger.error(f"Error initializing Google Sheets service: {e}")
             raise
     
     def _ensure_headers(self):
-        """Ensure the sheet has proper headers."""
+        """Ensure the sheet has proper headers (checked once per process)."""
+        if self._headers_ready:
+            return
+        
+        from googleapiclient.errors import HttpError
+        
         headers = [
             "Business Name",
             "Email",
@@ -48,21 +81,29 @@ class SheetsService:
         ]
         
         try:
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.sheet_id,
-                range='A1:H1'
-            ).execute()
+            result = traffic_archive.call_sync(
+                "sheets.get", {"sheet_id": self.sheet_id, "range": "A1:H1"},
+                lambda: self.service.spreadsheets().values().get(
+                    spreadsheetId=self.sheet_id,
+                    range='A1:H1'
+                ).execute()
+            )
             
             values = result.get('values', [])
             
             if not values or values[0] != headers:
-                self.service.spreadsheets().values().update(
-                    spreadsheetId=self.sheet_id,
-                    range='A1:H1',
-                    valueInputOption='RAW',
-                    body={'values': [headers]}
-                ).execute()
+                traffic_archive.call_sync(
+                    "sheets.update", {"sheet_id": self.sheet_id, "range": "A1:H1", "values": [headers]},
+                    lambda: self.service.spreadsheets().values().update(
+                        spreadsheetId=self.sheet_id,
+                        range='A1:H1',
+                        valueInputOption='RAW',
+                        body={'values': [headers]}
+                    ).execute()
+                )
                 logger.info("Headers created/updated in sheet")
+            
+            self._headers_ready = True
                 
         except HttpError as e:
             logger.error(f"Error ensuring headers: {e}")
@@ -70,6 +111,8 @@ class SheetsService:
     
     def append_leads(self, leads: List[Dict[str, Any]]) -> bool:
         """Append lead data to the Google Sheet."""
+        from googleapiclient.errors import HttpError
+        
         try:
             self._ensure_headers()
             
@@ -87,13 +130,17 @@ class SheetsService:
                 ]
                 rows.append(row)
             
-            result = self.service.spreadsheets().values().append(
-                spreadsheetId=self.sheet_id,
-                range='A:H',
-                valueInputOption='RAW',
-                insertDataOption='INSERT_ROWS',
-                body={'values': rows}
-            ).execute()
+            with track_stage("sheets_append"):
+                result = traffic_archive.call_sync(
+                    "sheets.append", {"sheet_id": self.sheet_id, "range": "A:H", "values": rows},
+                    lambda: self.service.spreadsheets().values().append(
+                        spreadsheetId=self.sheet_id,
+                        range='A:H',
+                        valueInputOption='RAW',
+                        insertDataOption='INSERT_ROWS',
+                        body={'values': rows}
+                    ).execute()
+                )
             
             logger.info(f"Appended {len(rows)} leads to Google Sheet")
             return True
@@ -105,8 +152,43 @@ class SheetsService:
             logger.error(f"Error appending to sheet: {e}")
             return False
     
+    def read_leads(self) -> List[Dict[str, Any]]:
+        """
+        Every lead row of the sheet, as lead dictionaries.
+        
+        Raises:
+            HttpError: If the sheet cannot be read
+        """
+        with track_stage("sheets_read"):
+            result = traffic_archive.call_sync(
+                "sheets.get", {"sheet_id": self.sheet_id, "range": "A2:H"},
+                lambda: self.service.spreadsheets().values().get(
+                    spreadsheetId=self.sheet_id,
+                    range='A2:H'
+                ).execute()
+            )
+        
+        leads = []
+        for row in result.get('values', []):
+            row = row + [""] * (8 - len(row))
+            if not any(row) or row[0] == "Business Name":
+                continue
+            leads.append({
+                "business_name": row[0],
+                "email": row[1],
+                "phone": row[2],
+                "rating": row[3],
+                "website": row[4],
+                "address": row[5],
+                "website_exists": row[6] != "False",
+                "cold_email": row[7]
+            })
+        return leads
+    
     def clear_sheet(self) -> bool:
         """Clear all data from the sheet (except headers)."""
+        from googleapiclient.errors import HttpError
+        
         try:
             self.service.spreadsheets().values().clear(
                 spreadsheetId=self.sheet_id,
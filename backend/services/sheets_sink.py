@@ -0,0 +1,124 @@
+"""
+Write-behind sink that replicates the local lead store to Google Sheets.
+"""
+import asyncio
+import logging
+from typing import Optional
+from config.settings import settings
+from .sheets_service import sheets_service
+from .lead_store import lead_store
+
+logger = logging.getLogger(__name__)
+
+
+class SheetsSink:
+    """
+    Keeps Google Sheets caught up with the local lead store from a background worker.
+
+    Leads are written to the lead store first. The worker copies rows that are not
+    yet replicated in batched appends when enough new leads have arrived or the
+    flush interval elapses, whichever comes first. Failed batches are retried with
+    backoff and stay unreplicated if every retry fails, so they are picked up again
+    on the next flush (including after a restart). A final flush runs on shutdown.
+    """
+
+    def __init__(self):
+        self.batch_size = settings.sheets_flush_batch_size
+        self.flush_interval = settings.sheets_flush_interval
+        self.max_retries = settings.sheets_flush_max_retries
+        self._unflushed = 0
+        self._pending = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        """Number of stored leads not yet in Google Sheets (as of the last flush)."""
+        return self._pending + self._unflushed
+
+    def start(self):
+        """Start the background replication worker."""
+        if self._worker and not self._worker.done():
+            return
+        self._stopping = False
+        self._pending = lead_store.count_unreplicated()
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Sheets replica worker started ({self._pending} leads behind)")
+
+    async def stop(self):
+        """Stop the worker and replicate whatever is still pending."""
+        self._stopping = True
+        if self._worker:
+            self._wakeup.set()
+            await self._worker
+            self._worker = None
+        await self.flush()
+        logger.info("Sheets replica worker stopped")
+
+    def notify(self, count: int) -> None:
+        """
+        Tell the worker that new leads were written to the lead store.
+
+        Args:
+            count: Number of leads just stored
+        """
+        self._unflushed += count
+        if self._worker is not None and self._unflushed >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Replicate every pending lead, one batch at a time."""
+        if not sheets_service.is_configured():
+            # Leads stay in the local store until a sheet is configured
+            return False
+
+        self._unflushed = 0
+        while True:
+            batch = await asyncio.to_thread(lead_store.fetch_unreplicated, self.batch_size)
+            if not batch:
+                self._pending = 0
+                return True
+
+            ids = [lead_id for lead_id, _ in batch]
+            if not await self._write_batch([lead for _, lead in batch]):
+                self._pending = await asyncio.to_thread(lead_store.count_unreplicated)
+                return False
+
+            await asyncio.to_thread(lead_store.mark_replicated, ids)
+
+    async def _write_batch(self, batch) -> bool:
+        delay = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            # The Sheets client is blocking, so run it off the event loop
+            if await asyncio.to_thread(sheets_service.append_leads, batch):
+                return True
+
+            if attempt < self.max_retries:
+                logger.warning(f"Sheets append failed (attempt {attempt}/{self.max_retries}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        logger.error(f"Giving up on a batch of {len(batch)} leads for now, will retry on next flush")
+        return False
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._stopping:
+                break
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error in Sheets replica worker: {e}", exc_info=True)
+
+
+# Singleton instance
+sheets_sink = SheetsSink()
@@ -0,0 +1,181 @@
+"""
+Pool of persistent, authenticated SMTP connections for bulk sending.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from email.message import EmailMessage
+from typing import Optional, List, Dict, Any, Callable
+from config.settings import settings
+from utils.metrics import track_stage
+from .concurrency_control import stage_limits
+from .record_replay import traffic_archive
+
+logger = logging.getLogger(__name__)
+
+
+def smtp_request(message: EmailMessage) -> Dict[str, Any]:
+    """Fields of a message that identify it in the traffic archive."""
+    body = message.get_body(preferencelist=("plain", "html"))
+    content = body.get_content() if body is not None else ""
+    return {
+        "to": message["To"],
+        "subject": message["Subject"],
+        "body_sha256": hashlib.sha256(content.encode("utf-8")).hexdigest()
+    }
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether an SMTP error is temporary (4xx, dropped session, timeout) and worth retrying later."""
+    import aiosmtplib
+
+    codes = []
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        codes = [refused.code for refused in error.recipients]
+    elif isinstance(error, aiosmtplib.SMTPResponseException):
+        codes = [error.code]
+    elif isinstance(error, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, ConnectionError)):
+        return True
+
+    return bool(codes) and all(400 <= code < 500 for code in codes)
+
+
+class PooledConnection:
+    """An open SMTP session plus the bookkeeping the pool needs."""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP sessions open and reuses them across messages.
+
+    Each connection pays the TCP connect, TLS handshake and AUTH once and then
+    sends many messages. A connection is retired after max_messages (to stay
+    under server-side per-session limits) or when it has been idle longer than
+    idle_timeout. If the server drops a session (disconnect or a 421), the
+    message is retried once on a fresh connection.
+    """
+
+    def __init__(self, connect_kwargs: Callable[[], Dict[str, Any]]):
+        """
+        Args:
+            connect_kwargs: Returns the aiosmtplib.SMTP arguments (host, port,
+                credentials and TLS options) for a new connection
+        """
+        self.connect_kwargs = connect_kwargs
+        self.size = settings.smtp_pool_size
+        self.max_messages = settings.smtp_max_messages_per_connection
+        self.idle_timeout = settings.smtp_idle_timeout
+        self._idle: List[PooledConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.connections_opened = 0
+
+    @property
+    def idle_connections(self) -> int:
+        return len(self._idle)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        return self._slots
+
+    async def _open(self) -> PooledConnection:
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(**self.connect_kwargs())
+        await smtp.connect()  # also runs STARTTLS and AUTH when configured
+        self.connections_opened += 1
+        logger.debug(f"Opened SMTP connection #{self.connections_opened}")
+        return PooledConnection(smtp)
+
+    async def _discard(self, conn: PooledConnection) -> None:
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    async def _reset_or_discard(self, conn: PooledConnection) -> None:
+        try:
+            await conn.smtp.rset()
+            await self._release(conn)
+        except Exception:
+            await self._discard(conn)
+
+    async def _acquire(self) -> PooledConnection:
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.smtp.is_connected and now - conn.last_used < self.idle_timeout:
+                return conn
+            await self._discard(conn)
+        return await self._open()
+
+    async def _retire_idle(self) -> None:
+        """Close sessions that sat unused longer than idle_timeout."""
+        now = time.monotonic()
+        expired = [conn for conn in self._idle if now - conn.last_used >= self.idle_timeout]
+        for conn in expired:
+            self._idle.remove(conn)
+            await self._discard(conn)
+
+    async def _release(self, conn: PooledConnection) -> None:
+        if conn.messages_sent >= self.max_messages or not conn.smtp.is_connected:
+            await self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+        await self._retire_idle()
+
+    def _is_connection_lost(self, error: Exception) -> bool:
+        import aiosmtplib
+
+        if isinstance(error, (aiosmtplib.SMTPServerDisconnected, ConnectionError)):
+            return True
+        # 421: service not available, closing transmission channel
+        return isinstance(error, aiosmtplib.SMTPResponseException) and error.code == 421
+
+    async def send_message(self, message: EmailMessage) -> None:
+        """
+        Send one message over a pooled connection.
+
+        Raises:
+            aiosmtplib.SMTPException: If the message could not be delivered
+        """
+        async with self._semaphore():
+            with track_stage("smtp_send"):
+                # The server pushing back (4xx, dropped sessions) lowers the sends in flight
+                async with stage_limits.slot("smtp", overload=is_transient_error):
+                    await traffic_archive.call("smtp", smtp_request(message), lambda: self._deliver(message))
+
+    async def _deliver(self, message: EmailMessage) -> None:
+        for attempt in (1, 2):
+            conn = await self._acquire()
+            try:
+                await conn.smtp.send_message(message)
+            except Exception as e:
+                if self._is_connection_lost(e):
+                    await self._discard(conn)
+                    if attempt == 1:
+                        logger.info(f"SMTP connection dropped ({e}), reconnecting")
+                        continue
+                    raise
+
+                # Rejected message on a healthy session: reset and keep it
+                await self._reset_or_discard(conn)
+                raise
+
+            conn.messages_sent += 1
+            await self._release(conn)
+            return
+
+    async def close(self) -> None:
+        """Close every idle connection (on shutdown; between sends idle_timeout retires them)."""
+        while self._idle:
+            await self._discard(self._idle.pop())
@@ -0,0 +1,144 @@
+"""
+Tenants identified by API key, with request rate limits and daily quotas.
+"""
+import hashlib
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from config.settings import settings
+from utils.rate_limiter import RateLimiter, DailyCap
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+
+_current_tenant: ContextVar[Optional["Tenant"]] = ContextVar("tenant", default=None)
+
+
+def _digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class Tenant:
+    """One team sharing the backend: its fair-share weight, limits and usage."""
+
+    def __init__(
+        self,
+        name: str,
+        weight: float = 1.0,
+        requests_per_minute: float = 0,
+        daily_leads: int = 0,
+        daily_emails: int = 0
+    ):
+        self.name = name
+        self.weight = weight if weight > 0 else 1.0
+        # Bursts of up to ten seconds' worth of requests
+        self.requests = RateLimiter(requests_per_minute / 60, burst=max(int(requests_per_minute // 6), 1))
+        self.leads = DailyCap(daily_leads)
+        self.emails = DailyCap(daily_emails)
+        self.usage = {
+            "requests": 0,
+            "rate_limited": 0,
+            "quota_exceeded": 0,
+            "leads": 0,
+            "emails": 0,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "tenant": self.name,
+            "weight": self.weight,
+            "usage": dict(self.usage),
+            "limits": {
+                "requests_per_minute": round(self.requests.max_rate * 60, 2) or None,
+                "daily_leads": self.leads.cap or None,
+                "daily_emails": self.emails.cap or None,
+            },
+            "remaining_today": {
+                "leads": self.leads.remaining(),
+                "emails": self.emails.remaining(),
+            }
+        }
+
+
+class TenantService:
+    """
+    Resolves API keys to tenants and enforces their rate and daily quotas.
+
+    Tenants come from the TENANTS setting. Without any, the API stays open
+    and every request belongs to one unlimited "default" tenant.
+    """
+
+    def __init__(self, tenants: Dict[str, Dict[str, Any]] = None):
+        config = settings.tenants if tenants is None else tenants
+        self.tenants: Dict[str, Tenant] = {}
+        self._by_key: Dict[str, Tenant] = {}
+        for name, options in config.items():
+            tenant = Tenant(
+                name,
+                weight=float(options.get("weight", 1.0)),
+                requests_per_minute=float(options.get("requests_per_minute", 0)),
+                daily_leads=int(options.get("daily_leads", 0)),
+                daily_emails=int(options.get("daily_emails", 0))
+            )
+            self.tenants[name] = tenant
+            if options.get("api_key"):
+                self._by_key[_digest(options["api_key"])] = tenant
+            else:
+                logger.warning(f"Tenant {name} has no api_key and cannot authenticate")
+        if not self.tenants:
+            self.tenants[DEFAULT_TENANT] = Tenant(DEFAULT_TENANT)
+        logger.info(f"Tenants: {', '.join(self.tenants)}{'' if self.open else ' (API key required)'}")
+
+    @property
+    def open(self) -> bool:
+        """True when no API keys are configured."""
+        return not self._by_key
+
+    def authenticate(self, api_key: Optional[str]) -> Optional[Tenant]:
+        """Tenant owning an API key (the default tenant in open mode), else None."""
+        if self.open:
+            return self.tenants[DEFAULT_TENANT]
+        if not api_key:
+            return None
+        return self._by_key.get(_digest(api_key))
+
+    def admit(self, tenant: Tenant) -> bool:
+        """Count a request against the tenant's rate limit."""
+        if not tenant.requests.try_acquire():
+            tenant.usage["rate_limited"] += 1
+            return False
+        tenant.usage["requests"] += 1
+        return True
+
+    def reserve(self, tenant: Tenant, kind: str, count: int, partial: bool = False) -> int:
+        """
+        Reserve daily quota ("leads" or "emails") before doing the work.
+
+        Returns:
+            Units granted; 0 (and a quota_exceeded count) when none are left
+        """
+        granted = getattr(tenant, kind).take(count, partial=partial)
+        if not granted and count:
+            tenant.usage["quota_exceeded"] += 1
+        return granted
+
+    def settle(self, tenant: Tenant, kind: str, reserved: int, used: int) -> None:
+        """Return the unused part of a reservation and record actual usage."""
+        if reserved > used:
+            getattr(tenant, kind).give_back(reserved - used)
+        tenant.usage[kind] += used
+
+
+def bind_tenant(tenant: Tenant) -> None:
+    """Attach a tenant to the current request context."""
+    _current_tenant.set(tenant)
+
+
+def current_tenant() -> Optional[Tenant]:
+    """Return the tenant of the current request, if any."""
+    return _current_tenant.get()
+
+
+# Singleton instance
+tenant_service = TenantService()
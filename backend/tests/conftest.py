@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app's packages the way main.py does, from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeUpstreams
+
+# Bind the service singletons before any test imports a service module
+# directly; a module imported first would shadow the singleton of the same
+# name on the services package, and main would pick up the module.
+import main  # noqa: E402,F401
+
+
+@pytest.fixture(scope="session")
+def fakes():
+    """Local fake upstreams (HTTP APIs, SMTP sink, DNS stub), shared by the session."""
+    upstreams = FakeUpstreams().start()
+    yield upstreams
+    upstreams.stop()
@@ -0,0 +1,20 @@
+"""
+Finishing reserve of request deadlines.
+"""
+from config.settings import settings
+from utils.deadline import Deadline
+
+
+def test_reserve_of_long_deadline():
+    deadline = Deadline(10_000)
+
+    assert deadline.reserve == settings.deadline_reserve_ms / 1000
+
+
+def test_short_deadline_keeps_time_for_the_stages():
+    # The smallest deadline a request accepts must not be all reserve
+    deadline = Deadline(100)
+
+    assert deadline.reserve == 100 * settings.deadline_reserve_fraction / 1000
+    assert not deadline.expired
+    assert deadline.remaining() > 0.05
@@ -0,0 +1,151 @@
+"""
+MX validation against the DNS stub of benchmarks.fakes.
+"""
+import asyncio
+import importlib
+import types
+
+import pytest
+
+from services.email_validation_service import EmailValidationService, UNDELIVERABLE, VALID
+
+# The package attribute of the same name is the service singleton
+validation = importlib.import_module("services.email_validation_service")
+
+
+class Clock:
+    """Stands in for time.monotonic so cache expiry needs no sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def dns_stub(fakes):
+    """The DNS stub with fresh zones, latency and query count for each test."""
+    upstream = fakes.upstreams["dns"]
+    fakes.dns_zones.clear()
+    upstream.calls = 0
+    upstream.latency = 0.0
+    upstream.error_rate = 0.0
+    yield fakes
+    fakes.dns_zones.clear()
+    upstream.latency = 0.0
+    upstream.error_rate = 0.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(validation, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def service(dns_stub):
+    import dns.asyncresolver
+
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = [dns_stub.host]
+    resolver.port = dns_stub.dns_port
+    resolver.lifetime = 3.0
+    service = EmailValidationService(resolver=resolver)
+    service.positive_ttl = 60.0
+    service.negative_ttl = 10.0
+    return service
+
+
+def queries(fakes) -> int:
+    return fakes.upstreams["dns"].calls
+
+
+def test_mx_present(service, dns_stub):
+    dns_stub.dns_zones["shop.example"] = {"MX": ["10 mail.shop.example."]}
+
+    status, reason = asyncio.run(service.check_domain("shop.example"))
+
+    assert (status, reason) == (VALID, "")
+    assert queries(dns_stub) == 1
+
+
+def test_null_mx(service, dns_stub):
+    dns_stub.dns_zones["nomail.example"] = {"MX": ["0 ."]}
+
+    status, reason = asyncio.run(service.check_domain("nomail.example"))
+
+    assert status == UNDELIVERABLE
+    assert "null MX" in reason
+
+
+def test_nxdomain(service, dns_stub):
+    dns_stub.dns_zones["gone.example"] = None
+
+    status, reason = asyncio.run(service.check_domain("gone.example"))
+
+    assert (status, reason) == (UNDELIVERABLE, "domain does not exist")
+
+
+def test_address_record_fallback(service, dns_stub):
+    dns_stub.dns_zones["bare.example"] = {"A": ["192.0.2.10"]}
+    dns_stub.dns_zones["parked.example"] = {}
+
+    assert asyncio.run(service.check_domain("bare.example")) == (VALID, "")
+    assert asyncio.run(service.check_domain("parked.example")) == (UNDELIVERABLE, "domain has no mail server")
+    # MX, then A for the first; MX, A and AAAA for the second
+    assert queries(dns_stub) == 5
+
+
+def test_positive_ttl_expiry(service, dns_stub, clock):
+    dns_stub.dns_zones["shop.example"] = {"MX": ["10 mail.shop.example."]}
+
+    asyncio.run(service.check_domain("shop.example"))
+    clock.now += service.positive_ttl - 1
+    asyncio.run(service.check_domain("shop.example"))
+    assert queries(dns_stub) == 1
+    assert service.cache_hits == 1
+
+    clock.now += 2
+    asyncio.run(service.check_domain("shop.example"))
+    assert queries(dns_stub) == 2
+
+
+def test_negative_ttl_expiry(service, dns_stub, clock):
+    dns_stub.dns_zones["gone.example"] = None
+
+    asyncio.run(service.check_domain("gone.example"))
+    clock.now += service.negative_ttl - 1
+    assert asyncio.run(service.check_domain("gone.example"))[0] == UNDELIVERABLE
+    assert queries(dns_stub) == 1
+
+    # The domain was registered since; the cached "does not exist" runs out
+    dns_stub.dns_zones["gone.example"] = {"MX": ["10 mail.gone.example."]}
+    clock.now += 2
+    assert asyncio.run(service.check_domain("gone.example")) == (VALID, "")
+    assert queries(dns_stub) == 2
+
+
+def test_failed_lookup_not_cached(service, dns_stub):
+    dns_stub.upstreams["dns"].error_rate = 1.0
+    status, _ = asyncio.run(service.check_domain("flaky.example"))
+    dns_stub.upstreams["dns"].error_rate = 0.0
+
+    assert status == validation.UNKNOWN
+    assert asyncio.run(service.check_domain("flaky.example")) == (VALID, "")
+
+
+def test_concurrent_lookups_coalesce(service, dns_stub):
+    dns_stub.dns_zones["busy.example"] = {"MX": ["10 mail.busy.example."]}
+    dns_stub.upstreams["dns"].latency = 0.2
+
+    async def validate_all():
+        return await service.validate_many([f"user{n}@busy.example" for n in range(10)])
+
+    results = asyncio.run(validate_all())
+
+    assert [result["status"] for result in results] == [VALID] * 10
+    assert queries(dns_stub) == 1
+    assert service.inflight.executions == 1
+    assert service.inflight.coalesced == 9
@@ -0,0 +1,57 @@
+"""
+Campaign exports select the leads a campaign e-mailed by lead id.
+"""
+import asyncio
+
+import pytest
+
+import main
+from services.lead_store import LeadStore
+from services.outbox import Outbox
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    lead_store = LeadStore(str(tmp_path / "leads.db"))
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(main, "lead_store", lead_store)
+    monkeypatch.setattr(main, "outbox", outbox)
+    yield lead_store, outbox
+    lead_store.close()
+
+
+def export(campaign_id: str):
+    async def collect():
+        return [lead async for batch in main.export_batches(None, None, None, campaign_id) for lead in batch]
+    return asyncio.run(collect())
+
+
+def test_campaign_export_selects_by_lead_id(stores):
+    lead_store, outbox = stores
+    # Two businesses share an address; only the first was e-mailed
+    shared, other, _ = lead_store.add_leads([
+        {"business_name": "Shop A", "email": "info@group.example"},
+        {"business_name": "Shop B", "email": "info@group.example"},
+        {"business_name": "Shop C", "email": "c@shop-c.example"},
+    ])
+    campaign_id = outbox.enqueue([
+        {"email": "info@group.example", "body": "Hello A", "lead_id": shared},
+        # The same lead e-mailed again with a follow-up
+        {"email": "info@group.example", "body": "Following up, A", "lead_id": shared},
+    ], "Hi")["campaign_id"]
+
+    assert [lead["business_name"] for lead in export(campaign_id)] == ["Shop A"]
+
+
+def test_messages_without_lead_id_map_to_latest_lead(stores):
+    lead_store, outbox = stores
+    lead_store.add_leads([
+        {"business_name": "Old", "email": "owner@shop.example"},
+        {"business_name": "New", "email": "Owner@Shop.example"},
+    ])
+    campaign_id = outbox.enqueue([
+        {"email": "owner@shop.example", "body": "Hello"},
+        {"email": "owner@shop.example", "body": "Hello again"},
+    ], "Hi")["campaign_id"]
+
+    assert [lead["business_name"] for lead in export(campaign_id)] == ["New"]
@@ -0,0 +1,87 @@
+"""
+Known-lead checks of the lead index, in exact and bloom mode.
+"""
+import asyncio
+import importlib
+import threading
+
+import pytest
+
+from services.lead_index import LeadIndex
+from services.lead_store import LeadStore
+
+# The package exports the singleton under the module's name
+lead_index_module = importlib.import_module("services.lead_index")
+
+KNOWN = {"business_name": "Cafe A", "website": "https://www.cafe-a.example/menu", "phone": "+91 98000 00001"}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LeadStore(str(tmp_path / "leads.db"))
+    monkeypatch.setattr(lead_index_module, "lead_store", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture(params=[False, True], ids=["exact", "bloom"])
+def index(request, store, monkeypatch):
+    monkeypatch.setattr(lead_index_module.settings, "lead_store_seed_from_sheet", False)
+    store.add_leads([KNOWN])
+    index = LeadIndex()
+    index.use_bloom = request.param
+    index.bloom_capacity = 1000
+    index.load()
+    return index
+
+
+def test_find_known_batch(index):
+    candidates = [
+        {"link": "http://cafe-a.example", "phone": ""},
+        {"link": "", "phone": "+91-98000-00001"},
+        {"link": "https://cafe-b.example", "phone": "+91 98000 00002"},
+        {"link": "https://facebook.com/cafe-a", "phone": ""},
+    ]
+
+    assert asyncio.run(index.find_known(candidates)) == [True, True, False, False]
+    assert asyncio.run(index.filter_new(candidates)) == candidates[2:]
+    assert (index.hits, index.checks) == (4, 8)
+
+
+def test_bloom_positives_are_confirmed_off_the_event_loop(index, monkeypatch):
+    threads = []
+    stored_keys = index._stored_keys
+
+    def spy(keys):
+        threads.append(threading.current_thread())
+        return stored_keys(keys)
+
+    monkeypatch.setattr(index, "_stored_keys", spy)
+    asyncio.run(index.find_known([{"link": "http://cafe-a.example"}, {"link": "http://cafe-c.example"}]))
+
+    if index.use_bloom:
+        # One store query for the whole batch, on a worker thread
+        assert len(threads) == 1
+        assert threads[0] is not threading.main_thread()
+    else:
+        assert threads == []
+
+
+def test_seed_skips_repeated_rows(store, monkeypatch):
+    sheets_module = importlib.import_module("services.sheets_service")
+    rows = [
+        KNOWN,
+        {"business_name": "Cafe B", "website": "https://cafe-b.example", "phone": ""},
+        {"business_name": "Cafe B", "website": "http://www.cafe-b.example/", "phone": "+91 98000 00002"},
+        {"business_name": "Cafe C", "website": "N/A", "phone": "+91 98000 00003"},
+        {"business_name": "Cafe C", "website": "N/A", "phone": "+91-98000-00003"},
+    ]
+    store.add_leads([KNOWN])
+    monkeypatch.setattr(sheets_module.sheets_service, "is_configured", lambda: True)
+    monkeypatch.setattr(sheets_module.sheets_service, "read_leads", lambda: rows)
+
+    index = LeadIndex()
+
+    assert index.seed_from_sheet() == 2
+    assert store.count_leads() == 3
+    assert index.seed_from_sheet() == 0
@@ -0,0 +1,44 @@
+"""
+Place re-checks of the lead refresher by search source.
+"""
+import asyncio
+import importlib
+
+import pytest
+
+from services.lead_refresh import LeadRefresher
+
+search_module = importlib.import_module("services.search_service")
+
+INPUTS = {"title": "Cafe A", "link": "", "phone": "+91 98000 00001", "address": "1 Main Road", "rating": "4.5", "hours": ""}
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Place ids looked up in Google Maps; every place comes back with a new phone."""
+    looked_up = []
+
+    async def lookup_place(place_id):
+        looked_up.append(place_id)
+        return {**INPUTS, "phone": "+91 98000 00009"}
+
+    monkeypatch.setattr(search_module.search_service, "lookup_place", lookup_place)
+    return looked_up
+
+
+def lead(**fields):
+    return {"id": 1, "business_name": "Cafe A", "website": "N/A", "phone": INPUTS["phone"], "inputs": dict(INPUTS), **fields}
+
+
+@pytest.mark.parametrize("fields, expected", [
+    ({"place_id": "ChIJ-maps", "search_source": "google_maps"}, ["ChIJ-maps"]),
+    ({"place_id": "ChIJ-serper", "search_source": "serper"}, []),
+    ({"place_id": "12345678901234567890"}, []),  # stored before sources were recorded: a Serper cid
+    ({"place_id": "ChIJ-legacy"}, ["ChIJ-legacy"]),
+    ({"place_id": ""}, []),
+])
+def test_only_google_maps_places_are_looked_up(lookups, fields, expected):
+    _, _, changes = asyncio.run(LeadRefresher()._check(lead(**fields), True, False))
+
+    assert lookups == expected
+    assert changes == (["phone"] if expected else [])
@@ -0,0 +1,99 @@
+"""
+Outbox delivery against the local SMTP sink: the durable daily cap and
+watching a campaign's outcomes.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.smtp_sink import SMTPSink
+from config.settings import settings
+from services.mail_service import CAP_REACHED, mail_service
+from services.outbox import DEFERRED, SENT, Outbox
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """Point the mail service at a sink; the sink itself starts on each test's loop."""
+    sink = SMTPSink()
+    for name, value in (
+        ("smtp_host", "127.0.0.1"), ("smtp_username", "test"), ("smtp_password", "test"),
+        ("from_email", "test@localhost"), ("security", "none"), ("_throttles", {})
+    ):
+        monkeypatch.setattr(mail_service, name, value)
+    monkeypatch.setattr(settings, "smtp_rate_per_minute", 0)
+    return sink
+
+
+def recipients(count: int):
+    return [{"email": f"owner{n}@shop{n}.example", "body": f"Hello shop {n}"} for n in range(count)]
+
+
+async def deliver(sink: SMTPSink, outbox: Outbox, campaign_id: str):
+    """Run the dispatcher until the campaign settles."""
+    mail_service.smtp_port = await sink.start()
+    outbox.start()
+    try:
+        return await outbox.wait_for_campaign(campaign_id, timeout=10, poll=0.05)
+    finally:
+        await outbox.stop()
+        await mail_service.pool.close()
+        await sink.stop()
+
+
+def test_daily_cap_holds_across_restarts(smtp, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_daily_cap", 3)
+    path = str(tmp_path / "outbox.db")
+
+    first = Outbox(path)
+    campaign_id = first.enqueue(recipients(5), "Hi")["campaign_id"]
+    stats = asyncio.run(deliver(smtp, first, campaign_id))
+
+    assert (stats["counts"][SENT], stats["counts"][DEFERRED]) == (3, 2)
+    deferred = first.list_messages(campaign_id, DEFERRED)
+    assert {(m["attempts"], m["last_error"]) for m in deferred} == {(0, CAP_REACHED)}
+
+    # A restarted worker starts with a fresh in-memory cap; the stored count still holds
+    monkeypatch.setattr(mail_service, "_throttles", {})
+    second = Outbox(path)
+    assert second.sends_today() == 3
+    assert second.resume(campaign_id) == 2
+    stats = asyncio.run(deliver(smtp, second, campaign_id))
+
+    assert (stats["counts"][SENT], stats["counts"][DEFERRED]) == (3, 2)
+    assert smtp.messages_received == 3
+
+
+def test_unsent_messages_do_not_use_the_cap(smtp, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_daily_cap", 10)
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    campaign_id = outbox.enqueue(recipients(2) + [{"email": "", "body": "no address"}], "Hi")["campaign_id"]
+
+    asyncio.run(deliver(smtp, outbox, campaign_id))
+
+    assert outbox.sends_today() == 2
+
+
+def test_watch_campaign_reports_each_outcome(smtp, tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+
+    async def watch(campaign_id):
+        mail_service.smtp_port = await smtp.start()
+        outbox.start()
+        try:
+            return [outcome async for outcome in outbox.watch_campaign(campaign_id, timeout=10, poll=0.05)]
+        finally:
+            await outbox.stop()
+            await mail_service.pool.close()
+            await smtp.stop()
+
+    campaign_id = outbox.enqueue(recipients(4), "Hi")["campaign_id"]
+    outcomes = asyncio.run(watch(campaign_id))
+
+    assert sorted(o["email"] for o in outcomes) == sorted(r["email"] for r in recipients(4))
+    assert {o["state"] for o in outcomes} == {SENT}
+
+    # Resubmitting the campaign sends nothing again but reports the earlier outcomes
+    assert outbox.enqueue(recipients(4), "Hi")["queued"] == 0
+    assert len(asyncio.run(watch(campaign_id))) == 4
+    assert smtp.messages_received == 4
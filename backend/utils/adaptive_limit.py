@@ -0,0 +1,202 @@
+"""
+Adaptive concurrency limits for outbound calls.
+
+AIMD congestion control, as in TCP: the number of calls allowed in flight
+grows by one per window of healthy completions and is cut multiplicatively as
+soon as the window shows overload (too many throttling / timeout errors, or
+latency well above its usual level).
+"""
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def any_error(error: BaseException) -> bool:
+    """Overload test that counts every error."""
+    return True
+
+
+class LimitSlot:
+    """Handle for one call holding a slot; lets code that returns errors report overload."""
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.overload = False
+
+    def overloaded(self):
+        """Count this call as a sign the upstream is overloaded (429, 503, timeout)."""
+        self.overload = True
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that follows the observed health of an upstream.
+
+    Completions are judged in windows of as many calls as the current limit
+    (one "round trip" at full use). A window whose median latency stays within
+    latency_tolerance times the baseline (a slow moving average of the
+    medians of healthy windows) raises the limit by one, provided calls
+    actually used at least half of it. Overload errors above error_threshold
+    of a window, or a slow window, multiply the limit by backoff right away.
+    Calls that started before a cut are not judged again, so one burst of
+    errors cuts only once. A slow window at the minimum limit becomes the new
+    baseline: the upstream itself got slower.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        error_threshold: float = 0.1,
+        backoff: float = 0.5,
+        min_window: int = 10,
+        enabled: bool = True
+    ):
+        self.name = name
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.backoff = backoff
+        self.min_window = min_window
+        self.enabled = enabled
+        self.baseline: Optional[float] = None  # seconds
+        self.in_flight = 0
+        self.waiting = 0
+        self.increases = 0
+        self.decreases = 0
+        self._epoch = 0
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _window(self) -> int:
+        return max(self.limit, self.min_window)
+
+    def _wake(self):
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit."""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.waiting += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # handed a slot just as the caller gave up
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _resize(self, limit: int, reason: str):
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit > self.limit:
+            self.increases += 1
+            logger.debug(f"{self.name} concurrency {self.limit} -> {limit} ({reason})")
+        elif limit < self.limit:
+            self.decreases += 1
+            logger.info(f"⬇️ {self.name} concurrency {self.limit} -> {limit} ({reason})")
+        self.limit = limit
+        self._latencies.clear()
+        self._errors = 0
+        self._wake()
+
+    def _back_off(self, reason: str):
+        self._epoch += 1
+        self._resize(int(self.limit * self.backoff), reason)
+
+    def record(self, slot: LimitSlot, latency: float):
+        """Judge one completed call (before its slot is released)."""
+        if slot.epoch != self._epoch:
+            return  # started before the last cut, which already accounted for it
+
+        window = self._window()
+        if slot.overload:
+            self._errors += 1
+            if self._errors > self.error_threshold * window:
+                self._back_off(f"{self._errors} overload errors")
+            return
+
+        self._latencies.append(latency)
+        if len(self._latencies) + self._errors < window:
+            return
+
+        median = statistics.median(self._latencies)
+        if self.baseline is None:
+            self.baseline = median
+        if median > self.baseline * self.latency_tolerance:
+            if self.limit > self.min_limit:
+                self._back_off(f"latency {median * 1000:.0f} ms vs {self.baseline * 1000:.0f} ms usual")
+                return
+            # Nothing left to shed: the upstream itself got slower
+            self.baseline = median
+        self.baseline = 0.9 * self.baseline + 0.1 * median
+        if self.in_flight * 2 >= self.limit:
+            self._resize(self.limit + 1, "healthy window")
+        else:
+            self._resize(self.limit, "window not saturated")
+
+    @asynccontextmanager
+    async def slot(self, overload: Callable[[BaseException], bool] = any_error) -> AsyncIterator[LimitSlot]:
+        """
+        Hold one slot for the duration of a call.
+
+        Args:
+            overload: Tells which escaping exceptions signal overload; others
+                (and cancellation) only free the slot
+        """
+        if not self.enabled:
+            yield LimitSlot(self._epoch)
+            return
+
+        await self.acquire()
+        slot = LimitSlot(self._epoch)
+        start = time.perf_counter()
+        try:
+            yield slot
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as e:
+            if overload(e):
+                slot.overloaded()
+                self.record(slot, time.perf_counter() - start)
+            self.release()
+            raise
+        else:
+            self.record(slot, time.perf_counter() - start)
+            self.release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "baseline_ms": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
@@ -0,0 +1,75 @@
+"""
+Per-request latency deadlines.
+
+A request can carry a deadline (``deadline_ms``). It is bound to the request
+context like the token budget, so every stage can ask how much time is left:
+scrapes get shorter timeouts, LLM extraction falls back to search data and
+email generation falls back to the template once too little time remains, and
+the scheduler returns whatever leads are complete when the deadline hits.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+
+from config.settings import settings
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("deadline", default=None)
+
+
+class Deadline:
+    """Wall-clock budget for one request."""
+
+    def __init__(self, deadline_ms: int, reserve_ms: int = None):
+        self.deadline_ms = deadline_ms
+        # Kept back for finishing up (templates, saving, the response itself);
+        # capped so a short deadline still leaves most of itself to the stages
+        reserve_ms = reserve_ms if reserve_ms is not None else settings.deadline_reserve_ms
+        self.reserve = min(reserve_ms, deadline_ms * settings.deadline_reserve_fraction) / 1000
+        self.started = time.monotonic()
+        self.expires_at = self.started + deadline_ms / 1000
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, minus the finishing reserve."""
+        return max(self.expires_at - time.monotonic() - self.reserve, 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, expected_ms: int) -> bool:
+        """Check whether a step expected to take expected_ms still fits."""
+        return self.remaining() * 1000 >= expected_ms
+
+    def timeout(self, default: float) -> float:
+        """Shorten a stage timeout (seconds) so it ends before the deadline."""
+        return min(default, self.remaining())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "deadline_ms": self.deadline_ms,
+            "elapsed_ms": int(self.elapsed() * 1000),
+            "expired": self.expired
+        }
+
+
+def start_deadline(deadline_ms: Optional[int]) -> Optional[Deadline]:
+    """
+    Bind a deadline to the current request context.
+
+    Args:
+        deadline_ms: Latency budget for the request; None or 0 disables it
+
+    Returns:
+        The new Deadline, or None when the request has no deadline
+    """
+    deadline = Deadline(deadline_ms) if deadline_ms else None
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline bound to the current request, if any."""
+    return _current_deadline.get()
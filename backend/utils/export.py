@@ -0,0 +1,149 @@
+"""
+Streaming encoders for bulk lead exports.
+
+Each encoder consumes an async iterator of lead batches and yields encoded
+chunks, so an export holds one batch in memory however many leads it covers.
+Encoding runs in a worker thread, off the event loop.
+"""
+import asyncio
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# (column, type) of the tabular formats; NDJSON carries every field of a lead
+COLUMNS = [
+    ("id", int),
+    ("created_at", str),
+    ("query", str),
+    ("business_name", str),
+    ("email", str),
+    ("email_status", str),
+    ("phone", str),
+    ("website", str),
+    ("website_exists", bool),
+    ("address", str),
+    ("rating", str),
+    ("score", float),
+    ("place_id", str),
+    ("cold_email", str),
+]
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow package."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _coerce(value: Any, kind: type) -> Any:
+    if value is None or (value == "" and kind is not str):
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _row(lead: Dict[str, Any]) -> List[Any]:
+    return [_coerce(lead.get(name), kind) for name, kind in COLUMNS]
+
+
+def _csv_encode(batch: List[Dict[str, Any]], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow([name for name, _ in COLUMNS])
+    for lead in batch:
+        writer.writerow(["" if value is None else value for value in _row(lead)])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def csv_chunks(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """CSV with a header row; one chunk per batch."""
+    header = True
+    async for batch in batches:
+        yield await asyncio.to_thread(_csv_encode, batch, header)
+        header = False
+    if header:
+        yield _csv_encode([], True)
+
+
+def _ndjson_encode(batch: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(lead) + "\n" for lead in batch).encode("utf-8")
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """One JSON object per lead, with every stored field."""
+    async for batch in batches:
+        yield await asyncio.to_thread(_ndjson_encode, batch)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands what was written so far to the response."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def parquet_chunks(
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    compression: Optional[str] = "snappy"
+) -> AsyncIterator[bytes]:
+    """
+    Parquet file with one row group per batch.
+
+    Each row group is streamed as soon as it is written; the footer (schema
+    and row-group index) follows the last one.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {int: pa.int64(), str: pa.string(), bool: pa.bool_(), float: pa.float64()}
+    schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+
+    def encode(batch: List[Dict[str, Any]]) -> bytes:
+        columns = list(zip(*(_row(lead) for lead in batch)))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+        ))
+        return sink.drain()
+
+    try:
+        async for batch in batches:
+            if batch:
+                yield await asyncio.to_thread(encode, batch)
+    finally:
+        writer.close()
+    yield sink.drain()
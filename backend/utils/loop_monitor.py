@@ -0,0 +1,58 @@
+"""
+Event-loop lag monitor.
+
+A background task sleeps for a fixed interval and records how much later than
+requested it woke up. That delay is the time every other coroutine on the loop
+also waited, so it shows blocking calls and CPU saturation of the worker before
+request latencies do.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = registry.histogram(
+    "leadgen_event_loop_lag_seconds", "How late the event loop ran a timer scheduled by the lag monitor",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag into LOOP_LAG from a background task."""
+
+    def __init__(self, interval: float = 0.1):
+        """
+        Args:
+            interval: Seconds between samples (0 disables the monitor)
+        """
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running loop."""
+        if self.interval <= 0 or (self._task and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Event-loop lag monitor started ({self.interval * 1000:.0f}ms interval)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - expected, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
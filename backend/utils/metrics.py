@@ -0,0 +1,278 @@
+"""
+Lightweight in-process metrics exposed in the Prometheus text format.
+
+Recording a sample is a dict lookup and a few additions under a lock, so the
+instrumentation stays on in production. Values that services already count
+themselves (cache hits, pool sizes, backlog) are read through callbacks when
+/metrics is scraped instead of being mirrored on every event.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils import tracing
+
+# Seconds; covers cache-hit fast paths up to 15s scrape timeouts and slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+Callback = Callable[[], Any]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), callback: Optional[Callback] = None):
+        """
+        Args:
+            name: Metric name
+            help: One-line description
+            labelnames: Label names, in order
+            callback: Optional function returning the current value (or a
+                {label values tuple: value} dict) at scrape time
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _collected(self) -> Dict[LabelValues, float]:
+        if self.callback is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.callback()
+        if isinstance(value, dict):
+            return {tuple(str(v) for v in (k if isinstance(k, tuple) else (k,))): v for k, v in value.items()}
+        return {(): value}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, value in sorted(self._collected().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._collected().get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._collected().get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts..., sum, count]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[-1]) if series else 0
+
+    def totals(self) -> Dict[LabelValues, Tuple[int, float]]:
+        """(count, sum) of every series, keyed by label values."""
+        with self._lock:
+            return {key: (int(series[-1]), series[-2]) for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {int(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (), callback: Optional[Callback] = None) -> Counter:
+        return self._register(Counter(name, help, labelnames, callback))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), callback: Optional[Callback] = None) -> Gauge:
+        return self._register(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A broken callback must not take the whole endpoint down
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "leadgen_stage_duration_seconds", "Duration of pipeline stage calls", ["stage"]
+)
+STAGE_CALLS = registry.counter(
+    "leadgen_stage_calls_total", "Pipeline stage calls", ["stage"]
+)
+STAGE_ERRORS = registry.counter(
+    "leadgen_stage_errors_total", "Pipeline stage calls that failed", ["stage"]
+)
+STAGE_CANCELLED = registry.counter(
+    "leadgen_stage_cancelled_total", "Pipeline stage calls cancelled before finishing (not errors)", ["stage"]
+)
+STAGE_IN_FLIGHT = registry.gauge(
+    "leadgen_stage_in_flight", "Pipeline stage calls currently running", ["stage"]
+)
+
+
+def resident_memory_bytes() -> float:
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+registry.gauge(
+    "process_resident_memory_bytes", "Resident memory size in bytes",
+    callback=resident_memory_bytes
+)
+
+
+class StageCall:
+    """Handle for one tracked stage call; lets code that swallows errors report them."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[StageCall]:
+    """
+    Time one call of a pipeline stage and count it.
+
+    An exception escaping the block, or a call to ``fail()`` on the yielded
+    handle, counts the call as an error. Cancellation (results no longer
+    needed, deadlines) is counted apart and is not an error. The call also
+    becomes a span of the request trace when one is active.
+    """
+    call = StageCall(stage)
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    try:
+        yield call
+    except asyncio.CancelledError:
+        STAGE_CANCELLED.inc(stage=stage)
+        raise
+    except BaseException:
+        call.failed = True
+        raise
+    finally:
+        end = time.perf_counter()
+        STAGE_DURATION.observe(end - start, stage=stage)
+        tracing.record(stage, start, end, call.failed)
+        STAGE_CALLS.inc(stage=stage)
+        if call.failed:
+            STAGE_ERRORS.inc(stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
@@ -0,0 +1,46 @@
+"""
+Normalization helpers for matching leads across sources.
+"""
+import re
+from urllib.parse import urlparse
+
+
+def has_website(url: str) -> bool:
+    """Whether a search result or lead link is a real website ("N/A" means none)."""
+    return bool(url) and url.strip() not in ("", "N/A")
+
+
+def normalize_domain(url: str) -> str:
+    """
+    Reduce a website URL to a bare lowercase host.
+
+    "https://www.Cafe-Example.com/contact" -> "cafe-example.com"
+    """
+    if not has_website(url):
+        return ""
+
+    url = url.strip()
+    host = urlparse(url if "://" in url else f"http://{url}").netloc.lower()
+    host = host.split("@")[-1].split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Reduce a phone number to its last 10 digits.
+
+    Drops formatting and country/trunk prefixes, so "+91 98765 43210" and
+    "098765-43210" compare equal.
+    """
+    if not phone:
+        return ""
+
+    digits = re.sub(r"\D", "", phone)
+    return digits[-10:] if len(digits) >= 7 else ""
+
+
+def normalize_email(email: str) -> str:
+    """Lowercase and trim an email address."""
+    return email.strip().lower() if email else ""
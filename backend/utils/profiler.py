@@ -0,0 +1,84 @@
+"""
+Minimal sampling profiler for opt-in request profiling.
+
+Samples the stack of one thread (the event loop) at a fixed interval from a
+background thread and writes the result in the collapsed-stack format read by
+flamegraph.pl, speedscope and similar tools. It needs no extra dependency.
+Since the event loop is shared, samples taken while other requests are busy
+on the loop end up in the same profile.
+"""
+import glob
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class SamplingProfiler:
+    """Collects stack samples of one thread until stopped."""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        """
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample; defaults to the calling thread
+        """
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._stack(frame)] += 1
+                self.sample_count += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write(self, path: str) -> str:
+        """Write collapsed stacks ("frame;frame;frame count" per line) and return the path."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def profile_path(directory: str, label: str) -> str:
+    """Build a file name for a profile of one request."""
+    slug = "".join(c if c.isalnum() else "-" for c in label.lower()).strip("-")[:40] or "request"
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}.folded")
+
+
+def prune_profiles(directory: str, keep: int) -> int:
+    """Delete all but the newest keep profiles in directory; returns how many were deleted."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.folded")), key=os.path.getmtime, reverse=True)
+    deleted = 0
+    for path in paths[max(keep, 0):]:
+        try:
+            os.remove(path)
+            deleted += 1
+        except OSError:
+            pass  # already gone
+    return deleted
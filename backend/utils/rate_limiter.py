@@ -0,0 +1,135 @@
+"""
+Async rate limiting primitives for outbound sending and tenant quotas.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter with adaptive slowdown.
+
+    ``slow_down`` cuts the current rate multiplicatively (e.g. after a 421/451
+    deferral); every successful send nudges it back up towards the configured
+    rate. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1, min_rate: float = None):
+        self.max_rate = rate_per_second
+        self.rate = rate_per_second
+        self.min_rate = min_rate if min_rate is not None else rate_per_second / 16
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_rate <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until one send is allowed."""
+        if self.unlimited:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # Serialize waiters so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def try_acquire(self) -> bool:
+        """Take one token without waiting; False when none is available."""
+        if self.unlimited:
+            return True
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until the next token is available."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        return max((1 - self._tokens) / self.rate, 0.0)
+
+    def slow_down(self, factor: float = 0.5):
+        """Multiplicatively reduce the send rate."""
+        if not self.unlimited:
+            self._refill()
+            self.rate = max(self.rate * factor, self.min_rate)
+
+    def recover(self, step: float = None):
+        """Additively raise the send rate back towards the configured maximum."""
+        if not self.unlimited and self.rate < self.max_rate:
+            self._refill()
+            self.rate = min(self.rate + (step or self.max_rate / 20), self.max_rate)
+
+
+def next_utc_day() -> float:
+    """Unix time of the next UTC midnight, when daily caps reset."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today + timedelta(days=1)).timestamp()
+
+
+class DailyCap:
+    """Counts sends per UTC day against an optional cap (0 = no cap)."""
+
+    def __init__(self, cap: int = 0):
+        self.cap = cap
+        self.count = 0
+        self._day = self._today()
+
+    def _today(self) -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _roll(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.count = 0
+
+    def remaining(self) -> Optional[int]:
+        if not self.cap:
+            return None
+        self._roll()
+        return max(self.cap - self.count, 0)
+
+    def try_take(self) -> bool:
+        """Reserve one send; False once today's cap is used up."""
+        self._roll()
+        if self.cap and self.count >= self.cap:
+            return False
+        self.count += 1
+        return True
+
+    def take(self, count: int, partial: bool = False) -> int:
+        """
+        Reserve up to count units at once.
+
+        Returns:
+            Units reserved: count, fewer if partial and the cap is close,
+            or 0 if not enough are left
+        """
+        self._roll()
+        left = count if not self.cap else max(self.cap - self.count, 0)
+        granted = min(count, left) if partial else (count if left >= count else 0)
+        self.count += granted
+        return granted
+
+    def give_back(self, count: int = 1):
+        """Release reservations for sends (or units) that did not happen."""
+        self.count = max(self.count - count, 0)
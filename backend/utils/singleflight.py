@@ -0,0 +1,83 @@
+"""
+Single-flight coalescing of identical concurrent async work.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """One in-flight execution and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs identical concurrent calls once and fans the result out to every caller.
+
+    The work runs in its own task, so a caller that is cancelled (e.g. its
+    client disconnected) stops waiting without cancelling the work for the
+    others. Only when the last waiter leaves is the work itself cancelled.
+    The task copies the context of the caller that started it, so context
+    variables such as the token budget belong to that caller.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await fn() once per key among concurrent callers.
+
+        Args:
+            key: Identity of the work (hashable)
+            fn: Zero-argument coroutine function that performs the work
+
+        Returns:
+            The shared result; callers must not mutate it in place
+        """
+        if not self.enabled:
+            return await fn()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is left to use the result: stop the work, and let the
+                # next caller start fresh instead of joining a dying task
+                self._forget(key, call)
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight
+        }
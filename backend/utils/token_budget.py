@@ -0,0 +1,159 @@
+"""
+Per-request LLM token accounting and budgeting.
+
+Every OpenAI call records the usage reported in ``response.usage`` against the
+budget bound to the current request, aggregated per stage and per model. When a
+request runs low on budget, services ask the budget to shrink prompt sizes and
+``max_tokens``; once it is exhausted they fall back to their non-LLM paths.
+"""
+import logging
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens (input, output)
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+# Rough characters-per-token ratio used to estimate prompt sizes up front
+CHARS_PER_TOKEN = 4
+
+_current_budget: ContextVar[Optional["TokenBudget"]] = ContextVar("token_budget", default=None)
+
+
+class TokenBudget:
+    """Token usage ledger and optional spending cap for one request."""
+
+    def __init__(self, budget: int = 0, low_watermark: float = None):
+        self.budget = budget  # 0 means unlimited
+        self.low_watermark = (
+            low_watermark if low_watermark is not None else settings.token_budget_low_watermark
+        )
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls = 0
+        self.skipped_calls = 0
+        self.by_stage: Dict[str, Dict[str, int]] = {}
+        self.by_model: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def is_limited(self) -> bool:
+        return self.budget > 0
+
+    def remaining(self) -> Optional[int]:
+        """Tokens left in the budget, or None when unlimited."""
+        if not self.is_limited:
+            return None
+        return max(self.budget - self.total_tokens, 0)
+
+    def fraction_remaining(self) -> float:
+        if not self.is_limited:
+            return 1.0
+        return self.remaining() / self.budget
+
+    def record(self, stage: str, model: str, usage: Any) -> None:
+        """
+        Record the usage of one completion call.
+
+        Args:
+            stage: Pipeline stage that made the call (e.g. "extraction")
+            model: Model name used for the call
+            usage: The ``usage`` object from the OpenAI response (may be None)
+        """
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.calls += 1
+
+        for bucket, key in ((self.by_stage, stage), (self.by_model, model)):
+            entry = bucket.setdefault(key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt
+            entry["completion_tokens"] += completion
+
+    def record_skip(self, stage: str) -> None:
+        """Record an LLM call that was replaced by a cheaper path."""
+        self.skipped_calls += 1
+        entry = self.by_stage.setdefault(stage, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        entry["skipped"] = entry.get("skipped", 0) + 1
+
+    def can_afford(self, estimated_tokens: int) -> bool:
+        """Check whether a call of roughly this size fits in the remaining budget."""
+        if not self.is_limited:
+            return True
+        return self.remaining() >= estimated_tokens
+
+    def _scale(self, default: int, minimum: int) -> int:
+        fraction = self.fraction_remaining()
+        if fraction >= self.low_watermark or self.low_watermark <= 0:
+            return default
+        scaled = int(default * fraction / self.low_watermark)
+        return max(min(scaled, default), minimum)
+
+    def scale_chars(self, default: int, minimum: int) -> int:
+        """Prompt content length to use given the remaining budget."""
+        return self._scale(default, minimum)
+
+    def scale_max_tokens(self, default: int, minimum: int) -> int:
+        """Completion ``max_tokens`` to use given the remaining budget."""
+        return self._scale(default, minimum)
+
+    def estimated_cost(self) -> float:
+        """Estimated spend in USD based on MODEL_PRICING."""
+        cost = 0.0
+        for model, entry in self.by_model.items():
+            input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+            cost += entry["prompt_tokens"] * input_price / 1_000_000
+            cost += entry["completion_tokens"] * output_price / 1_000_000
+        return round(cost, 6)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget or None,
+            "remaining": self.remaining(),
+            "calls": self.calls,
+            "skipped_calls": self.skipped_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "estimated_cost_usd": self.estimated_cost(),
+            "by_stage": self.by_stage,
+            "by_model": self.by_model,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for a prompt string."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def start_token_budget(budget: Optional[int] = None) -> TokenBudget:
+    """
+    Bind a fresh token budget to the current request context.
+
+    Args:
+        budget: Token cap for the request; defaults to settings.request_token_budget
+
+    Returns:
+        The new TokenBudget
+    """
+    token_budget = TokenBudget(budget if budget is not None else settings.request_token_budget)
+    _current_budget.set(token_budget)
+    return token_budget
+
+
+def current_token_budget() -> Optional[TokenBudget]:
+    """Return the budget bound to the current request, if any."""
+    return _current_budget.get()
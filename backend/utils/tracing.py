@@ -0,0 +1,94 @@
+"""
+In-process request tracing for the debug timing waterfall.
+
+A trace is bound to the request context like the token budget. Every stage
+timed with ``track_stage`` (and every ``span`` block) adds a span to it while a
+trace is active, tagged with the lead being processed, so no external
+collector is needed. Without an active trace recording is a single
+ContextVar lookup.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_current_lead: ContextVar[Optional[str]] = ContextVar("trace_lead", default=None)
+
+
+class Trace:
+    """Spans recorded for one request, relative to when it started."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, name: str, start: float, end: float, error: bool = False, **attrs) -> None:
+        """Record a span from perf_counter() timestamps."""
+        span = {
+            "name": name,
+            "lead": _current_lead.get(),
+            "start_ms": round((start - self.started) * 1000, 2),
+            "duration_ms": round((end - start) * 1000, 2),
+        }
+        if error:
+            span["error"] = True
+        if attrs:
+            span.update(attrs)
+        self.spans.append(span)
+
+    def waterfall(self) -> Dict[str, Any]:
+        """Spans in start order plus per-stage totals."""
+        spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        by_stage: Dict[str, Dict[str, float]] = {}
+        for span in spans:
+            stage = by_stage.setdefault(span["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] = round(stage["total_ms"] + span["duration_ms"], 2)
+            stage["max_ms"] = max(stage["max_ms"], span["duration_ms"])
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "by_stage": by_stage,
+            "spans": spans
+        }
+
+
+def start_trace() -> Trace:
+    """Bind a fresh trace to the current request context."""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace bound to the current request, if any."""
+    return _current_trace.get()
+
+
+def set_lead(label: Optional[str]) -> None:
+    """Tag spans recorded from the current task with a lead."""
+    _current_lead.set(label)
+
+
+def record(name: str, start: float, end: float, error: bool = False) -> None:
+    """Add a span to the active trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, end, error)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as a span of the active trace."""
+    if _current_trace.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record(name, start, time.perf_counter(), failed)
@@ -1,10 +1,12 @@
 // API Configuration
 const API_BASE_URL = 'http://localhost:8000';
+const API_KEY_HEADER = 'X-API-Key'; // must match API_KEY_HEADER in backend/.env
 
 // DOM Elements
 const generateBtn = document.getElementById('generateBtn');
 const searchQueryInput = document.getElementById('searchQuery');
 const maxResultsInput = document.getElementById('maxResults');
+const apiKeyInput = document.getElementById('apiKey');
 const rangeValue = document.getElementById('rangeValue');
 const loadingSection = document.getElementById('loadingSection');
 const loadingText = document.getElementById('loadingText');
@@ -40,6 +42,12 @@ modalClose.addEventListener('click', closeEmailModal);
 copyEmailBtn.addEventListener('click', handleCopyEmail);
 retryBtn.addEventListener('click', handleRetry);
 
+// API key: kept in this browser so it survives reloads
+apiKeyInput.value = localStorage.getItem('apiKey') || '';
+apiKeyInput.addEventListener('change', (e) => {
+    localStorage.setItem('apiKey', e.target.value.trim());
+});
+
 // Range slider update
 maxResultsInput.addEventListener('input', (e) => {
     rangeValue.textContent = e.target.value;
@@ -53,6 +61,16 @@ document.addEventListener('click', (event) => {
 });
 
 // Main Functions
+function apiHeaders() {
+    // Tenants are identified by API key once the backend has TENANTS configured
+    const headers = { 'Content-Type': 'application/json' };
+    const apiKey = apiKeyInput.value.trim();
+    if (apiKey) {
+        headers[API_KEY_HEADER] = apiKey;
+    }
+    return headers;
+}
+
 async function handleGenerateLeads() {
     const query = searchQueryInput.value.trim();
     const maxResults = parseInt(maxResultsInput.value);
@@ -76,9 +94,7 @@ async function handleGenerateLeads() {
     try {
         const response = await fetch(`${API_BASE_URL}/generate-leads`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: apiHeaders(),
             body: JSON.stringify({
                 query: query,
                 max_results: maxResults
@@ -148,9 +164,7 @@ async function handleSendEmails() {
     try {
         const response = await fetch(`${API_BASE_URL}/send-emails`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
+            headers: apiHeaders(),
             body: JSON.stringify({
                 leads: leadsWithEmails,
                 subject: 'Website Development Opportunity - Grow Your Business Online'